@@ -53,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.lazy_context.ContextProfileMiddleware',
 ]
 
 ROOT_URLCONF = 'DjangoProject.urls'
@@ -87,6 +88,11 @@ DATABASES = {
     'default': dj_database_url.parse(env('DATABASE_URL'))
 }
 
+# Kesh: bir nechta gunicorn worker bo‘lsa CACHE_URL umumiy keshga (masalan redis://...) qaratiladi
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://')
+}
+
 
 
 
@@ -140,3 +146,37 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
 LOGIN_URL = 'login'
+
+# O‘quvchilar reytingi manbasi: 'ledger' (StudentScoreLedger jadvali) yoki 'sql' (bitta SQL so‘rov)
+LEADERBOARD_BACKEND = env('LEADERBOARD_BACKEND', default='ledger')
+
+# True bo‘lsa har bir view uchun qaysi context processorlar hisoblangani loglanadi (main.lazy_context)
+CONTEXT_PROFILE = env.bool('CONTEXT_PROFILE', default=False)
+
+# Test javoblari StudentQuizResult.selections ustunida saqlanadi. True bo‘lsa eski StudentAnswer qatorlari ham yoziladi
+QUIZ_ANSWER_ROWS = env.bool('QUIZ_ANSWER_ROWS', default=False)
+
+# Topshiriqlarni bo‘laklab yuklash (main/assignment_upload.py): bo‘laklar yig‘iladigan vaqtinchalik papka
+# (bir nechta server bo‘lsa umumiy disk bo‘lishi kerak), bitta bo‘lak va butun fayl uchun cheklovlar (bayt)
+ASSIGNMENT_UPLOAD_DIR = env('ASSIGNMENT_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'upload_parts'))
+ASSIGNMENT_UPLOAD_CHUNK_SIZE = env.int('ASSIGNMENT_UPLOAD_CHUNK_SIZE', default=5 * 1024 * 1024)
+ASSIGNMENT_UPLOAD_MAX_SIZE = env.int('ASSIGNMENT_UPLOAD_MAX_SIZE', default=4 * 1024 * 1024 * 1024)
+
+# Media fayllar ombori: AWS_STORAGE_BUCKET_NAME berilsa fayllar S3 (yoki MinIO kabi S3 ga mos) bucketda saqlanadi,
+# kalitlar AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY muhit o‘zgaruvchilaridan olinadi. Bu holda brauzer fayllarni
+# imzolangan POST siyosati orqali to‘g‘ridan-to‘g‘ri bucketga yuklaydi (main/direct_upload.py) — bucket CORS
+# sozlamasida sayt manzilidan POST so‘roviga ruxsat berilishi, direct_uploads/ prefiksi uchun esa bir kundan
+# keyin obyektlarni o‘chiradigan lifecycle qoidasi qo‘yilishi kerak
+AWS_STORAGE_BUCKET_NAME = env('AWS_STORAGE_BUCKET_NAME', default='')
+AWS_S3_ENDPOINT_URL = env('AWS_S3_ENDPOINT_URL', default=None)
+AWS_S3_REGION_NAME = env('AWS_S3_REGION_NAME', default=None)
+AWS_S3_FILE_OVERWRITE = False
+AWS_S3_SIGNATURE_VERSION = 's3v4'
+if AWS_STORAGE_BUCKET_NAME:
+    STORAGES = {
+        'default': {'BACKEND': 'storages.backends.s3.S3Storage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
+# Imzolangan yuklash manzilining amal qilish muddati (soniya)
+DIRECT_UPLOAD_EXPIRES = env.int('DIRECT_UPLOAD_EXPIRES', default=60 * 60)
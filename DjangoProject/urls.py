@@ -78,10 +78,17 @@ urlpatterns = [
 
     path('student/quizzes/', student.student_quiz_list, name='student_quiz_list'),
     path('quiz/<int:quiz_id>/start/', student.start_quiz, name='start_quiz'),
+    path('quiz/<int:quiz_id>/autosave/', student.autosave_quiz, name='autosave_quiz'),
+    path('quiz/submission/<int:submission_id>/', student.quiz_submission_status, name='quiz_submission_status'),
+    path('quiz/submission/<int:submission_id>/status/', student.quiz_submission_poll, name='quiz_submission_poll'),
     path('quiz/<int:quiz_id>/submit/', student.submit_quiz, name='submit_quiz'),
 
     path('assignments/', student.student_assignments_view, name='student_assignments'),
     path('student/assignments/<int:assignment_id>/submit/', student.submit_assignment, name='submit_assignment'),
+    path('student/assignments/<int:assignment_id>/upload/', student.start_assignment_upload, name='start_assignment_upload'),
+    path('student/uploads/<uuid:upload_id>/', student.assignment_upload_chunk, name='assignment_upload_chunk'),
+    path('uploads/direct/', views.start_direct_upload_view, name='start_direct_upload'),
+    path('uploads/direct/<uuid:upload_id>/complete/', views.complete_direct_upload_view, name='complete_direct_upload'),
 
     path('teacher/deadline/', teacher.teacher_deadline, name='teacher_deadline'),
     path('teacher/deadline/<int:assignment_id>/', teacher.edit_assignment, name='edit_assignment'),
@@ -91,6 +98,7 @@ urlpatterns = [
     path('teacher/attendance-list/<int:group_id>/', teacher.teacher_group_attendance, name='teacher_group_attendance'),
 
     path('teacher/assignment/<int:assignment_id>/', teacher.teacher_assignment_submissions, name='teacher_assignment_submissions'),
+    path('teacher/assignment/<int:assignment_id>/download/', teacher.download_assignment_submissions, name='download_assignment_submissions'),
     path('teacher/assignment/grade/', teacher.grade_assignment, name='grade_assignment'),
 
 
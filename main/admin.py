@@ -6,9 +6,11 @@ from django.utils.safestring import mark_safe
 
 
 
-from .models import CustomUser, Group, Schedule, DAYS_OF_WEEK, Answer, Question, Quiz, Attendance, Assignment, \
+from .models import CustomUser, Group, Schedule, DAYS_OF_WEEK, Answer, Question, QuizItem, Quiz, Attendance, Assignment, \
     StudentQuizResult, StudentAnswer, AssignmentSubmission, GroupStudentMembership, SiteSetting, ProfileSetting, \
-    GroupPaymentInfo, StudentPayment
+    GroupPaymentInfo, StudentPayment, StudentScoreLedger, AssessmentCompletion, \
+    AssessmentEligibility, QuizAttempt, QuizSubmission, QuizAnalysis, QuestionStatistic, QuizVersion, AssignmentUpload, \
+    DirectUpload
 from django.utils.timezone import localtime
 
 class StudentGroupMembershipInline(admin.TabularInline):
@@ -104,31 +106,54 @@ class ScheduleAdmin(admin.ModelAdmin):
     list_filter = ('group', 'day')
     search_fields = ('group__name',)
 
+def _is_shared(question):
+    # Bir nechta testdagi savol bankdagi umumiy yozuv: joyida tahrirlansa barcha testlar o‘zgaradi. Bunday savollar
+    # bu yerda faqat o‘qiladi, tahrir admin panel yoki o‘qituvchi sahifasida test bo‘yicha nusxa olib bajariladi
+    return question is not None and question.pk is not None and question.quiz_items.count() > 1
+
+
 class AnswerInline(admin.TabularInline):
     model = Answer
     extra = 2
 
+    def has_add_permission(self, request, obj=None):
+        return not _is_shared(obj) and super().has_add_permission(request, obj)
+
+    def has_change_permission(self, request, obj=None):
+        return not _is_shared(obj) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not _is_shared(obj) and super().has_delete_permission(request, obj)
+
 
-class QuestionInline(admin.TabularInline):
-    model = Question
+class QuizItemInline(admin.TabularInline):
+    model = QuizItem
     extra = 1
+    raw_id_fields = ('question',)
 
 
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
-    list_display = ('title', 'group', 'teacher', 'created_at')
-    list_filter = ('group', 'teacher', 'created_at')
+    list_display = ('title', 'group', 'teacher', 'exam_mode', 'created_at')
+    list_filter = ('group', 'teacher', 'exam_mode', 'created_at')
     search_fields = ('title',)
     ordering = ('-created_at',)
+    inlines = [QuizItemInline]
 
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('text', 'quiz')
-    search_fields = ('text',)
-    list_filter = ('quiz',)
+    list_display = ('text', 'content_hash')
+    search_fields = ('text', 'content_hash')
+    list_filter = ('quizzes',)
     inlines = [AnswerInline]
 
+    def has_change_permission(self, request, obj=None):
+        return not _is_shared(obj) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not _is_shared(obj) and super().has_delete_permission(request, obj)
+
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
@@ -136,6 +161,12 @@ class AnswerAdmin(admin.ModelAdmin):
     list_filter = ('is_correct', 'question')
     search_fields = ('text',)
 
+    def has_change_permission(self, request, obj=None):
+        return not (obj is not None and _is_shared(obj.question)) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not (obj is not None and _is_shared(obj.question)) and super().has_delete_permission(request, obj)
+
 
 # Qolgan modellarning oddiy ro‘yxatga olish (istalgancha sozlash mumkin)
 admin.site.register(StudentQuizResult)
@@ -172,6 +203,90 @@ class AssignmentAdmin(admin.ModelAdmin):
     formatted_deadline.short_description = 'Muddati'
 
 
+@admin.register(StudentScoreLedger)
+class StudentScoreLedgerAdmin(admin.ModelAdmin):
+    list_display = ('student', 'earned_points', 'max_points', 'percent', 'updated_at')
+    search_fields = ('student__first_name', 'student__last_name')
+    ordering = ('-percent',)
+    readonly_fields = ('student', 'earned_points', 'max_points', 'percent', 'updated_at')
+
+
+@admin.register(QuizAttempt)
+class QuizAttemptAdmin(admin.ModelAdmin):
+    list_display = ('student', 'quiz', 'started_at', 'saved_at')
+    list_filter = ('quiz',)
+    readonly_fields = ('student', 'quiz', 'answers', 'started_at', 'saved_at')
+
+
+@admin.register(QuizSubmission)
+class QuizSubmissionAdmin(admin.ModelAdmin):
+    list_display = ('student', 'quiz', 'status', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('status', 'quiz')
+    readonly_fields = ('student', 'quiz', 'data', 'result', 'error', 'attempts', 'retry_at', 'created_at', 'started_at',
+                       'processed_at')
+
+
+@admin.register(AssessmentCompletion)
+class AssessmentCompletionAdmin(admin.ModelAdmin):
+    list_display = ('assessment_type', 'assessment_id', 'teacher', 'completed_count', 'eligible_count', 'updated_at')
+    list_filter = ('assessment_type', 'teacher')
+    readonly_fields = ('teacher', 'assessment_type', 'assessment_id', 'eligible_count', 'completed_count', 'updated_at')
+
+
+class QuestionStatisticInline(admin.TabularInline):
+    model = QuestionStatistic
+    extra = 0
+    can_delete = False
+    fields = ('position', 'question', 'p_value', 'discrimination', 'omitted_share', 'option_shares')
+    readonly_fields = fields
+
+
+@admin.register(QuizAnalysis)
+class QuizAnalysisAdmin(admin.ModelAdmin):
+    list_display = ('quiz', 'respondents', 'cronbach_alpha', 'computed_at')
+    readonly_fields = ('quiz', 'respondents', 'cronbach_alpha', 'version', 'computed_at')
+    inlines = [QuestionStatisticInline]
+
+
+@admin.register(QuizVersion)
+class QuizVersionAdmin(admin.ModelAdmin):
+    # Versiyalar o‘zgarmaydi — faqat ko‘rish uchun
+    list_display = ('quiz', 'number', 'title', 'max_score', 'created_at')
+    list_filter = ('quiz',)
+    readonly_fields = ('quiz', 'number', 'title', 'time_limit', 'max_score', 'questions', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AssignmentUpload)
+class AssignmentUploadAdmin(admin.ModelAdmin):
+    list_display = ('student', 'assignment', 'filename', 'size', 'received', 'status', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('filename', 'student__first_name', 'student__last_name')
+    readonly_fields = ('assignment', 'student', 'filename', 'size', 'fingerprint', 'checksum', 'received', 'status',
+                       'submission', 'created_at', 'updated_at')
+
+
+@admin.register(DirectUpload)
+class DirectUploadAdmin(admin.ModelAdmin):
+    list_display = ('user', 'target', 'key', 'size', 'status', 'updated_at')
+    list_filter = ('target', 'status')
+    search_fields = ('key', 'filename', 'user__first_name', 'user__last_name')
+    readonly_fields = ('user', 'target', 'object_id', 'key', 'filename', 'size', 'content_type', 'status',
+                       'created_at', 'updated_at')
+
+
+@admin.register(AssessmentEligibility)
+class AssessmentEligibilityAdmin(admin.ModelAdmin):
+    list_display = ('student', 'assessment_type', 'assessment_id', 'group', 'eligible_since')
+    list_filter = ('assessment_type', 'group')
+    search_fields = ('student__first_name', 'student__last_name', 'group__name')
+
+
 @admin.register(GroupStudentMembership)
 class GroupStudentMembershipAdmin(admin.ModelAdmin):
     list_display = ['student', 'group', 'joined_at']
@@ -1,11 +1,11 @@
 import csv
 import io
-import os
 from collections import defaultdict
 from itertools import groupby
 from operator import attrgetter
 
 from django.contrib.auth.hashers import make_password
+from django.db import transaction
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
@@ -14,8 +14,12 @@ from django.views.decorators.http import require_http_methods
 from django.utils.timezone import make_aware
 from reportlab.pdfgen import canvas as pdf_canvas
 
-from main.models import Group, CustomUser, Schedule, DAYS_OF_WEEK, Assignment, Question, Quiz, Answer, \
-    GroupStudentMembership, GroupPaymentInfo, StudentPayment, SiteSetting
+from main.models import Group, CustomUser, Schedule, DAYS_OF_WEEK, Assignment, Question, Quiz, QuizItem, Answer, \
+    GroupStudentMembership, GroupPaymentInfo, StudentPayment
+from main.site_settings import get_site_setting
+from main.question_bank import add_to_quiz, next_position, fork_question
+from main.quiz_versions import publish_version
+from main.grading import rescore_quiz_results
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.http import HttpResponse, HttpResponseBadRequest
@@ -728,11 +732,9 @@ def edit_topshiriq(request, assignment_id):
         assignment.max_score = request.POST.get('max_score')
 
         if 'file' in request.FILES:
-            # ✅ Eski faylni o‘chirish
+            # ✅ Eski faylni o‘chirish (ombor orqali — S3 da fayl yo‘li yo‘q)
             if assignment.file:
-                old_file_path = assignment.file.path
-                if os.path.exists(old_file_path):
-                    os.remove(old_file_path)
+                assignment.file.storage.delete(assignment.file.name)
 
             # ✅ Yangi faylni saqlash
             assignment.file = request.FILES['file']
@@ -758,11 +760,9 @@ def admin_delete_assignment(request, assignment_id):
 
     assignment = get_object_or_404(Assignment, id=assignment_id)
 
-    # Faylni diskdan o‘chirish
+    # Faylni ombordan o‘chirish
     if assignment.file:
-        file_path = assignment.file.path
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        assignment.file.storage.delete(assignment.file.name)
 
     assignment.delete()
     messages.success(request, "Topshiriq muvaffaqiyatli o‘chirildi.")
@@ -781,10 +781,8 @@ def add_test_admin(request):
         except Quiz.DoesNotExist:
             return HttpResponse("Noto‘g‘ri viktorina tanlandi", status=400)
 
-        # Savolni yaratamiz
-        question = Question.objects.create(quiz=quiz, text=question_text)
-
         # Javoblarni qabul qilish (kiritilgan inputlar sonini bilmasligimiz sababli)
+        answers = []
         index = 0
         while True:
             answer_text = request.POST.get(f'answer_text_{index}')
@@ -793,13 +791,12 @@ def add_test_admin(request):
             if not answer_text:
                 break  # Javob tugadi
 
-            Answer.objects.create(
-                question=question,
-                text=answer_text,
-                is_correct=is_correct
-            )
+            answers.append((answer_text, is_correct))
             index += 1
 
+        # Savol bankdan olinadi yoki yaratiladi va testga havola qilinadi
+        add_to_quiz(quiz, [(question_text, answers)])
+
         return redirect('question_list')
 
         # GET bo‘lsa — forma ko‘rsatamiz
@@ -814,55 +811,96 @@ def question_list(request):
     if not (user.is_superuser or user.is_staff or user.role == 'admin'):
         return redirect('login')
 
-    questions = Question.objects.all()
+    # Savollar banki: har bir savol qaysi testlarda ishlatilayotgani bilan
+    questions = Question.objects.prefetch_related('quizzes__group')
 
     return render(request, 'admin-test-list.html', {'questions': questions})
 
+def _question_context(question, quiz_id):
+    # Savol bankdagi umumiy yozuv bo‘lishi mumkin — tahrir va o‘chirish bitta tanlangan test doirasida bajariladi.
+    # Qaytadi: (testdagi havola yoki None, savolning barcha havolalari)
+    items = list(question.quiz_items.select_related('quiz').order_by('id'))
+    item = next((item for item in items if str(item.quiz_id) == str(quiz_id)), None)
+    if item is None and len(items) == 1:
+        item = items[0]
+    return item, items
+
+
+def _quiz_titles(items):
+    return ", ".join(f"{item.quiz.title} ({item.quiz.group})" for item in items)
+
+
 @login_required
 def update_question(request, question_id):
     question = get_object_or_404(Question, id=question_id)
+    item, items = _question_context(question, request.POST.get("old_quiz_id") or request.GET.get("quiz"))
+    if item is None and items:
+        messages.error(request, f"Savol bir nechta testda ishlatiladi: {_quiz_titles(items)}. Tahrirlash uchun testni tanlang.",
+                       extra_tags='savol')
+        return redirect('question_list')
+    quiz = item.quiz if item else None
+    shared = len(items) > 1
 
     if request.method == "POST":
-        # Savol matnini yangilash
-        new_text = request.POST.get("question_text")
-        if new_text:
-            question.text = new_text
-
-        # Quizni o‘zgartirish
-        new_quiz_id = request.POST.get("quiz_id")
-        if new_quiz_id:
-            try:
-                new_quiz = Quiz.objects.get(id=new_quiz_id)
-                question.quiz = new_quiz
-            except Quiz.DoesNotExist:
-                pass  # noto‘g‘ri quiz id bo‘lsa, e’tiborsiz qoldiramiz
-
-        question.save()
-
-        # Eski javoblarni tahrirlash va o‘chirish
-        for answer in question.answers.all():
-            a_text = request.POST.get(f"answer_text_{answer.id}")
-            is_correct = request.POST.get(f"is_correct_{answer.id}") == 'on'
-            delete = request.POST.get(f"delete_answer_{answer.id}") == 'on'
-
-            if delete:
-                answer.delete()
+        new_text = request.POST.get("question_text") or question.text
+        current = [(answer.id, answer.text, answer.is_correct) for answer in question.answers.all()]
+
+        # Tahrirdan keyingi variantlar: [(eski id yoki None, matn, to‘g‘rimi)], o‘chirilganlari ro‘yxatga kirmaydi
+        answers = []
+        for answer_id, answer_text, answer_correct in current:
+            if request.POST.get(f"delete_answer_{answer_id}") == 'on':
+                continue
+            a_text = request.POST.get(f"answer_text_{answer_id}")
+            if a_text:
+                answers.append((answer_id, a_text, request.POST.get(f"is_correct_{answer_id}") == 'on'))
             else:
-                if a_text:
-                    answer.text = a_text
-                    answer.is_correct = is_correct
-                    answer.save()
+                answers.append((answer_id, answer_text, answer_correct))
 
         # Yangi javoblar qo‘shish (max 10 ta)
         for i in range(10):
             text = request.POST.get(f"new_answer_text_{i}")
-            is_correct = request.POST.get(f"new_is_correct_{i}") == 'on'
             if text:
-                Answer.objects.create(
-                    question=question,
-                    text=text,
-                    is_correct=is_correct
-                )
+                answers.append((None, text, request.POST.get(f"new_is_correct_{i}") == 'on'))
+
+        content_changed = new_text != question.text or answers != current
+        # Tahrirdan keyin yangi versiya chiqariladigan va natijalari qayta baholanadigan testlar
+        affected = [quiz] if quiz is not None and content_changed else []
+        # Bitta tranzaksiya: savol va javoblardagi barcha o‘zgarishlar testning bitta yangi versiyasiga yig‘iladi
+        with transaction.atomic():
+            if shared:
+                # Boshqa testlar bilan umumiy savol joyida o‘zgartirilmaydi — shu test uchun nusxa olinadi
+                if content_changed:
+                    question = fork_question(quiz, question, new_text, answers)
+            else:
+                question.text = new_text
+                question.save()
+                kept = {answer_id: (answer_text, is_correct) for answer_id, answer_text, is_correct in answers if answer_id}
+                for answer in question.answers.all():
+                    if answer.id not in kept:
+                        answer.delete()
+                    elif (answer.text, answer.is_correct) != kept[answer.id]:
+                        answer.text, answer.is_correct = kept[answer.id]
+                        answer.save()
+                for answer_id, answer_text, is_correct in answers:
+                    if answer_id is None:
+                        Answer.objects.create(question=question, text=answer_text, is_correct=is_correct)
+
+            # Quizni o‘zgartirish: savol faqat tahrirlanayotgan testdan tanlangan testga ko‘chiriladi
+            new_quiz_id = request.POST.get("quiz_id")
+            if new_quiz_id and str(new_quiz_id) != str(quiz.id if quiz else ''):
+                new_quiz = Quiz.objects.filter(id=new_quiz_id).first()  # noto‘g‘ri quiz id bo‘lsa, e’tiborsiz qoldiramiz
+                if new_quiz and not QuizItem.objects.filter(quiz=new_quiz, question=question).exists():
+                    if quiz is not None:
+                        QuizItem.objects.filter(quiz=quiz, question=question).delete()
+                    QuizItem.objects.create(quiz=new_quiz, question=question, position=next_position(new_quiz))
+                    affected = [moved for moved in (quiz, new_quiz) if moved is not None]
+
+        # Javoblar yoki testdagi savollar o‘zgargan bo‘lsa har bir tegishli testning versiyasi shu yerda yaratiladi va
+        # natijalar qayta baholanadi (teacher.quiz_detail dagidek): to‘g‘ri javob tuzatilsa ham o‘quvchilar qayta
+        # topshira olmaydi, nusxa esa queryset update bilan ulanadi (signal yo‘q)
+        for affected_quiz in affected:
+            publish_version(affected_quiz)
+            rescore_quiz_results(affected_quiz)
 
         return redirect('question_list')
 
@@ -871,6 +909,8 @@ def update_question(request, question_id):
 
     return render(request, 'edit-test.html', {
         'question': question,
+        'current_quiz': quiz,
+        'other_quizzes': [other.quiz for other in items if other is not item],
         'answers': answers,
         'all_quizzes': all_quizzes,
     })
@@ -884,7 +924,23 @@ def delete_question(request, pk):
     question = get_object_or_404(Question, pk=pk)
 
     if request.method == 'POST':
-        question.delete()
+        # Savol faqat tanlangan testdan olib tashlanadi; bankdagi yozuv boshqa test ishlatmasagina o‘chiriladi
+        item, items = _question_context(question, request.POST.get('quiz_id'))
+        if item is None and items:
+            messages.error(request, f"Savol bir nechta testda ishlatiladi: {_quiz_titles(items)}. O‘chirish uchun testni tanlang.",
+                           extra_tags='savol')
+            return redirect('question_list')
+
+        with transaction.atomic():
+            if item is not None:
+                item.delete()
+            others = [other for other in items if other is not item]
+            if not others:
+                question.delete()
+
+        if others:
+            messages.success(request, f"Savol «{item.quiz.title}» testidan olib tashlandi. U hali ham ishlatiladi: "
+                                      f"{_quiz_titles(others)}.", extra_tags='savol')
         return redirect('question_list')  # o‘chirilgach qayta yuklash
 
     return HttpResponseForbidden("Noto‘g‘ri so‘rov")
@@ -950,6 +1006,7 @@ def edit_quiz(request, quiz_id):
         quiz.teacher_id = request.POST.get('teacher')
         quiz.time_limit = request.POST.get('time_limit')
         quiz.max_score = request.POST.get('max_score')
+        quiz.exam_mode = request.POST.get('exam_mode') == 'on'
         quiz.save()
         return redirect('quiz_list')
 
@@ -1154,8 +1211,8 @@ def student_payment_history(request, student_id):
         "grouped_payments": grouped_payments
     })
 from PIL import Image, ImageDraw
-def make_circle_image(image_path, size_px=100):
-    img = Image.open(image_path).convert("RGBA")
+def make_circle_image(image_file, size_px=100):
+    img = Image.open(image_file).convert("RGBA")
     img = img.resize((size_px, size_px))
 
     mask = Image.new("L", (size_px, size_px), 0)
@@ -1248,9 +1305,11 @@ def payment_receipt(request, payment_id):
     p.drawString(20*mm, qr_y + 15*mm, "Imzo: __________")
     p.drawString(20*mm, qr_y + 22*mm, f"Sana: {datetime.now().strftime('%d.%m.%Y')}")
 
-    site_settings = SiteSetting.objects.first()
+    site_settings = get_site_setting()
     if site_settings and site_settings.image:
-        circle_img_buf = make_circle_image(site_settings.image.path, size_px=120)
+        # Rasm ombor orqali o‘qiladi (S3 da .path yo‘q)
+        with site_settings.image.storage.open(site_settings.image.name, 'rb') as image_file:
+            circle_img_buf = make_circle_image(image_file, size_px=120)
         logo_img = ImageReader(circle_img_buf)
         p.drawImage(logo_img, 60 * mm, qr_y + 2 * mm, 25 * mm, 25 * mm, mask='auto')
 
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import AssignmentUpload, AssignmentSubmission
+
+# Katta topshiriq fayllari bo‘laklab yuklanadi: har bir bo‘lak alohida qisqa so‘rov, shuning uchun worker
+# bo‘laklar orasida bo‘shaydi. Bo‘lak avval alohida vaqtinchalik faylga oqim bilan yoziladi (xotirada butun
+# bo‘lak saqlanmaydi), so‘ng qabul qilingan qismning oxiriga qo‘shiladi. Uzilishdan keyin mijoz qabul
+# qilingan offsetni so‘raydi va qolganidan davom ettiradi. Brauzer har bir bo‘lakning sha256 xeshini yuboradi
+# (Upload-Checksum) — mos kelmagan bo‘lak qayta yuboriladi. Butun fayl xeshi faqat mijoz uni start_upload da bergan
+# bo‘lsa tekshiriladi: brauzer ko‘p gigabaytli faylni xotiraga olmasdan xeshlay olmaydi (crypto.subtle bo‘laklab
+# hisoblamaydi). Oxirgi bo‘lakdan keyin fayl submissions/ omboriga saqlanadi
+READ_BLOCK_SIZE = 64 * 1024
+UPLOAD_STALE_AFTER = timedelta(days=1)
+
+
+class UploadError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _part_path(upload):
+    return os.path.join(settings.ASSIGNMENT_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def start_upload(student, assignment, filename, size, fingerprint='', checksum=''):
+    # Shu fayl uchun tugallanmagan yuklash bo‘lsa o‘sha qaytariladi (sahifa yangilangandan keyin ham davom etadi)
+    filename = os.path.basename(str(filename or '').replace('\\', '/'))[:255]
+    checksum = str(checksum or '').lower()
+    if not filename:
+        raise UploadError("Fayl nomi ko‘rsatilmagan")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("Fayl hajmi noto‘g‘ri")
+    if size > settings.ASSIGNMENT_UPLOAD_MAX_SIZE:
+        raise UploadError("Fayl hajmi ruxsat etilganidan katta", status=413)
+
+    if fingerprint:
+        existing = AssignmentUpload.objects.filter(
+            assignment=assignment, student=student, filename=filename, size=size,
+            fingerprint=fingerprint, checksum=checksum, status='uploading',
+        ).order_by('-created_at').first()
+        if existing is not None and os.path.exists(_part_path(existing)):
+            return existing
+
+    upload = AssignmentUpload.objects.create(
+        assignment=assignment, student=student, filename=filename, size=size,
+        fingerprint=str(fingerprint)[:255], checksum=checksum,
+    )
+    os.makedirs(settings.ASSIGNMENT_UPLOAD_DIR, exist_ok=True)
+    open(_part_path(upload), 'wb').close()
+    return upload
+
+
+def _receive_chunk(stream, length, chunk_path):
+    # Bo‘lak READ_BLOCK_SIZE tadan o‘qilib diskka yoziladi. Qaytadi: bo‘lakning sha256 xeshi
+    digest = hashlib.sha256()
+    remaining = length
+    with open(chunk_path, 'wb') as chunk:
+        while remaining:
+            block = stream.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            chunk.write(block)
+            digest.update(block)
+            remaining -= len(block)
+    if remaining:
+        raise UploadError("Bo‘lak to‘liq kelmadi")
+    return digest.hexdigest()
+
+
+def append_chunk(upload, offset, stream, length, checksum=''):
+    # offset qabul qilingan baytlar soniga teng bo‘lishi kerak, aks holda 409 — mijoz upload.received dan davom etadi
+    if upload.status != 'uploading':
+        raise UploadError("Yuklash allaqachon yakunlangan", status=409)
+    if offset != upload.received:
+        raise UploadError("Bo‘lak offseti mos kelmadi", status=409)
+    if length == 0 and offset == upload.size:
+        # Barcha baytlar qabul qilingan, lekin yakunlash (ombor yoki baza xatosi tufayli) bajarilmagan —
+        # bo‘sh bo‘lak bilan qayta uriniladi
+        complete_upload(upload)
+        return upload
+    if length <= 0 or length > settings.ASSIGNMENT_UPLOAD_CHUNK_SIZE:
+        raise UploadError("Bo‘lak hajmi noto‘g‘ri", status=413)
+    if offset + length > upload.size:
+        raise UploadError("Bo‘lak fayl hajmidan oshib ketdi")
+
+    chunk_path = f'{_part_path(upload)}.{offset}'
+    try:
+        digest = _receive_chunk(stream, length, chunk_path)
+        if checksum and digest != checksum.lower():
+            raise UploadError("Bo‘lak xeshi mos kelmadi", status=422)
+
+        # Bir vaqtda kelgan bir xil bo‘laklardan faqat bittasi qo‘shiladi
+        with transaction.atomic():
+            upload = AssignmentUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.status != 'uploading' or upload.received != offset:
+                raise UploadError("Bo‘lak offseti mos kelmadi", status=409)
+            with open(_part_path(upload), 'r+b') as part, open(chunk_path, 'rb') as chunk:
+                # Avvalgi uzilgan urinishdan qolgan ortiqcha baytlar kesib tashlanadi
+                part.truncate(offset)
+                part.seek(offset)
+                shutil.copyfileobj(chunk, part, READ_BLOCK_SIZE)
+            upload.received = offset + length
+            upload.save(update_fields=['received', 'updated_at'])
+    finally:
+        _remove(chunk_path)
+
+    if upload.received == upload.size:
+        complete_upload(upload)
+    return upload
+
+
+def replace_submission(assignment_id, student_id, file):
+    # O‘quvchining shu topshiriqqa avvalgi javobi yangisi bilan almashtiriladi. file — fayl yoki ombordagi nom
+    AssignmentSubmission.objects.filter(assignment_id=assignment_id, student_id=student_id).delete()
+    return AssignmentSubmission.objects.create(assignment_id=assignment_id, student_id=student_id, file=file)
+
+
+def complete_upload(upload):
+    # Butun fayl xeshi tekshiriladi (mijoz bergan bo‘lsa), fayl omborga oqim bilan ko‘chiriladi va
+    # o‘quvchining avvalgi topshirig‘i almashtiriladi. Ombor yoki baza xatosida yuklash 'uploading' holatida
+    # qoladi va append_chunk ga offset == size dagi bo‘sh bo‘lak bilan qayta yakunlanadi
+    path = _part_path(upload)
+    digest = _file_checksum(path)
+    if upload.checksum and digest != upload.checksum:
+        upload.status = 'failed'
+        upload.save(update_fields=['status', 'updated_at'])
+        _remove(path)
+        raise UploadError("Fayl xeshi mos kelmadi, qaytadan yuklang", status=422)
+
+    with transaction.atomic():
+        with open(path, 'rb') as part:
+            submission = replace_submission(upload.assignment_id, upload.student_id, File(part, name=upload.filename))
+        upload.status, upload.checksum, upload.submission = 'complete', digest, submission
+        upload.save(update_fields=['status', 'checksum', 'submission', 'updated_at'])
+    _remove(path)
+    return submission
+
+
+def upload_state(upload):
+    return {
+        'upload_id': str(upload.pk),
+        'offset': upload.received,
+        'size': upload.size,
+        'chunk_size': settings.ASSIGNMENT_UPLOAD_CHUNK_SIZE,
+        'status': upload.status,
+        'done': upload.status == 'complete',
+    }
+
+
+def cleanup_stale_uploads(older_than=UPLOAD_STALE_AFTER):
+    # Uzoq vaqt davom ettirilmagan yuklashlar va ularning vaqtinchalik fayllari o‘chiriladi. Qaytadi: o‘chirilganlar soni
+    stale = AssignmentUpload.objects.filter(status__in=['uploading', 'failed'], updated_at__lt=now() - older_than)
+    removed = 0
+    for upload in stale:
+        _remove(_part_path(upload))
+        upload.delete()
+        removed += 1
+    return removed
@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import QuizAttempt
+
+# Avtosaqlash keshda buferlanadi va bazaga partiyalab yoziladi (write-behind).
+# Har bir avtosaqlash "dirty" jurnaliga tartib raqami bilan yoziladi: cache.incr atomar,
+# shuning uchun bir vaqtda kelgan so‘rovlar bir-birining yozuvini yo‘qotmaydi
+ATTEMPT_BUFFER_TIMEOUT = 60 * 60 * 6
+ATTEMPT_FLUSH_BATCH = 100
+ATTEMPT_FLUSH_INTERVAL = 30
+
+_SEQ_KEY = 'attempts:dirty:seq'
+_CURSOR_KEY = 'attempts:dirty:cursor'
+_FLUSHED_AT_KEY = 'attempts:flushed_at'
+_LOCK_KEY = 'attempts:flush:lock'
+
+
+def _buffer_key(student_id, quiz_id):
+    return f'attempts:buffer:{student_id}:{quiz_id}'
+
+
+def _dirty_key(seq):
+    return f'attempts:dirty:{seq}'
+
+
+def _load_buffer(student, quiz):
+    key = _buffer_key(student.pk, quiz.pk)
+    buffer = cache.get(key)
+    if buffer is None:
+        attempt, _ = QuizAttempt.objects.get_or_create(student=student, quiz=quiz)
+        buffer = {'attempt': attempt.pk, 'answers': attempt.answers, 'saved_at': attempt.saved_at}
+        cache.set(key, buffer, timeout=ATTEMPT_BUFFER_TIMEOUT)
+    return buffer
+
+
+def get_saved_answers(student, quiz):
+    # {savol_id: javob_id} — start_quiz sahifasida tanlovlarni tiklash uchun
+    return {int(question_id): answer_id for question_id, answer_id in _load_buffer(student, quiz)['answers'].items()}
+
+
+def autosave_answers(student, quiz, answers):
+    # answers: tekshirilgan {savol_id: javob_id}; brauzer har safar barcha tanlovlarni yuboradi
+    buffer = _load_buffer(student, quiz)
+    buffer['answers'] = {str(question_id): answer_id for question_id, answer_id in answers.items()}
+    buffer['saved_at'] = now()
+    key = _buffer_key(student.pk, quiz.pk)
+    cache.set(key, buffer, timeout=ATTEMPT_BUFFER_TIMEOUT)
+
+    cache.add(_SEQ_KEY, 0, timeout=None)
+    seq = cache.incr(_SEQ_KEY)
+    cache.set(_dirty_key(seq), key, timeout=ATTEMPT_BUFFER_TIMEOUT)
+
+    state = cache.get_many([_CURSOR_KEY, _FLUSHED_AT_KEY])
+    cursor = state.get(_CURSOR_KEY, 0)
+    flushed_at = state.get(_FLUSHED_AT_KEY)
+    overdue = flushed_at is None or (buffer['saved_at'] - flushed_at).total_seconds() >= ATTEMPT_FLUSH_INTERVAL
+    if seq - cursor >= ATTEMPT_FLUSH_BATCH or overdue:
+        flush_attempt_buffers()
+    return buffer
+
+
+def flush_attempt_buffers():
+    # Jurnaldagi barcha o‘zgargan urinishlar bitta bulk_update bilan yoziladi. Qaytadi: yozilgan urinishlar soni
+    if not cache.add(_LOCK_KEY, 1, timeout=60):
+        return 0
+    try:
+        seq = cache.get(_SEQ_KEY) or 0
+        cursor = cache.get(_CURSOR_KEY) or 0
+        if cursor > seq:
+            # Kesh tozalangan bo‘lsa hisob boshidan boshlanadi
+            cursor = 0
+        dirty_keys = [_dirty_key(n) for n in range(cursor + 1, seq + 1)]
+        buffer_keys = set(cache.get_many(dirty_keys).values())
+        buffers = cache.get_many(list(buffer_keys))
+
+        attempts = [
+            QuizAttempt(id=buffer['attempt'], answers=buffer['answers'], saved_at=buffer['saved_at'])
+            for buffer in buffers.values()
+        ]
+        with transaction.atomic():
+            QuizAttempt.objects.bulk_update(attempts, ['answers', 'saved_at'], batch_size=200)
+
+        cache.set_many({_CURSOR_KEY: seq, _FLUSHED_AT_KEY: now()}, timeout=None)
+        cache.delete_many(dirty_keys)
+        return len(attempts)
+    finally:
+        cache.delete(_LOCK_KEY)
+
+
+def clear_saved_answers(student, quiz):
+    # Urinish yopiladi — faqat natija yoki navbat yozuvi saqlangandan keyin (submit_quiz da on_commit)
+    QuizAttempt.objects.filter(student=student, quiz=quiz).delete()
+    cache.delete(_buffer_key(student.pk, quiz.pk))
@@ -0,0 +1,199 @@
+import os
+import posixpath
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from .assignment_upload import UploadError, UPLOAD_STALE_AFTER, replace_submission
+from .models import Assignment, AssignmentSubmission, CustomUser, DirectUpload
+
+# Ombor S3 bo‘lsa fayllar Django orqali o‘tmaydi: server imzolangan POST siyosati beradi, brauzer faylni
+# to‘g‘ridan-to‘g‘ri bucketdagi vaqtinchalik kalitga yuboradi, so‘ng yakunlash so‘rovida server obyekt hajmini
+# tekshirib uni mijozga ko‘rsatilmagan doimiy kalitga nusxalaydi. Imzo muddati tugaguncha vaqtinchalik kalitga
+# qayta yuklash mumkin, lekin u saqlangan faylga ta’sir qilmaydi, siyosat esa hajmni e’lon qilinganiga cheklaydi.
+# O‘quvchi javobi yakunlash so‘rovida biriktiriladi; topshiriq fayli va profil rasmi esa formaning o‘zi
+# (boshqa maydonlari bilan) yuborilganda direct_upload id si orqali olinadi (claim_direct_upload)
+STAGING_PREFIX = 'direct_uploads/'
+TARGET_FIELDS = {
+    'submission': AssignmentSubmission._meta.get_field('file'),
+    'assignment': Assignment._meta.get_field('file'),
+    'profile_image': CustomUser._meta.get_field('profile_image'),
+}
+
+
+def _s3_storage(field):
+    from storages.backends.s3 import S3Storage
+
+    return field.storage if isinstance(field.storage, S3Storage) else None
+
+
+def direct_uploads_enabled(target='submission'):
+    return _s3_storage(TARGET_FIELDS[target]) is not None
+
+
+def _target_instance(user, target, payload):
+    # Kalit nomi upload_to bo‘yicha shu obyektdan yasaladi. Qaytadi: (obyekt, object_id)
+    if target == 'submission':
+        if user.role != 'student':
+            raise UploadError("Ruxsat yo‘q", status=403)
+        assignment = Assignment.objects.filter(pk=payload.get('object_id')).first()
+        if assignment is None:
+            raise UploadError("Topshiriq topilmadi", status=404)
+        return AssignmentSubmission(assignment=assignment, student=user), assignment.pk
+
+    if target == 'assignment':
+        if user.role != 'teacher':
+            raise UploadError("Ruxsat yo‘q", status=403)
+        assignment, object_id = Assignment(teacher=user), None
+        if payload.get('object_id'):
+            assignment = Assignment.objects.filter(pk=payload['object_id'], teacher=user).select_related('group').first()
+            if assignment is None:
+                raise UploadError("Topshiriq topilmadi", status=404)
+            object_id = assignment.pk
+        if payload.get('group_id'):
+            assignment.group = user.teachers_groups.filter(pk=payload['group_id']).first()
+        if assignment.group_id is None:
+            raise UploadError("Guruh topilmadi", status=404)
+        assignment.title = str(payload.get('title') or assignment.title)
+        return assignment, object_id
+
+    if target == 'profile_image':
+        return user, user.pk
+
+    raise UploadError("Noma’lum yuklash turi")
+
+
+def _object_key(field, instance, filename):
+    # Tasodifiy qo‘shimcha: bir xil nomli fayllar bir-birini bosib ketmaydi
+    root, ext = os.path.splitext(field.generate_filename(instance, filename))
+    return field.storage.get_alternative_name(root[:field.max_length - len(ext) - 8], ext)
+
+
+def _staging_key(upload):
+    return f'{STAGING_PREFIX}{upload.pk}'
+
+
+def _bucket_key(storage, name):
+    # Ombordagi fayl nomi -> bucketdagi obyekt kaliti (S3Storage kabi LOCATION prefiksi bilan)
+    return posixpath.join(storage.location, name) if storage.location else name
+
+
+def start_direct_upload(user, target, payload):
+    # payload: {"filename", "size", "content_type", "object_id", "group_id", "title"}.
+    # Qaytadi: (DirectUpload, imzolangan POST manzil, fayldan oldin formaga qo‘shiladigan maydonlar)
+    if target not in TARGET_FIELDS:
+        raise UploadError("Noma’lum yuklash turi")
+    field = TARGET_FIELDS[target]
+    storage = _s3_storage(field)
+    if storage is None:
+        raise UploadError("To‘g‘ridan-to‘g‘ri yuklash yoqilmagan", status=404)
+
+    filename = os.path.basename(str(payload.get('filename') or '').replace('\\', '/'))[:255]
+    size = payload.get('size')
+    content_type = str(payload.get('content_type') or 'application/octet-stream')[:100]
+    if not filename:
+        raise UploadError("Fayl nomi ko‘rsatilmagan")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("Fayl hajmi noto‘g‘ri")
+    if size > settings.ASSIGNMENT_UPLOAD_MAX_SIZE:
+        raise UploadError("Fayl hajmi ruxsat etilganidan katta", status=413)
+    if target == 'profile_image' and not content_type.startswith('image/'):
+        raise UploadError("Faqat rasm yuklash mumkin")
+
+    instance, object_id = _target_instance(user, target, payload)
+    upload = DirectUpload.objects.create(
+        user=user, target=target, object_id=object_id, key=_object_key(field, instance, filename),
+        filename=filename, size=size, content_type=content_type,
+    )
+    # content-length-range: bucket e’lon qilingan hajmdan boshqa hajmdagi faylni qabul qilmaydi
+    post = storage.connection.meta.client.generate_presigned_post(
+        Bucket=storage.bucket_name,
+        Key=_bucket_key(storage, _staging_key(upload)),
+        Fields={'Content-Type': content_type},
+        Conditions=[{'Content-Type': content_type}, ['content-length-range', size, size]],
+        ExpiresIn=settings.DIRECT_UPLOAD_EXPIRES,
+    )
+    return upload, post['url'], post['fields']
+
+
+def complete_direct_upload(upload):
+    # Brauzer POST ni tugatgandan keyin chaqiriladi: obyekt bucketda bo‘lishi va hajmi e’lon qilinganga teng bo‘lishi
+    # kerak. Tekshirilgan obyekt (ETag bo‘yicha aynan o‘sha) doimiy kalitga nusxalanadi, vaqtinchalik kalit o‘chiriladi
+    from botocore.exceptions import ClientError
+
+    if upload.status != 'pending':
+        if upload.status == 'failed':
+            raise UploadError("Yuklash bekor qilingan, qaytadan yuklang", status=409)
+        return upload
+
+    storage = TARGET_FIELDS[upload.target].storage
+    client = storage.connection.meta.client
+    staging = _bucket_key(storage, _staging_key(upload))
+    try:
+        head = client.head_object(Bucket=storage.bucket_name, Key=staging)
+    except ClientError:
+        raise UploadError("Fayl bucketda topilmadi", status=409)
+    if head['ContentLength'] != upload.size:
+        client.delete_object(Bucket=storage.bucket_name, Key=staging)
+        upload.status = 'failed'
+        upload.save(update_fields=['status', 'updated_at'])
+        raise UploadError("Fayl hajmi mos kelmadi, qaytadan yuklang", status=422)
+
+    try:
+        client.copy(
+            {'Bucket': storage.bucket_name, 'Key': staging}, storage.bucket_name, _bucket_key(storage, upload.key),
+            ExtraArgs={'CopySourceIfMatch': head['ETag']},
+        )
+    except ClientError:
+        # Tekshiruvdan keyin vaqtinchalik kalitga boshqa fayl yuklangan
+        raise UploadError("Fayl yuklash davomida o‘zgardi, qaytadan yakunlang", status=409)
+    client.delete_object(Bucket=storage.bucket_name, Key=staging)
+
+    with transaction.atomic():
+        upload.status = 'uploaded'
+        if upload.target == 'submission':
+            replace_submission(upload.object_id, upload.user_id, upload.key)
+            upload.status = 'complete'
+        upload.save(update_fields=['status', 'updated_at'])
+    return upload
+
+
+def claim_direct_upload(user, upload_id, target):
+    # Forma bilan kelgan direct_upload id bo‘yicha bucketdagi fayl nomi. Har bir yuklash bir marta olinadi
+    try:
+        upload_id = uuid.UUID(str(upload_id))
+    except ValueError:
+        return None
+    with transaction.atomic():
+        upload = DirectUpload.objects.select_for_update().filter(
+            pk=upload_id, user=user, target=target, status='uploaded'
+        ).first()
+        if upload is None:
+            return None
+        upload.status = 'complete'
+        upload.save(update_fields=['status', 'updated_at'])
+    return upload.key
+
+
+def direct_upload_state(upload):
+    return {
+        'upload_id': str(upload.pk),
+        'status': upload.status,
+        'done': upload.status == 'complete',
+    }
+
+
+def cleanup_direct_uploads(older_than=UPLOAD_STALE_AFTER):
+    # Yakunlanmagan yoki formaga biriktirilmagan yuklashlarning bucketdagi obyektlari o‘chiriladi.
+    # Qaytadi: o‘chirilganlar soni
+    stale = DirectUpload.objects.exclude(status='complete').filter(updated_at__lt=now() - older_than)
+    removed = 0
+    for upload in stale:
+        storage = TARGET_FIELDS[upload.target].storage
+        storage.delete(_staging_key(upload))
+        storage.delete(upload.key)
+        upload.delete()
+        removed += 1
+    return removed
@@ -0,0 +1,132 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from .grading import grade_submission_batch
+from .models import Quiz, QuizSubmission
+
+# Imtihon rejimi: submit_quiz javoblarni QuizSubmission jadvaliga yozib darhol javob qaytaradi,
+# process_quiz_submissions buyrug‘idagi workerlar ularni partiyalab baholaydi
+SUBMISSION_BATCH_SIZE = 50
+SUBMISSION_STALE_AFTER = timedelta(minutes=5)
+# Xato bilan tugagan yozuv (masalan, "database is locked") shuncha urinishgacha navbatga qaytariladi,
+# har safar kutish SUBMISSION_RETRY_AFTER * urinishlar soni
+SUBMISSION_MAX_ATTEMPTS = 3
+SUBMISSION_RETRY_AFTER = timedelta(seconds=30)
+# Ishlayotgan workerlar to‘xtab qolgan worker yozuvlarini shu oraliqda navbatga qaytaradi (requeue_stale)
+SUBMISSION_REQUEUE_INTERVAL = timedelta(minutes=1)
+
+
+def enqueue_submission(student, quiz, data):
+    return QuizSubmission.objects.create(student=student, quiz=quiz, data=data)
+
+
+def claim_batch(limit=SUBMISSION_BATCH_SIZE):
+    # Bir nechta worker bir xil yozuvni olmasligi uchun SKIP LOCKED (qo‘llab-quvvatlansa). U bo‘lmasa (SQLite)
+    # ikki worker bir xil idlarni o‘qishi mumkin — har bir yozuv status='pending' sharti bilan alohida olinadi
+    # va faqat haqiqatan yangilanganlari qaytariladi
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        pending = QuizSubmission.objects.filter(status='pending').filter(
+            Q(retry_at__isnull=True) | Q(retry_at__lte=now())
+        ).order_by('id')
+        if skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        ids = list(pending.values_list('id', flat=True)[:limit])
+        claim = {'status': 'processing', 'started_at': now(), 'attempts': F('attempts') + 1}
+        if skip_locked:
+            QuizSubmission.objects.filter(id__in=ids, status='pending').update(**claim)
+        else:
+            ids = [pk for pk in ids if QuizSubmission.objects.filter(id=pk, status='pending').update(**claim)]
+    return ids
+
+
+def process_batch(ids):
+    submissions = list(QuizSubmission.objects.filter(id__in=ids).order_by('id'))
+    by_quiz = defaultdict(list)
+    for submission in submissions:
+        by_quiz[submission.quiz_id].append(submission)
+
+    quizzes = Quiz.objects.in_bulk(list(by_quiz))
+    for quiz_id, items in by_quiz.items():
+        quiz = quizzes[quiz_id]
+        try:
+            graded = grade_submission_batch(quiz, [(item.student_id, item.data) for item in items])
+        except Exception as exc:
+            if len(items) == 1:
+                _mark_failed(items[0], exc)
+            else:
+                # Partiyani bitta yozuv buzgan bo‘lishi mumkin — qolganlari alohida baholanadi
+                for item in items:
+                    _grade_one(quiz, item)
+        else:
+            for item in items:
+                _mark_done(item, graded[item.student_id][0])
+        QuizSubmission.objects.bulk_update(items, ['status', 'result', 'error', 'retry_at', 'processed_at'])
+    return len(submissions)
+
+
+def _grade_one(quiz, item):
+    try:
+        graded = grade_submission_batch(quiz, [(item.student_id, item.data)])
+    except Exception as exc:
+        _mark_failed(item, exc)
+    else:
+        _mark_done(item, graded[item.student_id][0])
+
+
+def _mark_done(item, result):
+    item.status, item.result, item.error, item.retry_at, item.processed_at = 'done', result, '', None, now()
+
+
+def _mark_failed(item, exc):
+    # Urinishlar tugamagan bo‘lsa yozuv kutish bilan navbatga qaytadi (o‘quvchi sahifasi kutishda davom etadi)
+    item.error, item.processed_at = str(exc), now()
+    if item.attempts < SUBMISSION_MAX_ATTEMPTS:
+        item.status, item.retry_at = 'pending', item.processed_at + SUBMISSION_RETRY_AFTER * item.attempts
+    else:
+        item.status, item.retry_at = 'failed', None
+
+
+def requeue_stale():
+    # To‘xtab qolgan worker olgan yozuvlar navbatga qaytariladi, urinishlari tugaganlari xato deb belgilanadi
+    stale = QuizSubmission.objects.filter(status='processing', started_at__lt=now() - SUBMISSION_STALE_AFTER)
+    stale.filter(attempts__gte=SUBMISSION_MAX_ATTEMPTS).update(
+        status='failed', error="Worker baholashni yakunlamadi", processed_at=now()
+    )
+    return stale.update(status='pending', started_at=None)
+
+
+def run_worker(batch_size=SUBMISSION_BATCH_SIZE, idle_sleep=1.0, once=False, stop=None):
+    processed = 0
+    requeued_at = None
+    try:
+        while stop is None or not stop.is_set():
+            # Partiya o‘rtasida to‘xtagan worker yozuvlari qayta ishga tushirishni kutmasdan navbatga qaytadi
+            if requeued_at is None or time.monotonic() - requeued_at >= SUBMISSION_REQUEUE_INTERVAL.total_seconds():
+                requeue_stale()
+                requeued_at = time.monotonic()
+            ids = claim_batch(batch_size)
+            if ids:
+                processed += process_batch(ids)
+                continue
+            if once:
+                break
+            time.sleep(idle_sleep)
+    finally:
+        connection.close()
+    return processed
+
+
+def submission_status(submission):
+    return {
+        'status': submission.status,
+        'done': submission.status == 'done',
+        'failed': submission.status == 'failed',
+        'ahead': QuizSubmission.objects.filter(status='pending', id__lt=submission.id).count()
+        if submission.status == 'pending' else 0,
+    }
@@ -0,0 +1,238 @@
+import threading
+from collections import namedtuple, OrderedDict
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import Quiz, StudentQuizResult, StudentAnswer
+from .quiz_versions import build_snapshot, current_version_id, load_version_questions, publish_version
+from .scores import defer_refresh, schedule_score_refresh
+from .rollups import schedule_quiz_completion
+from .notifications import schedule_notification_bump
+
+# question_ids: savollar tartibi; options: savol -> javob idlari; correct: savol -> to‘g‘ri javob idlari
+AnswerKey = namedtuple('AnswerKey', ['question_ids', 'options', 'correct'])
+
+ANSWER_KEY_LRU_SIZE = 256
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+
+_answer_keys = OrderedDict()
+_answer_keys_lock = threading.Lock()
+
+
+def _answer_key_rows(questions):
+    # questions: versiya surati (main/quiz_versions.py). Umumiy keshga pickle qilinadigan ixcham ko‘rinish
+    return tuple(
+        (
+            question_id,
+            tuple(answer_id for answer_id, _, _ in answers),
+            tuple(answer_id for answer_id, _, is_correct in answers if is_correct),
+        )
+        for question_id, _, answers in questions
+    )
+
+
+def _build_answer_key(rows):
+    return AnswerKey(
+        tuple(question_id for question_id, _, _ in rows),
+        MappingProxyType({question_id: frozenset(ids) for question_id, ids, _ in rows}),
+        MappingProxyType({question_id: frozenset(ids) for question_id, _, ids in rows}),
+    )
+
+
+def load_answer_key(quiz):
+    # Bazadagi hozirgi holat bo‘yicha (keshsiz, versiya yaratmasdan)
+    return _build_answer_key(_answer_key_rows(build_snapshot(quiz)))
+
+
+def get_version_answer_key(version_id):
+    # Versiya o‘zgarmaydi: kalit avval jarayon LRU, keyin umumiy keshdan, oxirida versiya suratidan olinadi
+    with _answer_keys_lock:
+        key = _answer_keys.get(version_id)
+        if key is not None:
+            _answer_keys.move_to_end(version_id)
+            return key
+
+    cache_key = f'answer_key:v{version_id}'
+    rows = cache.get(cache_key)
+    if rows is None:
+        rows = _answer_key_rows(load_version_questions(version_id))
+        cache.set(cache_key, rows, timeout=ANSWER_KEY_TIMEOUT)
+    key = _build_answer_key(rows)
+
+    with _answer_keys_lock:
+        _answer_keys[version_id] = key
+        _answer_keys.move_to_end(version_id)
+        while len(_answer_keys) > ANSWER_KEY_LRU_SIZE:
+            _answer_keys.popitem(last=False)
+    return key
+
+
+def get_answer_key(quiz):
+    return get_version_answer_key(current_version_id(quiz))
+
+
+def publish_quizzes(quiz_ids):
+    # Yangi versiya yaratilsa (faqat matn tuzatilganda ham) natijalar darhol unga o‘tkaziladi: savollar tahlili va
+    # natijalar sahifasi joriy versiya natijalarini o‘qiydi
+    for quiz in Quiz.objects.filter(id__in=quiz_ids):
+        previous_id = quiz.current_version_id
+        if publish_version(quiz).pk != previous_id:
+            rescore_quiz_results(quiz)
+
+
+def schedule_version_publish(quiz_ids):
+    defer_refresh('quiz_versions', quiz_ids, publish_quizzes)
+
+
+def touch_quizzes(quiz_ids):
+    # Savol yoki javob o‘zgarsa ularni ishlatadigan testlarning yangi versiyasi yaratiladi
+    Quiz.objects.filter(id__in=quiz_ids).update(updated_at=now())
+    publish_quizzes(quiz_ids)
+
+
+def schedule_quiz_touch(quiz_ids):
+    defer_refresh('answer_keys', quiz_ids, touch_quizzes)
+
+
+def parse_selections(key, data):
+    # Formadagi question_<id> qiymatlari faqat shu savolning javoblari bo‘lsa qabul qilinadi
+    selections = {}
+    for question_id in key.question_ids:
+        value = data.get(f'question_{question_id}')
+        try:
+            answer_id = int(value)
+        except (TypeError, ValueError):
+            answer_id = None
+        selections[question_id] = answer_id if answer_id in key.options[question_id] else None
+    return selections
+
+
+def count_correct(key, selections):
+    return sum(
+        1 for question_id, answer_id in selections.items()
+        if answer_id is not None and answer_id in key.correct.get(question_id, ())
+    )
+
+
+def pack_selections(selections):
+    # Natijada saqlanadigan ixcham ko‘rinish: {"savol_id": javob_id yoki null} savollar tartibida (JSON kalitlari satr)
+    return {str(question_id): answer_id for question_id, answer_id in selections.items()}
+
+
+def result_selections(result):
+    return {int(question_id): answer_id for question_id, answer_id in result.selections.items()}
+
+
+def count_result_correct(key, result):
+    return count_correct(key, result_selections(result))
+
+
+def _answer_rows(result, selections):
+    # settings.QUIZ_ANSWER_ROWS yoqilgan bo‘lsa eski StudentAnswer qatorlari ham yoziladi
+    return [
+        StudentAnswer(result=result, question_id=question_id, selected_answer_id=answer_id)
+        for question_id, answer_id in selections.items()
+    ]
+
+
+def quiz_score(correct_count, total_questions, max_score):
+    return round((correct_count / total_questions) * max_score) if total_questions else 0
+
+
+def grade_submission(student, quiz, data, key=None):
+    # Kalit bir marta yuklanadi, javoblar xotirada tekshiriladi va hammasi bitta tranzaksiyada yoziladi
+    version_id = current_version_id(quiz)
+    if key is None:
+        key = get_version_answer_key(version_id)
+    selections = parse_selections(key, data)
+    correct_count = count_correct(key, selections)
+    total_questions = len(key.question_ids)
+    score = quiz_score(correct_count, total_questions, quiz.max_score)
+
+    with transaction.atomic():
+        StudentQuizResult.objects.filter(student=student, quiz=quiz).delete()
+        result = StudentQuizResult.objects.create(
+            student=student,
+            quiz=quiz,
+            version_id=version_id,
+            score=score,
+            correct_count=correct_count,
+            selections=pack_selections(selections),
+            quiz_last_updated=quiz.updated_at
+        )
+        if settings.QUIZ_ANSWER_ROWS:
+            StudentAnswer.objects.bulk_create(_answer_rows(result, selections))
+
+    return result, correct_count, total_questions
+
+
+def grade_submission_batch(quiz, entries):
+    # entries: [(student_id, forma ma’lumotlari)] — bitta test bo‘yicha ko‘p topshirish bitta tranzaksiyada.
+    # Bir o‘quvchidan bir nechta bo‘lsa oxirgisi hisoblanadi. Qaytadi: {student_id: (result, correct_count, total)}
+    version_id = current_version_id(quiz)
+    key = get_version_answer_key(version_id)
+    total_questions = len(key.question_ids)
+    latest = dict(entries)
+
+    graded = {}
+    for student_id, data in latest.items():
+        selections = parse_selections(key, data)
+        correct_count = count_correct(key, selections)
+        result = StudentQuizResult(
+            student_id=student_id,
+            quiz=quiz,
+            version_id=version_id,
+            score=quiz_score(correct_count, total_questions, quiz.max_score),
+            correct_count=correct_count,
+            selections=pack_selections(selections),
+            quiz_last_updated=quiz.updated_at,
+        )
+        graded[student_id] = (result, correct_count, total_questions, selections)
+
+    with transaction.atomic():
+        StudentQuizResult.objects.filter(quiz=quiz, student_id__in=list(graded)).delete()
+        StudentQuizResult.objects.bulk_create([result for result, _, _, _ in graded.values()])
+        if settings.QUIZ_ANSWER_ROWS:
+            StudentAnswer.objects.bulk_create([
+                row for result, _, _, selections in graded.values() for row in _answer_rows(result, selections)
+            ], batch_size=1000)
+
+        # bulk_create signal yubormaydi — reyting, statistika va bildirishnomalar alohida yangilanadi
+        schedule_score_refresh(graded)
+        schedule_quiz_completion([quiz.pk])
+        schedule_notification_bump(graded)
+
+    return {student_id: (result, correct_count, total) for student_id, (result, correct_count, total, _) in graded.items()}
+
+
+def rescore_quiz_results(quiz):
+    # Tahrirlangan test bo‘yicha mavjud natijalar o‘chirilmaydi, saqlangan javoblar asosida joriy versiya
+    # kaliti bilan qayta baholanadi va shu versiyaga o‘tkaziladi. Qaytadi: bali o‘zgargan natijalar soni
+    version_id = current_version_id(quiz)
+    key = get_version_answer_key(version_id)
+    total_questions = len(key.question_ids)
+
+    results = list(StudentQuizResult.objects.filter(quiz=quiz).only(
+        'id', 'student_id', 'version', 'score', 'correct_count', 'selections', 'quiz_last_updated'
+    ))
+    changed, changed_students = 0, set()
+    for result in results:
+        result.correct_count = count_result_correct(key, result)
+        score = quiz_score(result.correct_count, total_questions, quiz.max_score)
+        if score != result.score:
+            changed += 1
+            changed_students.add(result.student_id)
+            result.score = score
+        result.version_id = version_id
+        result.quiz_last_updated = quiz.updated_at
+
+    with transaction.atomic():
+        StudentQuizResult.objects.bulk_update(results, ['version', 'score', 'correct_count', 'quiz_last_updated'], batch_size=500)
+        # bulk_update signal yubormaydi — reyting jadvali alohida yangilanadi
+        schedule_score_refresh(changed_students)
+
+    return changed
@@ -0,0 +1,178 @@
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils.timezone import now
+
+from .grading import get_version_answer_key
+from .quiz_versions import current_version_id
+from .models import Quiz, StudentQuizResult, QuizAnalysis, QuestionStatistic
+
+# Savollar tahlili: qiyinlik (p-value), ajrata olish (point-biserial), variantlar tanlanishi va Cronbach alpha.
+# Natijalardagi ixcham tanlovlar (selections) bitta so‘rovda NumPy massivlariga yuklanib vektor ko‘rinishda hisoblanadi
+EASY_P_VALUE = 0.9
+HARD_P_VALUE = 0.2
+WEAK_DISCRIMINATION = 0.1
+
+
+def _load_matrix(quiz, key, version_id):
+    # Qaytadi: (tanlangan javob idlari matritsasi [o‘quvchi x savol], 0 — javob berilmagan).
+    # Faqat kalit olingan versiya natijalari: boshqa versiyada savol va javob idlari boshqa bo‘lishi mumkin
+    packed = list(
+        StudentQuizResult.objects.filter(quiz=quiz, version_id=version_id).order_by('id').values_list('id', 'selections')
+    )
+    result_ids = np.fromiter((result_id for result_id, _ in packed), dtype=np.int64, count=len(packed))
+    lengths = np.fromiter((len(selections) for _, selections in packed), dtype=np.int64, count=len(packed))
+    data = np.column_stack((
+        np.repeat(result_ids, lengths),
+        np.fromiter(map(int, chain.from_iterable(selections for _, selections in packed)), dtype=np.int64),
+        np.fromiter((answer_id or 0 for _, selections in packed for answer_id in selections.values()), dtype=np.int64),
+    ))
+    question_ids = np.array(key.question_ids, dtype=np.int64)
+
+    order = np.argsort(question_ids)
+    sorted_questions = question_ids[order]
+
+    matrix = np.zeros((len(result_ids), len(question_ids)), dtype=np.int64)
+    if len(data) and len(question_ids):
+        rows_at = np.searchsorted(result_ids, data[:, 0])
+        columns_at = np.searchsorted(sorted_questions, data[:, 1])
+        columns_at[columns_at == len(sorted_questions)] = 0
+        # Testdan olib tashlangan savollarga berilgan javoblar hisobga olinmaydi
+        known = (sorted_questions[columns_at] == data[:, 1]) & (rows_at < len(result_ids))
+        matrix[rows_at[known], order[columns_at[known]]] = data[known, 2]
+    return matrix
+
+
+def compute_item_statistics(matrix, key):
+    # matrix: [o‘quvchi x savol] tanlangan javob idlari. Qaytadi: lug‘at (NumPy massivlari)
+    n_students, n_items = matrix.shape
+    correct_ids = np.fromiter(chain.from_iterable(key.correct[q] for q in key.question_ids), dtype=np.int64)
+    scored = np.isin(matrix, correct_ids) & (matrix > 0)
+    totals = scored.sum(axis=1)
+
+    p_values = scored.mean(axis=0) if n_students else np.zeros(n_items)
+
+    # Savol va qolgan savollar bali (savolning o‘zi chiqarib tashlanadi) o‘rtasidagi korrelyatsiya
+    items = scored.astype(np.float64)
+    rest = totals[:, None] - items
+    items_c = items - items.mean(axis=0) if n_students else items
+    rest_c = rest - rest.mean(axis=0) if n_students else rest
+    denominator = np.sqrt((items_c ** 2).sum(axis=0) * (rest_c ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        discrimination = np.where(denominator > 0, (items_c * rest_c).sum(axis=0) / denominator, np.nan)
+
+    alpha = np.nan
+    if n_items > 1 and n_students > 1:
+        total_variance = totals.var(ddof=1)
+        if total_variance > 0:
+            alpha = n_items / (n_items - 1) * (1 - items.var(axis=0, ddof=1).sum() / total_variance)
+
+    # Variantlar: barcha javob idlari bitta tartiblangan massivda, tanlovlar bincount bilan sanaladi
+    option_ids = np.sort(np.fromiter(chain.from_iterable(key.options[q] for q in key.question_ids), dtype=np.int64))
+    chosen = matrix[matrix > 0]
+    chosen = chosen[np.isin(chosen, option_ids)]
+    option_counts = np.bincount(np.searchsorted(option_ids, chosen), minlength=len(option_ids))
+    omitted = (matrix == 0).sum(axis=0)
+
+    return {
+        'respondents': n_students,
+        'p_values': p_values,
+        'discrimination': discrimination,
+        'alpha': alpha,
+        'option_ids': option_ids,
+        'option_counts': option_counts,
+        'omitted': omitted,
+    }
+
+
+def _float_or_none(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def analyze_quiz(quiz):
+    version_id = current_version_id(quiz)
+    key = get_version_answer_key(version_id)
+    stats = compute_item_statistics(_load_matrix(quiz, key, version_id), key)
+    respondents = stats['respondents']
+    counts = dict(zip(stats['option_ids'].tolist(), stats['option_counts'].tolist()))
+
+    statistics = []
+    for position, question_id in enumerate(key.question_ids):
+        statistics.append(QuestionStatistic(
+            question_id=question_id,
+            position=position,
+            p_value=round(float(stats['p_values'][position]), 4),
+            discrimination=_float_or_none(stats['discrimination'][position]),
+            omitted_share=round(stats['omitted'][position] / respondents, 4) if respondents else 0,
+            option_shares={
+                str(answer_id): round(counts.get(answer_id, 0) / respondents, 4) if respondents else 0
+                for answer_id in sorted(key.options[question_id])
+            },
+        ))
+
+    with transaction.atomic():
+        analysis, _ = QuizAnalysis.objects.update_or_create(quiz=quiz, defaults={
+            'respondents': respondents,
+            'cronbach_alpha': _float_or_none(stats['alpha']),
+            'version_id': version_id,
+            'computed_at': now(),
+        })
+        QuestionStatistic.objects.filter(analysis=analysis).delete()
+        for statistic in statistics:
+            statistic.analysis = analysis
+        QuestionStatistic.objects.bulk_create(statistics, batch_size=500)
+    return analysis
+
+
+def is_stale(analysis, quiz, respondents, last_submitted_at):
+    # Test yangi versiyaga o‘tgan yoki tahlildan keyin yangi natija kelgan bo‘lsa qayta hisoblanadi.
+    # respondents va last_submitted_at — joriy versiya natijalari bo‘yicha (analyze_quiz bilan bir xil)
+    return (
+        analysis is None
+        or analysis.version_id != quiz.current_version_id
+        or analysis.respondents != respondents
+        or (last_submitted_at is not None and last_submitted_at > analysis.computed_at)
+    )
+
+
+def get_quiz_analysis(quiz, respondents, last_submitted_at):
+    analysis = QuizAnalysis.objects.filter(quiz=quiz).first()
+    if is_stale(analysis, quiz, respondents, last_submitted_at):
+        analysis = analyze_quiz(quiz)
+    return analysis
+
+
+def analyze_quizzes(quiz_ids=None, only_stale=True):
+    # Barcha (yoki berilgan) natijali testlar tahlili. Qaytadi: qayta hisoblangan testlar soni
+    current = Q(studentquizresult__version_id=F('current_version_id'))
+    quizzes = Quiz.objects.annotate(
+        results=Count('studentquizresult'),
+        respondents=Count('studentquizresult', filter=current),
+        last_submitted_at=Max('studentquizresult__submitted_at', filter=current),
+    ).filter(results__gt=0).select_related('analysis')
+    if quiz_ids:
+        quizzes = quizzes.filter(id__in=quiz_ids)
+
+    analyzed = 0
+    for quiz in quizzes:
+        analysis = getattr(quiz, 'analysis', None)
+        if only_stale and not is_stale(analysis, quiz, quiz.respondents, quiz.last_submitted_at):
+            continue
+        analyze_quiz(quiz)
+        analyzed += 1
+    return analyzed
+
+
+def item_flag(statistic):
+    # O‘qituvchiga ko‘rsatiladigan belgi. Deyarli hamma topgan savolda korrelyatsiya tasodifiy, shuning uchun avval qiyinlik
+    if statistic.p_value >= EASY_P_VALUE:
+        return 'Juda oson'
+    if statistic.discrimination is not None and statistic.discrimination < 0:
+        return 'Noto‘g‘ri ishlayapti'
+    if statistic.p_value <= HARD_P_VALUE:
+        return 'Juda qiyin'
+    if statistic.discrimination is not None and statistic.discrimination < WEAK_DISCRIMINATION:
+        return 'Kuchsiz ajratadi'
+    return ''
@@ -0,0 +1,96 @@
+import logging
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+
+logger = logging.getLogger(__name__)
+
+# Jarayon bo‘yicha yig‘ma statistika: view -> processor -> {'offered', 'evaluated', 'queries'}
+CONTEXT_PROFILE = defaultdict(lambda: defaultdict(lambda: {'offered': 0, 'evaluated': 0, 'queries': 0}))
+
+
+def _request_state(request):
+    state = getattr(request, '_lazy_context', None)
+    if state is None:
+        state = request._lazy_context = {'values': {}, 'offered': set(), 'evaluated': {}}
+    return state
+
+
+def _evaluate(request, name, compute):
+    # Bitta so‘rov ichida har bir processor ko‘pi bilan bir marta hisoblanadi
+    state = _request_state(request)
+    if name not in state['values']:
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            state['values'][name] = compute(request) or {}
+        state['evaluated'][name] = {
+            'queries': len(queries),
+            'ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+    return state['values'][name]
+
+
+def lazy_context(name, keys, when=None):
+    # Processor qiymatlari shablon ularga murojaat qilgandagina hisoblanadi.
+    # when(request) False qaytarsa (masalan, rol mos kelmasa) kontekstga hech narsa qo‘shilmaydi
+    def decorator(compute):
+        @wraps(compute)
+        def processor(request):
+            if when is not None and not when(request):
+                return {}
+            _request_state(request)['offered'].add(name)
+            return {
+                key: SimpleLazyObject(lambda key=key: _evaluate(request, name, compute)[key])
+                for key in keys
+            }
+        return processor
+    return decorator
+
+
+class ContextProfileMiddleware:
+    # CONTEXT_PROFILE=True bo‘lsa, har bir view uchun qaysi processorlar hisoblangani yoziladi
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(settings, 'CONTEXT_PROFILE', False):
+            self.record(request)
+        return response
+
+    def record(self, request):
+        state = getattr(request, '_lazy_context', None)
+        if state is None:
+            return
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        profile = CONTEXT_PROFILE[view]
+        for name in state['offered']:
+            entry = profile[name]
+            entry['offered'] += 1
+            if name in state['evaluated']:
+                entry['evaluated'] += 1
+                entry['queries'] += state['evaluated'][name]['queries']
+        logger.info(
+            'context profile view=%s evaluated=%s skipped=%s',
+            view,
+            state['evaluated'],
+            sorted(state['offered'] - set(state['evaluated'])),
+        )
+
+
+def context_profile_report():
+    return {
+        view: {name: dict(entry) for name, entry in processors.items()}
+        for view, processors in CONTEXT_PROFILE.items()
+    }
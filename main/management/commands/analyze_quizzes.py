@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.item_analysis import analyze_quizzes
+
+
+class Command(BaseCommand):
+    help = "Testlar bo‘yicha savollar tahlilini (p-value, point-biserial, variantlar, Cronbach alpha) hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, action='append', dest='quiz_ids', help="Faqat shu test(lar)")
+        parser.add_argument('--all', action='store_true', help="Eskirmagan tahlillarni ham qayta hisoblash")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        analyzed = analyze_quizzes(options['quiz_ids'], only_stale=not options['all'])
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"Tahlil qilingan testlar: {analyzed} ({elapsed:.0f} ms)")
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from main.grading import grade_submission
+from main.models import CustomUser, Group, Quiz, Answer, StudentQuizResult, StudentAnswer
+from main.question_bank import add_to_quiz
+
+
+def legacy_submit(student, quiz, data):
+    # Avvalgi submit_quiz: har bir savol uchun alohida SELECT va INSERT
+    StudentQuizResult.objects.filter(student=student, quiz=quiz).delete()
+    correct_count = 0
+    result = StudentQuizResult.objects.create(student=student, quiz=quiz, score=0, quiz_last_updated=quiz.updated_at)
+    for question in quiz.questions.all():
+        selected_answer = Answer.objects.filter(id=data.get(f'question_{question.id}')).first()
+        StudentAnswer.objects.create(result=result, question=question, selected_answer=selected_answer)
+        if selected_answer and selected_answer.is_correct:
+            correct_count += 1
+    total_questions = quiz.questions.count()
+    result.score = round((correct_count / total_questions) * quiz.max_score) if total_questions else 0
+    result.save()
+    return result
+
+
+class Command(BaseCommand):
+    help = "submit_quiz yozish yo‘lini o‘lchaydi (ma’lumotlar oxirida rollback qilinadi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--answers', type=int, default=4)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options['questions'], options['answers'], options['runs'])
+            transaction.set_rollback(True)
+
+    def run(self, n_questions, n_answers, runs):
+        teacher = CustomUser.objects.create(username='bench_teacher', role='teacher')
+        student = CustomUser.objects.create(username='bench_student', role='student')
+        group = Group.objects.create(name='bench')
+        quiz = Quiz.objects.create(title='bench', group=group, teacher=teacher)
+
+        add_to_quiz(quiz, [
+            (f'q{i}', [(f'a{j}', j == 0) for j in range(n_answers)]) for i in range(n_questions)
+        ])
+        answers = {}
+        for answer_id, question_id in Answer.objects.filter(question__quiz_items__quiz=quiz).values_list('id', 'question_id'):
+            answers.setdefault(question_id, []).append(answer_id)
+        rnd = random.Random(0)
+        data = {f'question_{question_id}': str(rnd.choice(ids)) for question_id, ids in answers.items()}
+
+        self.stdout.write(f"{n_questions} savol x {n_answers} javob, {runs} marta")
+        for name, submit in (('legacy', legacy_submit), ('bulk', grade_submission)):
+            timings = []
+            for _ in range(runs):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    submit(student, quiz, data)
+                    timings.append(time.perf_counter() - started)
+            timings.sort()
+            self.stdout.write(
+                f"{name:>7}: {len(queries):4d} so‘rov, "
+                f"median {timings[len(timings) // 2] * 1000:.2f} ms, "
+                f"min {timings[0] * 1000:.2f} ms"
+            )
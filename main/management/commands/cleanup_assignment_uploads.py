@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from main.assignment_upload import cleanup_stale_uploads, UPLOAD_STALE_AFTER
+
+
+class Command(BaseCommand):
+    help = "Tugallanmagan bo‘laklab yuklashlarni va ularning vaqtinchalik fayllarini o‘chiradi (cron orqali kuniga bir marta)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=int(UPLOAD_STALE_AFTER.total_seconds() // 3600),
+                            help="Shuncha soatdan beri davom ettirilmagan yuklashlar o‘chiriladi")
+
+    def handle(self, *args, **options):
+        removed = cleanup_stale_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(f"O‘chirilgan yuklashlar: {removed}")
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from main.direct_upload import cleanup_direct_uploads
+from main.assignment_upload import UPLOAD_STALE_AFTER
+
+
+class Command(BaseCommand):
+    help = "Yakunlanmagan bucketga yuklashlarni va ularning bucketdagi obyektlarini o‘chiradi (cron orqali kuniga bir marta)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=int(UPLOAD_STALE_AFTER.total_seconds() // 3600),
+                            help="Shuncha soatdan beri yakunlanmagan yuklashlar o‘chiriladi")
+
+    def handle(self, *args, **options):
+        removed = cleanup_direct_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(f"O‘chirilgan yuklashlar: {removed}")
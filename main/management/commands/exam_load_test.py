@@ -0,0 +1,104 @@
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+
+from main.exam_queue import run_worker
+from main.models import CustomUser, Group, GroupStudentMembership, Quiz, Answer, QuizSubmission
+from main.question_bank import add_to_quiz
+
+
+class Command(BaseCommand):
+    help = "Imtihon rejimida N ta o‘quvchining bir vaqtda submit_quiz qilishini simulyatsiya qiladi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=150)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=4, help="Navbatni baholovchi workerlar soni (0 — baholamaslik)")
+        parser.add_argument('--keep', action='store_true', help="Yaratilgan test ma’lumotlarini o‘chirmaslik")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        quiz, students = self.create_exam(tag, options['students'], options['questions'])
+        try:
+            self.run(quiz, students, options)
+        finally:
+            if not options['keep']:
+                quiz.group.delete()
+                CustomUser.objects.filter(username__startswith=f'loadtest_{tag}_').delete()
+
+    def create_exam(self, tag, n_students, n_questions):
+        teacher = CustomUser.objects.create(username=f'loadtest_{tag}_teacher', role='teacher')
+        group = Group.objects.create(name=f'loadtest {tag}')
+        students = CustomUser.objects.bulk_create([
+            CustomUser(username=f'loadtest_{tag}_{i}', role='student') for i in range(n_students)
+        ])
+        for student in students:
+            GroupStudentMembership.objects.create(student=student, group=group)
+        quiz = Quiz.objects.create(title=f'loadtest {tag}', group=group, teacher=teacher, exam_mode=True)
+        add_to_quiz(quiz, [(f'q{i}', [(f'a{j}', j == 0) for j in range(4)]) for i in range(n_questions)])
+        return Quiz.objects.get(pk=quiz.pk), students
+
+    def run(self, quiz, students, options):
+        options_by_question = {}
+        for answer_id, question_id in Answer.objects.filter(question__quiz_items__quiz=quiz).values_list('id', 'question_id'):
+            options_by_question.setdefault(question_id, []).append(answer_id)
+
+        queue = list(students)
+        lock = threading.Lock()
+        latencies, errors = [], []
+
+        def submitter():
+            rnd = random.Random()
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        if not queue:
+                            return
+                        student = queue.pop()
+                    client.force_login(student)
+                    data = {f'question_{q}': str(rnd.choice(ids)) for q, ids in options_by_question.items()}
+                    started = time.perf_counter()
+                    response = client.post(f'/quiz/{quiz.id}/submit/', data)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code != 302:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        self.stdout.write(f"{len(students)} o‘quvchi, {len(options_by_question)} savol, {options['concurrency']} parallel")
+        started = time.perf_counter()
+        threads = [threading.Thread(target=submitter) for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        accepted = time.perf_counter() - started
+
+        latencies.sort()
+        self.stdout.write(
+            f"Qabul qilish: {accepted:.2f} s, median {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, xatolar: {len(errors)}"
+        )
+
+        if options['workers']:
+            started = time.perf_counter()
+            workers = [threading.Thread(target=run_worker, kwargs={'once': True}) for _ in range(options['workers'])]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            counts = {
+                status: QuizSubmission.objects.filter(quiz=quiz, status=status).count()
+                for status in ('pending', 'processing', 'done', 'failed')
+            }
+            self.stdout.write(f"Baholash: {time.perf_counter() - started:.2f} s, {counts}")
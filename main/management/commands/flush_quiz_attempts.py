@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main.attempts import flush_attempt_buffers
+
+
+class Command(BaseCommand):
+    help = "Keshdagi avtosaqlangan test javoblarini bazaga yozadi (cron orqali har daqiqada)"
+
+    def handle(self, *args, **options):
+        flushed = flush_attempt_buffers()
+        self.stdout.write(f"Yozilgan urinishlar: {flushed}")
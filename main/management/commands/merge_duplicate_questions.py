@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from main.grading import rescore_quiz_results
+from main.models import Quiz
+from main.question_bank import merge_duplicates, delete_orphan_questions
+
+
+class Command(BaseCommand):
+    help = "Savollar bankidagi bir xil mazmunli (content_hash) savollarni bitta yozuvga birlashtiradi va hech bir testda " \
+           "ishlatilmaydigan savollarni o‘chiradi"
+
+    def handle(self, *args, **options):
+        removed, quiz_ids = merge_duplicates()
+        # Savol idlari o‘zgargan testlarda natijalar yangi versiyaga moslanadi (qayta topshirish talab qilinmaydi)
+        for quiz in Quiz.objects.filter(id__in=quiz_ids):
+            rescore_quiz_results(quiz)
+        orphans = delete_orphan_questions()
+        self.stdout.write(f"Birlashtirilgan savollar: {removed}, yangilangan testlar: {len(quiz_ids)}, "
+                          f"o‘chirilgan ishlatilmaydigan savollar: {orphans}")
@@ -0,0 +1,40 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from main.exam_queue import run_worker, requeue_stale, SUBMISSION_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Imtihon rejimidagi test topshirishlarini navbatdan olib partiyalab baholaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=SUBMISSION_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=1.0, help="Navbat bo‘sh bo‘lganda kutish (soniya)")
+        parser.add_argument('--once', action='store_true', help="Navbat bo‘shagach to‘xtash")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f"Navbatga qaytarildi: {requeued}")
+
+        stop = threading.Event()
+        totals = []
+
+        def worker():
+            totals.append(run_worker(options['batch_size'], options['sleep'], options['once'], stop))
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(options['workers'])]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(f"Baholangan topshirishlar: {sum(totals)}")
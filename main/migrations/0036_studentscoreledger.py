@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def _sum_by_student(queryset, value_field):
+    rows = queryset.order_by().values('student_id').annotate(total=Sum(value_field)).values_list('student_id', 'total')
+    return {student_id: total or 0 for student_id, total in rows}
+
+
+def fill_score_ledger(apps, schema_editor):
+    GroupStudentMembership = apps.get_model('main', 'GroupStudentMembership')
+    StudentQuizResult = apps.get_model('main', 'StudentQuizResult')
+    AssignmentSubmission = apps.get_model('main', 'AssignmentSubmission')
+    StudentScoreLedger = apps.get_model('main', 'StudentScoreLedger')
+
+    memberships = GroupStudentMembership.objects.filter(student__role='student')
+    student_ids = set(memberships.values_list('student_id', flat=True))
+
+    quiz_max = _sum_by_student(memberships.filter(group__quiz__created_at__gte=F('joined_at')), 'group__quiz__max_score')
+    assignment_max = _sum_by_student(memberships.filter(group__assignment__created_at__gte=F('joined_at')), 'group__assignment__max_score')
+    quiz_earned = _sum_by_student(StudentQuizResult.objects.filter(
+        quiz__group__groupstudentmembership__student=F('student'),
+        quiz__created_at__gte=F('quiz__group__groupstudentmembership__joined_at'),
+    ), 'score')
+    assignment_earned = _sum_by_student(AssignmentSubmission.objects.filter(
+        grade__isnull=False,
+        assignment__group__groupstudentmembership__student=F('student'),
+        assignment__created_at__gte=F('assignment__group__groupstudentmembership__joined_at'),
+    ), 'grade')
+
+    entries = []
+    for student_id in student_ids:
+        earned = quiz_earned.get(student_id, 0) + assignment_earned.get(student_id, 0)
+        total = quiz_max.get(student_id, 0) + assignment_max.get(student_id, 0)
+        entries.append(StudentScoreLedger(
+            student_id=student_id,
+            earned_points=earned,
+            max_points=total,
+            percent=round((earned / total) * 100, 2) if total else 0,
+        ))
+    StudentScoreLedger.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0035_studentpayment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentScoreLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('earned_points', models.PositiveIntegerField(default=0, verbose_name='To‘plangan ball')),
+                ('max_points', models.PositiveIntegerField(default=0, verbose_name='Maksimal ball')),
+                ('percent', models.FloatField(default=0, verbose_name='Foiz')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='score_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reyting balli',
+                'verbose_name_plural': 'Reyting ballari',
+                'indexes': [models.Index(fields=['-percent', 'student'], name='score_ledger_rank_idx')],
+            },
+        ),
+        migrations.RunPython(fill_score_ledger, migrations.RunPython.noop),
+    ]
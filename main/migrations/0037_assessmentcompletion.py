@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def _count_by(queryset, key_field):
+    rows = queryset.order_by().values(key_field).annotate(total=Count('student', distinct=True)).values_list(key_field, 'total')
+    return dict(rows)
+
+
+def fill_completion(apps, schema_editor):
+    GroupStudentMembership = apps.get_model('main', 'GroupStudentMembership')
+    AssessmentCompletion = apps.get_model('main', 'AssessmentCompletion')
+
+    entries = []
+    for assessment_type, model_name, done_model_name in (
+        ('quiz', 'Quiz', 'StudentQuizResult'),
+        ('assignment', 'Assignment', 'AssignmentSubmission'),
+    ):
+        model = apps.get_model('main', model_name)
+        done_model = apps.get_model('main', done_model_name)
+        eligible = _count_by(
+            GroupStudentMembership.objects.filter(**{
+                'student__role': 'student',
+                f'group__{assessment_type}__created_at__gte': F('joined_at'),
+            }),
+            f'group__{assessment_type}__id'
+        )
+        completed = _count_by(
+            done_model.objects.filter(**{
+                'student__role': 'student',
+                f'{assessment_type}__group__groupstudentmembership__student': F('student'),
+                f'{assessment_type}__created_at__gte': F(f'{assessment_type}__group__groupstudentmembership__joined_at'),
+            }),
+            f'{assessment_type}_id'
+        )
+        for assessment_id, teacher_id in model.objects.values_list('id', 'teacher_id'):
+            entries.append(AssessmentCompletion(
+                teacher_id=teacher_id,
+                assessment_type=assessment_type,
+                assessment_id=assessment_id,
+                eligible_count=eligible.get(assessment_id, 0),
+                completed_count=completed.get(assessment_id, 0),
+            ))
+    AssessmentCompletion.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0036_studentscoreledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assessment_type', models.CharField(choices=[('quiz', 'Test'), ('assignment', 'Topshiriq')], max_length=20)),
+                ('assessment_id', models.PositiveBigIntegerField()),
+                ('eligible_count', models.PositiveIntegerField(default=0, verbose_name='Topshirishi kerak bo‘lganlar')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='Topshirganlar')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('teacher', models.ForeignKey(limit_choices_to={'role': 'teacher'}, on_delete=django.db.models.deletion.CASCADE, related_name='assessment_completions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bajarilish statistikasi',
+                'verbose_name_plural': 'Bajarilish statistikasi',
+                'indexes': [models.Index(fields=['teacher', 'assessment_type'], name='completion_teacher_idx')],
+                'unique_together': {('assessment_type', 'assessment_id')},
+            },
+        ),
+        migrations.RunPython(fill_completion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_eligibility(apps, schema_editor):
+    GroupStudentMembership = apps.get_model('main', 'GroupStudentMembership')
+    AssessmentEligibility = apps.get_model('main', 'AssessmentEligibility')
+
+    memberships = GroupStudentMembership.objects.filter(student__role='student')
+    entries = []
+    for assessment_type in ('quiz', 'assignment'):
+        rows = memberships.filter(**{
+            f'group__{assessment_type}__created_at__gte': F('joined_at'),
+        }).values_list('student_id', 'group_id', f'group__{assessment_type}__id', f'group__{assessment_type}__created_at')
+        for student_id, group_id, assessment_id, created_at in rows:
+            entries.append(AssessmentEligibility(
+                student_id=student_id,
+                assessment_type=assessment_type,
+                assessment_id=assessment_id,
+                group_id=group_id,
+                eligible_since=created_at,
+            ))
+    AssessmentEligibility.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0037_assessmentcompletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentEligibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assessment_type', models.CharField(choices=[('quiz', 'Test'), ('assignment', 'Topshiriq')], max_length=20)),
+                ('assessment_id', models.PositiveBigIntegerField()),
+                ('eligible_since', models.DateTimeField(verbose_name='Topshirish majburiyati boshlangan vaqt')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.group')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='assessment_eligibilities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Topshirish majburiyati',
+                'verbose_name_plural': 'Topshirish majburiyatlari',
+                'indexes': [models.Index(fields=['assessment_type', 'assessment_id', 'student'], name='eligibility_assessment_idx'), models.Index(fields=['student', 'group'], name='eligibility_membership_idx')],
+                'unique_together': {('student', 'assessment_type', 'assessment_id')},
+            },
+        ),
+        migrations.RunPython(fill_eligibility, migrations.RunPython.noop),
+    ]
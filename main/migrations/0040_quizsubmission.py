@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0039_quizattempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='exam_mode',
+            field=models.BooleanField(default=False, verbose_name='Imtihon rejimi'),
+        ),
+        migrations.CreateModel(
+            name='QuizSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('processing', 'Tekshirilmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='main.quiz')),
+                ('result', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.studentquizresult')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='quiz_submissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Test topshirish navbati',
+                'verbose_name_plural': 'Test topshirish navbati',
+                'indexes': [models.Index(fields=['status', 'id'], name='submission_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Mavjud savollar QuizItem ga ko‘chiriladi. Alohida migratsiya: PostgreSQL da qatorlar yozilgan tranzaksiyada
+# jadvalni o‘zgartirib bo‘lmaydi ("pending trigger events"), shuning uchun question.quiz keyingi migratsiyada olinadi
+
+import hashlib
+import json
+import re
+from collections import defaultdict
+
+from django.db import migrations
+
+_SPACES = re.compile(r'\s+')
+
+
+def _normalize(text):
+    return _SPACES.sub(' ', str(text)).strip()
+
+
+def _content_hash(text, answers):
+    # main/question_bank.content_hash bilan bir xil
+    payload = [_normalize(text), sorted([_normalize(answer), bool(is_correct)] for answer, is_correct in answers)]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def fill_quiz_items(apps, schema_editor):
+    # Mavjud har bir savol o‘z testiga QuizItem orqali bog‘lanadi (tartib — savol id bo‘yicha) va xeshlanadi
+    Question = apps.get_model('main', 'Question')
+    Answer = apps.get_model('main', 'Answer')
+    QuizItem = apps.get_model('main', 'QuizItem')
+
+    answers = defaultdict(list)
+    for question_id, text, is_correct in Answer.objects.values_list('question_id', 'text', 'is_correct'):
+        answers[question_id].append((text, is_correct))
+
+    positions = defaultdict(int)
+    items, questions = [], []
+    for question_id, quiz_id, text in Question.objects.order_by('id').values_list('id', 'quiz_id', 'text'):
+        positions[quiz_id] += 1
+        items.append(QuizItem(quiz_id=quiz_id, question_id=question_id, position=positions[quiz_id]))
+        questions.append(Question(id=question_id, content_hash=_content_hash(text, answers[question_id])))
+
+    QuizItem.objects.bulk_create(items, batch_size=1000)
+    Question.objects.bulk_update(questions, ['content_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0041_question_bank'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_quiz_items, migrations.RunPython.noop),
+    ]
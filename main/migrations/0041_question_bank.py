@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0040_quizsubmission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.CreateModel(
+            name='QuizItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_items', to='main.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='main.quiz')),
+            ],
+            options={
+                'verbose_name': 'Test savoli',
+                'verbose_name_plural': 'Test savollari',
+                'ordering': ('position', 'id'),
+                'unique_together': {('quiz', 'question')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0041_fill_quiz_items'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='question',
+            name='quiz',
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='quizzes',
+            field=models.ManyToManyField(related_name='questions', through='main.QuizItem', to='main.quiz', verbose_name='Testlar'),
+        ),
+    ]
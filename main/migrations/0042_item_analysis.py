@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0041_remove_question_quiz'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('respondents', models.PositiveIntegerField(default=0)),
+                ('cronbach_alpha', models.FloatField(blank=True, null=True)),
+                ('quiz_updated_at', models.DateTimeField()),
+                ('computed_at', models.DateTimeField()),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analysis', to='main.quiz')),
+            ],
+            options={
+                'verbose_name': 'Test tahlili',
+                'verbose_name_plural': 'Test tahlillari',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('p_value', models.FloatField()),
+                ('discrimination', models.FloatField(blank=True, null=True)),
+                ('omitted_share', models.FloatField(default=0)),
+                ('option_shares', models.JSONField(default=dict)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='main.question')),
+                ('analysis', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='main.quizanalysis')),
+            ],
+            options={
+                'verbose_name': 'Savol statistikasi',
+                'verbose_name_plural': 'Savol statistikalari',
+                'ordering': ('position',),
+                'unique_together': {('analysis', 'question')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def pack_answers(apps, schema_editor):
+    # Mavjud StudentAnswer qatorlari natijaning selections ustuniga yig‘iladi, to‘g‘ri javoblar soni hisoblanadi
+    StudentQuizResult = apps.get_model('main', 'StudentQuizResult')
+    StudentAnswer = apps.get_model('main', 'StudentAnswer')
+
+    result_ids = list(StudentQuizResult.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(result_ids), BACKFILL_BATCH_SIZE):
+        batch = result_ids[start:start + BACKFILL_BATCH_SIZE]
+        results = {result_id: StudentQuizResult(id=result_id, selections={}, correct_count=0) for result_id in batch}
+        rows = StudentAnswer.objects.filter(result_id__in=batch).order_by('id').values_list(
+            'result_id', 'question_id', 'selected_answer_id', 'selected_answer__is_correct'
+        )
+        for result_id, question_id, answer_id, is_correct in rows:
+            result = results[result_id]
+            result.selections[str(question_id)] = answer_id
+            result.correct_count += bool(is_correct)
+        StudentQuizResult.objects.bulk_update(list(results.values()), ['selections', 'correct_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0042_item_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentquizresult',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='studentquizresult',
+            name='selections',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(pack_answers, migrations.RunPython.noop),
+    ]
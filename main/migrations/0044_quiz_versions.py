@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:36
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def create_first_versions(apps, schema_editor):
+    # Har bir test hozirgi holatidan 1-versiya sifatida suratga olinadi, mavjud natijalar unga bog‘lanadi
+    # (surat formati main/quiz_versions.build_snapshot bilan bir xil)
+    Quiz = apps.get_model('main', 'Quiz')
+    QuizItem = apps.get_model('main', 'QuizItem')
+    QuizVersion = apps.get_model('main', 'QuizVersion')
+    Answer = apps.get_model('main', 'Answer')
+    StudentQuizResult = apps.get_model('main', 'StudentQuizResult')
+
+    answers = defaultdict(list)
+    for question_id, answer_id, text, is_correct in Answer.objects.order_by('id').values_list('question_id', 'id', 'text', 'is_correct'):
+        answers[question_id].append([answer_id, text, is_correct])
+    questions = defaultdict(list)
+    items = QuizItem.objects.order_by('position', 'id').values_list('quiz_id', 'question_id', 'question__text')
+    for quiz_id, question_id, text in items:
+        questions[quiz_id].append([question_id, text, answers[question_id]])
+
+    for quiz in Quiz.objects.all():
+        version = QuizVersion.objects.create(
+            quiz=quiz, number=1, title=quiz.title, time_limit=quiz.time_limit, max_score=quiz.max_score,
+            questions=questions[quiz.id],
+        )
+        Quiz.objects.filter(pk=quiz.pk).update(current_version=version)
+        StudentQuizResult.objects.filter(quiz=quiz).update(version=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0043_packed_selections'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='quizanalysis',
+            name='quiz_updated_at',
+        ),
+        migrations.CreateModel(
+            name='QuizVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('time_limit', models.PositiveIntegerField()),
+                ('max_score', models.PositiveIntegerField()),
+                ('questions', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='main.quiz')),
+            ],
+            options={
+                'verbose_name': 'Test versiyasi',
+                'verbose_name_plural': 'Test versiyalari',
+                'ordering': ('quiz', 'number'),
+                'unique_together': {('quiz', 'number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='current_version',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.quizversion'),
+        ),
+        migrations.AddField(
+            model_name='quizanalysis',
+            name='version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.quizversion'),
+        ),
+        migrations.AddField(
+            model_name='studentquizresult',
+            name='version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='results', to='main.quizversion'),
+        ),
+        migrations.RunPython(create_first_versions, migrations.RunPython.noop),
+    ]
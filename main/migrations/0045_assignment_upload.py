@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:43
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0044_quiz_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('fingerprint', models.CharField(blank=True, max_length=255)),
+                ('checksum', models.CharField(blank=True, max_length=64)),
+                ('received', models.PositiveBigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('uploading', 'Yuklanmoqda'), ('complete', 'Yakunlangan'), ('failed', 'Xatolik')], default='uploading', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='main.assignment')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='assignment_uploads', to=settings.AUTH_USER_MODEL)),
+                ('submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.assignmentsubmission')),
+            ],
+            options={
+                'verbose_name': 'Topshiriq yuklanishi',
+                'verbose_name_plural': 'Topshiriq yuklanishlari',
+            },
+        ),
+    ]
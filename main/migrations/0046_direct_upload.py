@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:47
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0045_assignment_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(choices=[('submission', 'Topshiriq javobi'), ('assignment', 'Topshiriq fayli'), ('profile_image', 'Profil rasmi')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('key', models.CharField(max_length=500, unique=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Kutilmoqda'), ('uploaded', 'Yuklangan'), ('complete', 'Yakunlangan'), ('failed', 'Xatolik')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='direct_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bucketga yuklash',
+                'verbose_name_plural': 'Bucketga yuklashlar',
+            },
+        ),
+    ]
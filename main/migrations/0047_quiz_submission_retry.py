@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0046_direct_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsubmission',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizsubmission',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
@@ -73,19 +75,41 @@ class Quiz(models.Model):
     teacher = models.ForeignKey(CustomUser, on_delete=models.CASCADE, limit_choices_to={'role': 'teacher'}, verbose_name="O'qituvchi")
     time_limit = models.PositiveIntegerField(default=30)
     max_score = models.PositiveIntegerField(default=100, verbose_name="Maksimal ball")
+    exam_mode = models.BooleanField(default=False, verbose_name="Imtihon rejimi")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Oxirgi o‘zgarmas surat (main/quiz_versions.py); natijalar, javob kaliti va keshlar shu id bo‘yicha
+    current_version = models.ForeignKey('QuizVersion', null=True, blank=True, on_delete=models.SET_NULL,
+                                        related_name='+', editable=False)
 
     def __str__(self):
         return f"{self.title} ({self.group.name})"
 
 class Question(models.Model):
-    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions', verbose_name="Tegishli Quiz")
+    quizzes = models.ManyToManyField(Quiz, through='QuizItem', related_name='questions', verbose_name="Testlar")
     text = models.TextField(verbose_name="Savol matni")
+    # Savol matni va variantlardan olingan normallashtirilgan xesh (main/question_bank.py)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
 
     def __str__(self):
         return self.text
 
+
+class QuizItem(models.Model):
+    # Test savollar bankidagi savolga havola orqali yig‘iladi: bitta savol bir nechta testda ishlatilishi mumkin
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='items')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='quiz_items')
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Test savoli"
+        verbose_name_plural = "Test savollari"
+        unique_together = ('quiz', 'question')
+        ordering = ('position', 'id')
+
+    def __str__(self):
+        return f"{self.quiz.title}: {self.question.text}"
+
 class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers', verbose_name="Tegishli savol")
     text = models.CharField(max_length=255, verbose_name="Javob matni")
@@ -95,10 +119,35 @@ class Answer(models.Model):
         return f"{self.text} ({'To‘g‘ri' if self.is_correct else 'Noto‘g‘ri'})"
 
 
+class QuizVersion(models.Model):
+    # Test tahrirlanganda yaratiladigan o‘zgarmas surat. questions: [[savol_id, matn, [[javob_id, matn, to‘g‘rimi], ...]], ...]
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='versions')
+    number = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    time_limit = models.PositiveIntegerField()
+    max_score = models.PositiveIntegerField()
+    questions = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Test versiyasi"
+        verbose_name_plural = "Test versiyalari"
+        unique_together = ('quiz', 'number')
+        ordering = ('quiz', 'number')
+
+    def __str__(self):
+        return f"{self.title} (v{self.number})"
+
+
 class StudentQuizResult(models.Model):
     student = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    # Natija qaysi versiya bo‘yicha topshirilgan (qayta baholanganda joriy versiyaga o‘tkaziladi)
+    version = models.ForeignKey(QuizVersion, null=True, blank=True, on_delete=models.CASCADE, related_name='results')
     score = models.IntegerField()
+    # Tanlovlar ixcham ko‘rinishda: {"savol_id": javob_id yoki null} (main/grading.py pack_selections)
+    selections = models.JSONField(default=dict, blank=True)
+    correct_count = models.PositiveIntegerField(default=0)
     submitted_at = models.DateTimeField(auto_now_add=True)
     quiz_last_updated = models.DateTimeField()
 
@@ -107,6 +156,90 @@ class StudentAnswer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     selected_answer = models.ForeignKey(Answer, null=True, blank=True, on_delete=models.SET_NULL)
 
+class QuizAttempt(models.Model):
+    # Yakunlanmagan test: avtosaqlangan javoblar {savol_id: javob_id}
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='quiz_attempts', limit_choices_to={'role': 'student'})
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
+    answers = models.JSONField(default=dict, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    saved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Test urinishi"
+        verbose_name_plural = "Test urinishlari"
+        unique_together = ('student', 'quiz')
+
+    def __str__(self):
+        return f"{self.student} -> {self.quiz.title}"
+
+SUBMISSION_STATUSES = (
+    ('pending', 'Navbatda'),
+    ('processing', 'Tekshirilmoqda'),
+    ('done', 'Tayyor'),
+    ('failed', 'Xatolik'),
+)
+
+class QuizSubmission(models.Model):
+    # Imtihon rejimidagi topshirishlar navbati: javoblar darhol qabul qilinadi, baholashni worker bajaradi
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='quiz_submissions', limit_choices_to={'role': 'student'})
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='submissions')
+    data = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=SUBMISSION_STATUSES, default='pending')
+    result = models.ForeignKey(StudentQuizResult, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    error = models.TextField(blank=True)
+    # Worker necha marta olgani; vaqtinchalik xatodan keyin yozuv retry_at gacha navbatda kutadi (main/exam_queue.py)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Test topshirish navbati"
+        verbose_name_plural = "Test topshirish navbati"
+        indexes = [
+            models.Index(fields=['status', 'id'], name='submission_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} -> {self.quiz.title} ({self.status})"
+
+class QuizAnalysis(models.Model):
+    # Test bo‘yicha savollar tahlili (main/item_analysis.py): qaysi versiya va nechta natija asosida hisoblangani
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name='analysis')
+    respondents = models.PositiveIntegerField(default=0)
+    cronbach_alpha = models.FloatField(null=True, blank=True)
+    version = models.ForeignKey(QuizVersion, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Test tahlili"
+        verbose_name_plural = "Test tahlillari"
+
+    def __str__(self):
+        return f"{self.quiz.title} tahlili"
+
+
+class QuestionStatistic(models.Model):
+    # p_value — to‘g‘ri javob berganlar ulushi; discrimination — savol va qolgan ball o‘rtasidagi
+    # point-biserial korrelyatsiya; option_shares — {javob_id: tanlaganlar ulushi}
+    analysis = models.ForeignKey(QuizAnalysis, on_delete=models.CASCADE, related_name='questions')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='statistics')
+    position = models.PositiveIntegerField(default=0)
+    p_value = models.FloatField()
+    discrimination = models.FloatField(null=True, blank=True)
+    omitted_share = models.FloatField(default=0)
+    option_shares = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name = "Savol statistikasi"
+        verbose_name_plural = "Savol statistikalari"
+        unique_together = ('analysis', 'question')
+        ordering = ('position',)
+
+    def __str__(self):
+        return f"{self.question.text} (p={self.p_value:.2f})"
+
 def assignment_upload_path(instance, filename):
     ext = filename.split('.')[-1]
     group_name = instance.group.name.replace(" ", "_")
@@ -135,6 +268,134 @@ class AssignmentSubmission(models.Model):
     def __str__(self):
         return f"{self.student} -> {self.assignment.title}"
 
+UPLOAD_STATUSES = (
+    ('uploading', 'Yuklanmoqda'),
+    ('complete', 'Yakunlangan'),
+    ('failed', 'Xatolik'),
+)
+
+
+class AssignmentUpload(models.Model):
+    # Bo‘laklab yuklanayotgan topshiriq fayli (main/assignment_upload.py): received — qabul qilingan baytlar,
+    # fingerprint — mijoz fayl belgisi (nom, hajm, o‘zgartirilgan vaqt), uzilishdan keyin davom ettirish uchun
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='uploads')
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='assignment_uploads', limit_choices_to={'role': 'student'})
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    fingerprint = models.CharField(max_length=255, blank=True)
+    checksum = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=UPLOAD_STATUSES, default='uploading')
+    submission = models.ForeignKey(AssignmentSubmission, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Topshiriq yuklanishi"
+        verbose_name_plural = "Topshiriq yuklanishlari"
+
+    def __str__(self):
+        return f"{self.student} -> {self.filename} ({self.received}/{self.size})"
+
+
+DIRECT_UPLOAD_TARGETS = (
+    ('submission', 'Topshiriq javobi'),
+    ('assignment', 'Topshiriq fayli'),
+    ('profile_image', 'Profil rasmi'),
+)
+
+DIRECT_UPLOAD_STATUSES = (
+    ('pending', 'Kutilmoqda'),
+    ('uploaded', 'Yuklangan'),
+    ('complete', 'Yakunlangan'),
+    ('failed', 'Xatolik'),
+)
+
+
+class DirectUpload(models.Model):
+    # Brauzer to‘g‘ridan-to‘g‘ri S3 bucketga yuklayotgan fayl (main/direct_upload.py): key — bucketdagi nom,
+    # object_id — fayl biriktiriladigan obyekt (topshiriq yoki foydalanuvchi), yangi topshiriq uchun bo‘sh
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='direct_uploads')
+    target = models.CharField(max_length=20, choices=DIRECT_UPLOAD_TARGETS)
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+    key = models.CharField(max_length=500, unique=True)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=DIRECT_UPLOAD_STATUSES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Bucketga yuklash"
+        verbose_name_plural = "Bucketga yuklashlar"
+
+    def __str__(self):
+        return f"{self.user} -> {self.key}"
+
+
+class StudentScoreLedger(models.Model):
+    student = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='score_ledger', limit_choices_to={'role': 'student'})
+    earned_points = models.PositiveIntegerField(default=0, verbose_name="To‘plangan ball")
+    max_points = models.PositiveIntegerField(default=0, verbose_name="Maksimal ball")
+    percent = models.FloatField(default=0, verbose_name="Foiz")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Reyting balli"
+        verbose_name_plural = "Reyting ballari"
+        indexes = [
+            models.Index(fields=['-percent', 'student'], name='score_ledger_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.percent}%"
+
+ASSESSMENT_TYPES = (
+    ('quiz', 'Test'),
+    ('assignment', 'Topshiriq'),
+)
+
+class AssessmentCompletion(models.Model):
+    teacher = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='assessment_completions', limit_choices_to={'role': 'teacher'})
+    assessment_type = models.CharField(max_length=20, choices=ASSESSMENT_TYPES)
+    assessment_id = models.PositiveBigIntegerField()
+    eligible_count = models.PositiveIntegerField(default=0, verbose_name="Topshirishi kerak bo‘lganlar")
+    completed_count = models.PositiveIntegerField(default=0, verbose_name="Topshirganlar")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Bajarilish statistikasi"
+        verbose_name_plural = "Bajarilish statistikasi"
+        unique_together = ('assessment_type', 'assessment_id')
+        indexes = [
+            models.Index(fields=['teacher', 'assessment_type'], name='completion_teacher_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_assessment_type_display()} #{self.assessment_id}: {self.completed_count}/{self.eligible_count}"
+
+class AssessmentEligibility(models.Model):
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='assessment_eligibilities', limit_choices_to={'role': 'student'})
+    assessment_type = models.CharField(max_length=20, choices=ASSESSMENT_TYPES)
+    assessment_id = models.PositiveBigIntegerField()
+    group = models.ForeignKey(Group, on_delete=models.CASCADE)
+    eligible_since = models.DateTimeField(verbose_name="Topshirish majburiyati boshlangan vaqt")
+
+    class Meta:
+        verbose_name = "Topshirish majburiyati"
+        verbose_name_plural = "Topshirish majburiyatlari"
+        unique_together = ('student', 'assessment_type', 'assessment_id')
+        indexes = [
+            models.Index(fields=['assessment_type', 'assessment_id', 'student'], name='eligibility_assessment_idx'),
+            models.Index(fields=['student', 'group'], name='eligibility_membership_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} -> {self.get_assessment_type_display()} #{self.assessment_id}"
+
 class Attendance(models.Model):
     STATUS_CHOICES = (
         ('present', 'Kelgan'),
@@ -0,0 +1,133 @@
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.utils.timezone import now
+
+from .models import Assignment, AssignmentSubmission, Quiz, StudentQuizResult, AssessmentEligibility
+from .scores import defer_refresh
+
+NOTIFICATION_TIMEOUT = 60 * 60 * 24
+UPCOMING_DAYS = 3
+
+
+def _version_key(student_id):
+    return f'notifications:version:{student_id}'
+
+
+def _payload_key(student_id, version):
+    return f'notifications:student:{student_id}:{version}'
+
+
+def bump_student_notifications(student_ids):
+    # Versiya almashtirilsa, eski kesh kalitlari o‘z-o‘zidan eskiradi (timeout bilan o‘chadi)
+    student_ids = set(student_ids)
+    if student_ids:
+        cache.set_many({_version_key(sid): uuid.uuid4().hex for sid in student_ids}, timeout=None)
+
+
+def schedule_notification_bump(student_ids):
+    defer_refresh('notifications', student_ids, bump_student_notifications)
+
+
+def _student_notification_version(student_id):
+    key = _version_key(student_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def _is_eligible(student, assessment_type):
+    return Exists(AssessmentEligibility.objects.filter(
+        student=student, assessment_type=assessment_type, assessment_id=OuterRef('pk')
+    ))
+
+
+def _build_student_payload(student):
+    # Har bir ro‘yxat bitta so‘rov: javobgarlik va topshirilganlik Exists subquery orqali tekshiriladi.
+    # Muddati hali o‘tmagan barcha topshiriqlar saqlanadi, "3 kun" oynasi o‘qishda tekshiriladi
+    assignments = Assignment.objects.filter(
+        _is_eligible(student, 'assignment'),
+        ~Exists(AssignmentSubmission.objects.filter(student=student, assignment=OuterRef('pk'))),
+        deadline__gte=now(),
+    ).order_by('deadline').values_list('group__name', 'title', 'deadline')
+
+    quizzes = Quiz.objects.filter(
+        _is_eligible(student, 'quiz'),
+        ~Exists(StudentQuizResult.objects.filter(student=student, quiz=OuterRef('pk'))),
+    ).select_related('group')
+
+    return {
+        'assignments': list(assignments),
+        'quizzes': list(quizzes),
+    }
+
+
+def get_student_notifications(student):
+    version = _student_notification_version(student.pk)
+    key = _payload_key(student.pk, version)
+    payload = cache.get(key)
+    if payload is None:
+        payload = _build_student_payload(student)
+        cache.set(key, payload, timeout=NOTIFICATION_TIMEOUT)
+
+    today = now()
+    upcoming = today + timedelta(days=UPCOMING_DAYS)
+
+    assignment_notifications = []
+    for group_name, title, deadline in payload['assignments']:
+        if not today <= deadline <= upcoming:
+            continue
+        delta = deadline - today
+        days_left = delta.days
+        hours_left = delta.seconds // 3600
+        assignment_notifications.append({
+            'group': group_name,
+            'title': title,
+            'remaining': f"{days_left} kun, {hours_left} soat"
+        })
+
+    return assignment_notifications, payload['quizzes']
+
+
+def student_notification_context(student):
+    assignment_notifications, quiz_notifications = get_student_notifications(student)
+    return {
+        'student_notification_list': assignment_notifications,
+        'student_notification_count': len(assignment_notifications),
+        'quiz_notification_list': quiz_notifications,
+        'quiz_notification_count': len(quiz_notifications),
+        'total_notification_count': len(assignment_notifications) + len(quiz_notifications)
+    }
+
+
+def get_teacher_notifications(teacher):
+    # Muddati oxirgi 3 kunda tugagan, topshiruvi bor va baholanmagan topshiriqlar — bitta so‘rov
+    today = now()
+    assignments = Assignment.objects.filter(
+        Exists(AssignmentSubmission.objects.filter(assignment=OuterRef('pk'), grade__isnull=True)),
+        teacher=teacher,
+        deadline__lt=today,
+        deadline__gte=today - timedelta(days=UPCOMING_DAYS),
+    ).select_related('group').order_by('-deadline')
+
+    return [
+        {
+            'title': assignment.title,
+            'group': assignment.group.name,
+            'message': 'Topshiriqni baholang, muddati tugadi'
+        }
+        for assignment in assignments
+    ]
+
+
+def teacher_notification_context(teacher):
+    notification_list = get_teacher_notifications(teacher)
+    return {
+        'teacher_notifications': notification_list,
+        'teacher_notif_count': len(notification_list),
+    }
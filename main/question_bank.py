@@ -0,0 +1,212 @@
+import hashlib
+import json
+import re
+
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import Question, Answer, QuizItem, StudentAnswer, StudentQuizResult
+from .grading import schedule_quiz_touch, touch_quizzes
+from .scores import defer_refresh
+
+# Savollar banki: test savollarni nusxalamaydi, QuizItem orqali bankdagi savolga havola qiladi.
+# Bir xil mazmunli savollar normallashtirilgan xesh (content_hash) bo‘yicha bitta yozuvga birlashtiriladi
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    return _SPACES.sub(' ', str(text)).strip()
+
+
+def content_hash(text, answers):
+    # answers: [(matn, to‘g‘rimi)]; bo‘sh joylar va variantlar tartibi xeshga ta’sir qilmaydi
+    payload = [normalize_text(text), sorted([normalize_text(answer), bool(is_correct)] for answer, is_correct in answers)]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def quiz_questions(quiz):
+    # Testdagi savollar QuizItem tartibida
+    return Question.objects.filter(quiz_items__quiz=quiz).order_by('quiz_items__position', 'quiz_items__id')
+
+
+def _create_questions(entries):
+    # entries: [(matn, [(variant, to‘g‘rimi)], xesh)] — bulk_create signal yubormaydi, xesh shu yerda yoziladi
+    questions = Question.objects.bulk_create([
+        Question(text=text, content_hash=digest) for text, _, digest in entries
+    ])
+    Answer.objects.bulk_create([
+        Answer(question=question, text=answer, is_correct=is_correct)
+        for question, (_, answers, _) in zip(questions, entries)
+        for answer, is_correct in answers
+    ], batch_size=1000)
+    return questions
+
+
+def add_to_quiz(quiz, items):
+    # items: [(matn, [(variant, to‘g‘rimi)])] — tekshirilgan savollar. Bankda shu mazmundagi savol bo‘lsa
+    # havola qo‘shiladi, bo‘lmasa yangisi yaratiladi. Qaytadi: (qo‘shilganlar soni, testda allaqachon bor savollar indekslari)
+    hashes = [content_hash(text, answers) for text, answers in items]
+
+    # Bir xil xeshli bir nechta savol bo‘lsa eng eskisi ishlatiladi
+    bank = dict(Question.objects.filter(content_hash__in=set(hashes)).order_by('-id').values_list('content_hash', 'id'))
+    current = dict(QuizItem.objects.filter(quiz=quiz).values_list('question_id', 'position'))
+    position = max(current.values(), default=0)
+
+    missing = {}
+    for (text, answers), digest in zip(items, hashes):
+        if digest not in bank and digest not in missing:
+            missing[digest] = (text, answers, digest)
+    with transaction.atomic():
+        for question in _create_questions(list(missing.values())):
+            bank[question.content_hash] = question.id
+
+        links, duplicates, seen = [], [], set()
+        for index, digest in enumerate(hashes):
+            question_id = bank[digest]
+            if question_id in current or question_id in seen:
+                duplicates.append(index)
+                continue
+            seen.add(question_id)
+            position += 1
+            links.append(QuizItem(quiz=quiz, question_id=question_id, position=position))
+        QuizItem.objects.bulk_create(links, batch_size=1000)
+
+        # bulk_create signal yubormaydi — test versiyasi (javob kaliti) alohida yangilanadi
+        if links:
+            schedule_quiz_touch([quiz.pk])
+    return len(links), duplicates
+
+
+def shared_question_ids(question_ids):
+    # Berilgan savollardan boshqa testlarda ham ishlatilayotganlari
+    return set(
+        QuizItem.objects.filter(question_id__in=question_ids).values('question_id')
+        .annotate(uses=Count('id')).filter(uses__gt=1).values_list('question_id', flat=True)
+    )
+
+
+def _remap_selections(results, old_question_id, new_question_id, answer_map):
+    # Natijalardagi ixcham tanlovlarda savol kaliti va javob idlari yangi savolnikiga almashtiriladi
+    results = list(results.filter(selections__has_key=str(old_question_id)).only('id', 'selections'))
+    old_key = str(old_question_id)
+    for result in results:
+        # Savollar tartibi saqlanishi uchun lug‘at qayta yig‘iladi
+        result.selections = {
+            (str(new_question_id) if question_id == old_key else question_id):
+                (answer_map.get(answer_id) if question_id == old_key and answer_id is not None else answer_id)
+            for question_id, answer_id in result.selections.items()
+        }
+    StudentQuizResult.objects.bulk_update(results, ['selections'], batch_size=500)
+
+
+def fork_question(quiz, question, text, answers):
+    # Copy-on-write: boshqa testlar bilan umumiy savol tahrirlansa, o‘zgarish faqat shu testga tegadi.
+    # answers: [(eski javob id yoki None, yangi matn, to‘g‘rimi)], ro‘yxatda yo‘q variantlar o‘chirilgan hisoblanadi.
+    # Yangi mazmun bankda bo‘lsa o‘sha savol olinadi, aks holda yaratiladi; testdagi havola va shu test
+    # natijalaridagi tanlovlar unga ko‘chiriladi
+    contents = [(answer_text, is_correct) for _, answer_text, is_correct in answers]
+    digest = content_hash(text, contents)
+    in_quiz = QuizItem.objects.filter(quiz=quiz).values('question_id')
+    target = Question.objects.filter(content_hash=digest).exclude(id__in=in_quiz).order_by('id').first()
+    if target is None:
+        target = _create_questions([(text, contents, digest)])[0]
+
+    new_answers = {}
+    for answer_id, answer_text, is_correct in Answer.objects.filter(question=target).order_by('-id').values_list('id', 'text', 'is_correct'):
+        new_answers[(normalize_text(answer_text), is_correct)] = answer_id
+
+    # Yangi qo‘shilgan variantlarning eski id si yo‘q (None) — ular tanlovlarga ta’sir qilmaydi
+    mapping = {
+        answer_id: new_answers.get((normalize_text(answer_text), is_correct))
+        for answer_id, answer_text, is_correct in answers if answer_id is not None
+    }
+    QuizItem.objects.filter(quiz=quiz, question=question).update(question=target)
+    selections = StudentAnswer.objects.filter(result__quiz=quiz, question=question)
+    for old_id, new_id in mapping.items():
+        selections.filter(selected_answer_id=old_id).update(question=target, selected_answer_id=new_id)
+    # Qolganlari javob bermagan yoki o‘chirilgan variantni tanlagan — javob berilmagan hisoblanadi
+    selections.update(question=target, selected_answer=None)
+    _remap_selections(StudentQuizResult.objects.filter(quiz=quiz), question.id, target.id, mapping)
+    return target
+
+
+def refresh_content_hashes(question_ids):
+    # Savol yoki javob joyida tahrirlansa (admin panel, Django admin) xesh qayta hisoblanadi
+    contents = {}
+    for question_id, text, digest in Question.objects.filter(id__in=question_ids).values_list('id', 'text', 'content_hash'):
+        contents[question_id] = (text, [], digest)
+    answers = Answer.objects.filter(question_id__in=contents).values_list('question_id', 'text', 'is_correct')
+    for question_id, answer_text, is_correct in answers:
+        contents[question_id][1].append((answer_text, is_correct))
+
+    changed = []
+    for question_id, (text, answers, current) in contents.items():
+        digest = content_hash(text, answers)
+        if current != digest:
+            changed.append(Question(id=question_id, content_hash=digest))
+    Question.objects.bulk_update(changed, ['content_hash'], batch_size=500)
+
+
+def schedule_hash_refresh(question_ids):
+    defer_refresh('question_hashes', question_ids, refresh_content_hashes)
+
+
+def delete_orphan_questions(question_ids=None):
+    # Test o‘chirilganda QuizItem lar bilan birga savollar o‘chmaydi (boshqa testlar ishlatishi mumkin) — hech bir
+    # testda qolmagan savollar bankdan shu yerda o‘chiriladi. Qaytadi: o‘chirilgan savollar soni
+    orphans = Question.objects.filter(quiz_items__isnull=True)
+    if question_ids is not None:
+        orphans = orphans.filter(id__in=question_ids)
+    return orphans.delete()[1].get(Question._meta.label, 0)
+
+
+def schedule_orphan_cleanup(question_ids):
+    defer_refresh('orphan_questions', question_ids, delete_orphan_questions)
+
+
+def next_position(quiz):
+    return (QuizItem.objects.filter(quiz=quiz).aggregate(position=Max('position'))['position'] or 0) + 1
+
+
+def merge_duplicates():
+    # Bir xil xeshli savollar eng eski yozuvga birlashtiriladi: testlardagi havolalar va o‘quvchilarning
+    # tanlovlari ko‘chiriladi, takror savollar o‘chiriladi. Qaytadi: (o‘chirilgan savollar, ta’sirlangan testlar)
+    duplicated = (
+        Question.objects.exclude(content_hash='').values('content_hash')
+        .annotate(count=Count('id')).filter(count__gt=1).values_list('content_hash', flat=True)
+    )
+    groups = {}
+    for question_id, digest in Question.objects.filter(content_hash__in=list(duplicated)).order_by('id').values_list('id', 'content_hash'):
+        groups.setdefault(digest, []).append(question_id)
+
+    answers = {}
+    question_ids = [question_id for ids in groups.values() for question_id in ids]
+    for answer_id, question_id, text, is_correct in Answer.objects.filter(question_id__in=question_ids).order_by('-id').values_list('id', 'question_id', 'text', 'is_correct'):
+        answers.setdefault(question_id, {})[(normalize_text(text), is_correct)] = answer_id
+    quizzes = {}
+    for question_id, quiz_id in QuizItem.objects.filter(question_id__in=question_ids).values_list('question_id', 'quiz_id'):
+        quizzes.setdefault(question_id, set()).add(quiz_id)
+
+    removed, touched = [], set()
+    with transaction.atomic():
+        for canonical, *duplicates in groups.values():
+            for duplicate in duplicates:
+                # Ikkalasi bitta testda bo‘lsa birlashtirilmaydi (testda savol ikki marta bo‘lib qoladi)
+                if quizzes.get(duplicate, set()) & quizzes.get(canonical, set()):
+                    continue
+                mapping = {
+                    answer_id: answers.get(canonical, {}).get(content)
+                    for content, answer_id in answers.get(duplicate, {}).items()
+                }
+                QuizItem.objects.filter(question_id=duplicate).update(question_id=canonical)
+                selections = StudentAnswer.objects.filter(question_id=duplicate)
+                for old_id, new_id in mapping.items():
+                    selections.filter(selected_answer_id=old_id).update(question_id=canonical, selected_answer_id=new_id)
+                selections.update(question_id=canonical)
+                _remap_selections(StudentQuizResult.objects.all(), duplicate, canonical, mapping)
+                touched |= quizzes.get(duplicate, set())
+                quizzes.setdefault(canonical, set()).update(quizzes.pop(duplicate, set()))
+                removed.append(duplicate)
+        Question.objects.filter(id__in=removed).delete()
+        touch_quizzes(touched)
+    return len(removed), touched
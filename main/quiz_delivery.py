@@ -0,0 +1,33 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .quiz_versions import current_version_id, load_version_questions
+
+QUIZ_PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+
+def _build_payload(questions):
+    # questions: versiya surati (main/quiz_versions.py). To‘g‘ri javob belgilari payloadga kirmaydi
+    return [
+        {'id': question_id, 'text': text, 'answers': [{'id': answer_id, 'text': answer} for answer_id, answer, _ in answers]}
+        for question_id, text, answers in questions
+    ]
+
+
+def get_version_delivery(version_id):
+    # Savollar va ularning HTML bloki har bir versiya uchun bir marta tayyorlanadi. Versiya o‘zgarmaydi —
+    # tahrirdan keyin yangi versiya id si bilan yangi kalit ishlatiladi, eskisini tozalash kerak emas
+    key = f'quiz_delivery:v{version_id}'
+    delivery = cache.get(key)
+    if delivery is None:
+        questions = _build_payload(load_version_questions(version_id))
+        delivery = {
+            'questions': questions,
+            'html': render_to_string('student_quiz_questions.html', {'questions': questions}),
+        }
+        cache.set(key, delivery, timeout=QUIZ_PAYLOAD_TIMEOUT)
+    return delivery
+
+
+def get_quiz_delivery(quiz):
+    return get_version_delivery(current_version_id(quiz))
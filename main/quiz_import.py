@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import re
+import string
+
+from django.db import transaction
+
+from .models import Quiz, Answer
+from .question_bank import add_to_quiz
+
+# Fayldan savollarni ommaviy yuklash: CSV, JSON (massiv yoki JSON Lines) va Aiken formatlari.
+# Fayl oqim sifatida o‘qiladi, savollar IMPORT_CHUNK_SIZE tadan bankka bulk_create qilinadi
+IMPORT_CHUNK_SIZE = 500
+MAX_ANSWERS = 20
+ANSWER_MAX_LENGTH = Answer._meta.get_field('text').max_length
+
+AIKEN_OPTION = re.compile(r'^([A-Z])[.)]\s*(.*)$')
+AIKEN_ANSWER = re.compile(r'^ANSWER:\s*([A-Z])\s*$', re.IGNORECASE)
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def _correct_index(value, n_answers):
+    # To‘g‘ri javob harf (A, B, ...) yoki 1 dan boshlanadigan raqam bilan beriladi
+    value = str(value).strip().upper()
+    if len(value) == 1 and value in string.ascii_uppercase:
+        index = string.ascii_uppercase.index(value)
+    elif value.isdigit():
+        index = int(value) - 1
+    else:
+        raise ImportRowError(f"to‘g‘ri javob noto‘g‘ri ko‘rsatilgan: {value or 'bo‘sh'}")
+    if not 0 <= index < n_answers:
+        raise ImportRowError(f"to‘g‘ri javob {value} variantlar orasida yo‘q")
+    return index
+
+
+def _validated(text, answers):
+    # answers: [(matn, to‘g‘rimi)] — qo‘lda kiritish formasidagi qoidalar bilan bir xil
+    text = (text or '').strip()
+    answers = [(str(answer).strip(), bool(is_correct)) for answer, is_correct in answers if str(answer).strip()]
+    if not text:
+        raise ImportRowError("savol matni bo‘sh")
+    if len(answers) < 2:
+        raise ImportRowError("kamida 2 ta variant kerak")
+    if len(answers) > MAX_ANSWERS:
+        raise ImportRowError(f"variantlar soni {MAX_ANSWERS} tadan oshmasligi kerak")
+    if not any(is_correct for _, is_correct in answers):
+        raise ImportRowError("to‘g‘ri javob belgilanmagan")
+    too_long = next((answer for answer, _ in answers if len(answer) > ANSWER_MAX_LENGTH), None)
+    if too_long:
+        raise ImportRowError(f"variant matni {ANSWER_MAX_LENGTH} belgidan uzun")
+    return text, answers
+
+
+def parse_csv(stream):
+    # Ustunlar: savol, variant1, variant2, ..., to‘g‘ri_javob (oxirgi ustun: harf yoki raqam).
+    # Birinchi qator "question"/"savol" bilan boshlansa sarlavha deb o‘tkazib yuboriladi
+    for line_no, row in enumerate(csv.reader(stream), 1):
+        if not any(cell.strip() for cell in row):
+            continue
+        if line_no == 1 and row[0].strip().lower() in ('question', 'savol'):
+            continue
+        try:
+            if len(row) < 4:
+                raise ImportRowError("kamida savol, 2 ta variant va to‘g‘ri javob ustuni kerak")
+            options = [cell for cell in row[1:-1]]
+            while options and not options[-1].strip():
+                options.pop()
+            correct = _correct_index(row[-1], len(options))
+            yield line_no, _validated(row[0], [(answer, i == correct) for i, answer in enumerate(options)])
+        except ImportRowError as exc:
+            yield line_no, exc
+
+
+def _json_answers(item):
+    answers = item.get('answers')
+    if not isinstance(answers, list):
+        raise ImportRowError("'answers' ro‘yxat bo‘lishi kerak")
+    if answers and all(isinstance(answer, dict) for answer in answers):
+        return [(answer.get('text', ''), answer.get('correct', False)) for answer in answers]
+    correct = _correct_index(item.get('correct', ''), len(answers))
+    return [(answer, i == correct) for i, answer in enumerate(answers)]
+
+
+def _iter_json_values(stream, chunk_size=64 * 1024):
+    # JSON massiv elementlari yoki JSON Lines qatorlari butun faylni xotiraga yuklamasdan o‘qiladi
+    decoder = json.JSONDecoder()
+    buffer, position, started, eof = '', 0, False, False
+    while True:
+        buffer = buffer[position:].lstrip()
+        position = 0
+        if not started and buffer:
+            if buffer[0] == '[':
+                buffer = buffer[1:]
+            started = True
+        if buffer[:1] == ',':
+            buffer = buffer[1:].lstrip()
+        if buffer[:1] == ']':
+            return
+        if buffer:
+            try:
+                value, position = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield value
+                continue
+        if eof:
+            return
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def parse_json(stream):
+    # [{"question": "...", "answers": ["...", "..."], "correct": "B"}, ...]
+    # yoki "answers": [{"text": "...", "correct": true}, ...]
+    item_no = 0
+    try:
+        for item in _iter_json_values(stream):
+            item_no += 1
+            try:
+                if not isinstance(item, dict):
+                    raise ImportRowError("har bir element obyekt bo‘lishi kerak")
+                yield item_no, _validated(item.get('question', ''), _json_answers(item))
+            except ImportRowError as exc:
+                yield item_no, exc
+    except json.JSONDecodeError as exc:
+        yield item_no + 1, ImportRowError(f"JSON xatosi: {exc.msg}, qolgan qismi o‘qilmadi")
+
+
+def parse_aiken(stream):
+    # Aiken: savol matni, "A. variant" qatorlari, so‘ng "ANSWER: B"; bloklar bo‘sh qator bilan ajratiladi
+    start, question, options = None, [], []
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if start is None:
+            start = line_no
+        answer = AIKEN_ANSWER.match(line)
+        option = AIKEN_OPTION.match(line)
+        if answer:
+            try:
+                letters = [letter for letter, _ in options]
+                if answer.group(1).upper() not in letters:
+                    raise ImportRowError(f"ANSWER: {answer.group(1)} variantlar orasida yo‘q")
+                correct = answer.group(1).upper()
+                yield start, _validated(' '.join(question), [(text, letter == correct) for letter, text in options])
+            except ImportRowError as exc:
+                yield start, exc
+            start, question, options = None, [], []
+        elif option and question:
+            options.append((option.group(1), option.group(2)))
+        elif options:
+            # Variantlardan keyin ANSWER qatori kelmagan — yangi savol boshlangan
+            yield start, ImportRowError("ANSWER qatori topilmadi")
+            start, question, options = line_no, [line], []
+        else:
+            question.append(line)
+    if start is not None:
+        yield start, ImportRowError("ANSWER qatori topilmadi")
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'json': parse_json,
+    'jsonl': parse_json,
+    'txt': parse_aiken,
+    'aiken': parse_aiken,
+}
+
+
+def detect_format(filename):
+    return filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+
+def _write_chunk(quiz, chunk, errors):
+    # Savollar bank orqali qo‘shiladi: bir xil mazmunli savol qayta yaratilmaydi (main/question_bank.py)
+    added, duplicates = add_to_quiz(quiz, [parsed for _, parsed in chunk])
+    errors.extend((chunk[index][0], "bu savol testda allaqachon bor") for index in duplicates)
+    return added
+
+
+def import_questions(upload, **quiz_fields):
+    # Test va barcha to‘g‘ri savollar bitta tranzaksiyada yaratiladi.
+    # Qaytadi: (quiz yoki None, qo‘shilgan savollar soni, [(qator, xato matni)])
+    parser = PARSERS.get(detect_format(upload.name))
+    if parser is None:
+        return None, 0, [(0, "Fayl formati qo‘llab-quvvatlanmaydi (.csv, .json, .jsonl, .txt)")]
+
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    errors, imported, chunk = [], 0, []
+    try:
+        with transaction.atomic():
+            quiz = Quiz.objects.create(**quiz_fields)
+            for row_no, parsed in parser(stream):
+                if isinstance(parsed, ImportRowError):
+                    errors.append((row_no, str(parsed)))
+                    continue
+                chunk.append((row_no, parsed))
+                if len(chunk) >= IMPORT_CHUNK_SIZE:
+                    imported += _write_chunk(quiz, chunk, errors)
+                    chunk = []
+            if chunk:
+                imported += _write_chunk(quiz, chunk, errors)
+            if not imported:
+                transaction.set_rollback(True)
+                quiz = None
+        errors.sort(key=lambda error: error[0])
+    except UnicodeDecodeError:
+        return None, 0, [(0, "Fayl UTF-8 kodlashda bo‘lishi kerak")]
+    finally:
+        stream.detach()
+    return quiz, imported, errors
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Quiz, QuizItem, QuizVersion, Answer
+
+# Test versiyalari: har bir tahrirdan keyin testning o‘zgarmas surati (savollar, variantlar, to‘g‘ri javoblar,
+# nom, vaqt va maksimal ball) yangi QuizVersion qatori sifatida yoziladi. Javob kaliti, savollar keshi va
+# savollar tahlili versiya id si bo‘yicha saqlanadi — versiya o‘zgarmaydi, shuning uchun ularni tozalash kerak emas
+
+
+def build_snapshot(quiz):
+    # [[savol_id, matn, [[javob_id, matn, to‘g‘rimi], ...]], ...] savollar QuizItem tartibida
+    questions, by_id = [], {}
+    items = QuizItem.objects.filter(quiz=quiz).order_by('position', 'id').values_list('question_id', 'question__text')
+    for question_id, text in items:
+        by_id[question_id] = [question_id, text, []]
+        questions.append(by_id[question_id])
+    answers = Answer.objects.filter(question__quiz_items__quiz=quiz).order_by('id').values_list(
+        'question_id', 'id', 'text', 'is_correct'
+    )
+    for question_id, answer_id, text, is_correct in answers:
+        by_id[question_id][2].append([answer_id, text, is_correct])
+    return questions
+
+
+def _same_content(version, quiz, questions):
+    return (
+        version is not None
+        and version.questions == questions
+        and (version.title, version.time_limit, version.max_score) == (quiz.title, quiz.time_limit, quiz.max_score)
+    )
+
+
+def publish_version(quiz):
+    # Test mazmuni joriy versiyadan farq qilsa yangi versiya yaratiladi va joriy deb belgilanadi. Qaytadi: joriy versiya
+    with transaction.atomic():
+        locked = Quiz.objects.select_for_update().select_related('current_version').get(pk=quiz.pk)
+        questions = build_snapshot(locked)
+        version = locked.current_version
+        if not _same_content(version, locked, questions):
+            number = (QuizVersion.objects.filter(quiz=locked).aggregate(number=Max('number'))['number'] or 0) + 1
+            version = QuizVersion.objects.create(
+                quiz=locked,
+                number=number,
+                title=locked.title,
+                time_limit=locked.time_limit,
+                max_score=locked.max_score,
+                questions=questions,
+            )
+            Quiz.objects.filter(pk=locked.pk).update(current_version=version)
+    quiz.current_version = version
+    return version
+
+
+def current_version_id(quiz):
+    # Hali versiyasi yo‘q test (masalan, migratsiyadan keyin yaratilgan) birinchi murojaatda suratga olinadi
+    if quiz.current_version_id is None:
+        publish_version(quiz)
+    return quiz.current_version_id
+
+
+def load_version_questions(version_id):
+    return QuizVersion.objects.filter(id=version_id).values_list('questions', flat=True).first() or []
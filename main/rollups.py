@@ -0,0 +1,212 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import GroupStudentMembership, Quiz, Assignment, StudentQuizResult, AssignmentSubmission, \
+    AssessmentCompletion, AssessmentEligibility
+from .scores import defer_refresh
+
+
+def _count_by(queryset, key_field):
+    rows = queryset.order_by().values(key_field).annotate(total=Count('student', distinct=True)).values_list(key_field, 'total')
+    return dict(rows)
+
+
+def _refresh_completion(assessment_type, model, reverse_name, done_queryset, ids=None):
+    assessments = model.objects.all()
+    rollups = AssessmentCompletion.objects.filter(assessment_type=assessment_type)
+    if ids is not None:
+        ids = set(ids)
+        if not ids:
+            return
+        assessments = assessments.filter(id__in=ids)
+        rollups = rollups.filter(assessment_id__in=ids)
+
+    assessments = list(assessments.values_list('id', 'teacher_id'))
+    assessment_ids = [assessment_id for assessment_id, _ in assessments]
+
+    # Topshirishi kerak bo‘lganlar: test/topshiriq yaratilishidan oldin guruhga qo‘shilgan o‘quvchilar
+    eligible = _count_by(
+        GroupStudentMembership.objects.filter(**{
+            'student__role': 'student',
+            f'group__{reverse_name}__id__in': assessment_ids,
+            f'group__{reverse_name}__created_at__gte': F('joined_at'),
+        }),
+        f'group__{reverse_name}__id'
+    )
+    completed = _count_by(
+        done_queryset.filter(**{
+            'student__role': 'student',
+            f'{reverse_name}_id__in': assessment_ids,
+            f'{reverse_name}__group__groupstudentmembership__student': F('student'),
+            f'{reverse_name}__created_at__gte': F(f'{reverse_name}__group__groupstudentmembership__joined_at'),
+        }),
+        f'{reverse_name}_id'
+    )
+
+    entries = [
+        AssessmentCompletion(
+            teacher_id=teacher_id,
+            assessment_type=assessment_type,
+            assessment_id=assessment_id,
+            eligible_count=eligible.get(assessment_id, 0),
+            completed_count=completed.get(assessment_id, 0),
+        )
+        for assessment_id, teacher_id in assessments
+    ]
+
+    with transaction.atomic():
+        # O‘chirilgan test/topshiriqlar statistikasi ham o‘chiriladi
+        rollups.exclude(assessment_id__in=assessment_ids).delete()
+        AssessmentCompletion.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['assessment_type', 'assessment_id'],
+            update_fields=['teacher', 'eligible_count', 'completed_count', 'updated_at'],
+        )
+
+
+def refresh_quiz_completion(quiz_ids=None):
+    _refresh_completion('quiz', Quiz, 'quiz', StudentQuizResult.objects.all(), quiz_ids)
+
+
+def refresh_assignment_completion(assignment_ids=None):
+    _refresh_completion('assignment', Assignment, 'assignment', AssignmentSubmission.objects.all(), assignment_ids)
+
+
+def schedule_quiz_completion(quiz_ids):
+    defer_refresh('quiz_completion', quiz_ids, refresh_quiz_completion)
+
+
+def schedule_assignment_completion(assignment_ids):
+    defer_refresh('assignment_completion', assignment_ids, refresh_assignment_completion)
+
+
+def refresh_group_completion(group_ids):
+    refresh_quiz_completion(Quiz.objects.filter(group_id__in=group_ids).values_list('id', flat=True))
+    refresh_assignment_completion(Assignment.objects.filter(group_id__in=group_ids).values_list('id', flat=True))
+
+
+def schedule_group_completion(group_ids):
+    defer_refresh('group_completion', group_ids, refresh_group_completion)
+
+
+def get_teacher_completion(teacher):
+    # O‘qituvchi dashboardi uchun bitta agregat so‘rov
+    rows = AssessmentCompletion.objects.filter(teacher=teacher).values('assessment_type').annotate(
+        assessments=Count('id'),
+        eligible=Sum('eligible_count'),
+        completed=Sum('completed_count'),
+    )
+    stats = {
+        assessment_type: {'assessments': 0, 'eligible': 0, 'completed': 0, 'percent': 0}
+        for assessment_type in ('quiz', 'assignment')
+    }
+    for row in rows:
+        percent = (row['completed'] / row['eligible']) * 100 if row['eligible'] else 0
+        stats[row['assessment_type']] = {
+            'assessments': row['assessments'],
+            'eligible': row['eligible'],
+            'completed': row['completed'],
+            'percent': percent,
+        }
+    return stats
+
+
+# Topshirish majburiyati (AssessmentEligibility): o‘quvchi faqat guruhga qo‘shilgandan
+# keyin yaratilgan test va topshiriqlar uchun javobgar
+
+ELIGIBILITY_SOURCES = (
+    ('quiz', 'quiz'),
+    ('assignment', 'assignment'),
+)
+
+
+def _eligibility_entries(memberships, assessment_type, reverse_name, **filters):
+    rows = memberships.filter(**{
+        f'group__{reverse_name}__created_at__gte': F('joined_at'),
+        **{f'group__{reverse_name}__{key}': value for key, value in filters.items()},
+    }).values_list('student_id', 'group_id', f'group__{reverse_name}__id', f'group__{reverse_name}__created_at')
+    return [
+        AssessmentEligibility(
+            student_id=student_id,
+            assessment_type=assessment_type,
+            assessment_id=assessment_id,
+            group_id=group_id,
+            eligible_since=created_at,
+        )
+        for student_id, group_id, assessment_id, created_at in rows
+    ]
+
+
+def refresh_membership_eligibility(pairs=None):
+    # pairs: (student_id, group_id) juftliklari; None bo‘lsa butun jadval qayta quriladi
+    memberships = GroupStudentMembership.objects.filter(student__role='student')
+    stale = AssessmentEligibility.objects.all()
+    if pairs is not None:
+        query = Q()
+        for student_id, group_id in set(pairs):
+            query |= Q(student_id=student_id, group_id=group_id)
+        if not query:
+            return
+        memberships = memberships.filter(query)
+        stale = stale.filter(query)
+
+    entries = []
+    for assessment_type, reverse_name in ELIGIBILITY_SOURCES:
+        entries += _eligibility_entries(memberships, assessment_type, reverse_name)
+
+    with transaction.atomic():
+        stale.delete()
+        AssessmentEligibility.objects.bulk_create(entries, batch_size=1000)
+
+
+def _refresh_assessment_eligibility(assessment_type, reverse_name, ids):
+    ids = set(ids)
+    if not ids:
+        return
+    memberships = GroupStudentMembership.objects.filter(student__role='student')
+    entries = _eligibility_entries(memberships, assessment_type, reverse_name, id__in=ids)
+
+    with transaction.atomic():
+        AssessmentEligibility.objects.filter(assessment_type=assessment_type, assessment_id__in=ids).delete()
+        AssessmentEligibility.objects.bulk_create(entries, batch_size=1000)
+
+
+def refresh_quiz_eligibility(quiz_ids):
+    _refresh_assessment_eligibility('quiz', 'quiz', quiz_ids)
+
+
+def refresh_assignment_eligibility(assignment_ids):
+    _refresh_assessment_eligibility('assignment', 'assignment', assignment_ids)
+
+
+def schedule_membership_eligibility(pairs):
+    defer_refresh('membership_eligibility', pairs, refresh_membership_eligibility)
+
+
+def schedule_quiz_eligibility(quiz_ids):
+    defer_refresh('quiz_eligibility', quiz_ids, refresh_quiz_eligibility)
+
+
+def schedule_assignment_eligibility(assignment_ids):
+    defer_refresh('assignment_eligibility', assignment_ids, refresh_assignment_eligibility)
+
+
+def _eligible_ids(student, assessment_type):
+    return AssessmentEligibility.objects.filter(
+        student=student, assessment_type=assessment_type
+    ).values('assessment_id')
+
+
+def eligible_quizzes(student):
+    return Quiz.objects.filter(id__in=_eligible_ids(student, 'quiz'))
+
+
+def eligible_assignments(student):
+    return Assignment.objects.filter(id__in=_eligible_ids(student, 'assignment'))
+
+
+def eligible_students(assessment_type, assessment_id):
+    return AssessmentEligibility.objects.filter(
+        assessment_type=assessment_type, assessment_id=assessment_id
+    ).select_related('student')
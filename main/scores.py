@@ -0,0 +1,316 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q, Sum
+
+from .models import CustomUser, GroupStudentMembership, Quiz, Assignment, StudentQuizResult, AssignmentSubmission, \
+    StudentScoreLedger, AssessmentEligibility
+
+
+def score_percent(earned, total):
+    if not total:
+        return 0
+    return round((earned / total) * 100, 2)
+
+
+def _sum_by_student(queryset, student_field, value_field):
+    rows = queryset.order_by().values(student_field).annotate(total=Sum(value_field)).values_list(student_field, 'total')
+    return {student_id: total or 0 for student_id, total in rows}
+
+
+def refresh_student_scores(student_ids=None):
+    # student_ids=None bo‘lsa butun reyting qaytadan hisoblanadi
+    memberships = GroupStudentMembership.objects.filter(student__role='student')
+    ledger = StudentScoreLedger.objects.all()
+    if student_ids is not None:
+        student_ids = set(student_ids)
+        if not student_ids:
+            return
+        memberships = memberships.filter(student_id__in=student_ids)
+        ledger = ledger.filter(student_id__in=student_ids)
+
+    active_ids = set(memberships.values_list('student_id', flat=True))
+
+    # Faqat guruhga qo‘shilgandan keyin yaratilgan test va topshiriqlar hisobga olinadi
+    quiz_max = _sum_by_student(
+        memberships.filter(group__quiz__created_at__gte=F('joined_at')),
+        'student_id', 'group__quiz__max_score'
+    )
+    assignment_max = _sum_by_student(
+        memberships.filter(group__assignment__created_at__gte=F('joined_at')),
+        'student_id', 'group__assignment__max_score'
+    )
+    quiz_earned = _sum_by_student(
+        StudentQuizResult.objects.filter(
+            student_id__in=active_ids,
+            quiz__group__groupstudentmembership__student=F('student'),
+            quiz__created_at__gte=F('quiz__group__groupstudentmembership__joined_at'),
+        ),
+        'student_id', 'score'
+    )
+    assignment_earned = _sum_by_student(
+        AssignmentSubmission.objects.filter(
+            student_id__in=active_ids,
+            grade__isnull=False,
+            assignment__group__groupstudentmembership__student=F('student'),
+            assignment__created_at__gte=F('assignment__group__groupstudentmembership__joined_at'),
+        ),
+        'student_id', 'grade'
+    )
+
+    entries = []
+    for student_id in active_ids:
+        earned = quiz_earned.get(student_id, 0) + assignment_earned.get(student_id, 0)
+        total = quiz_max.get(student_id, 0) + assignment_max.get(student_id, 0)
+        entries.append(StudentScoreLedger(
+            student_id=student_id,
+            earned_points=earned,
+            max_points=total,
+            percent=score_percent(earned, total),
+        ))
+
+    with transaction.atomic():
+        # Hech qaysi guruhda qolmagan o‘quvchilar reytingdan chiqariladi
+        ledger.exclude(student_id__in=active_ids).delete()
+        StudentScoreLedger.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['student'],
+            update_fields=['earned_points', 'max_points', 'percent', 'updated_at'],
+        )
+
+
+_local = threading.local()
+
+
+def defer_refresh(name, ids, refresh):
+    # Bir tranzaksiya ichidagi barcha o‘zgarishlar commitdan keyin bitta hisoblashga yig‘iladi
+    ids = set(ids)
+    if not ids:
+        return
+
+    hooks = connection.run_on_commit
+    pending_map = getattr(_local, 'pending', None)
+    if pending_map is None:
+        pending_map = _local.pending = {}
+
+    pending = pending_map.get(name)
+    if pending is not None and pending[0] is hooks and connection.in_atomic_block:
+        pending[1].update(ids)
+        return
+
+    pending = (hooks, ids)
+    pending_map[name] = pending
+
+    def flush():
+        if pending_map.get(name) is pending:
+            del pending_map[name]
+        refresh(pending[1])
+
+    transaction.on_commit(flush)
+
+
+def schedule_score_refresh(student_ids):
+    defer_refresh('scores', student_ids, refresh_student_scores)
+
+
+def group_student_ids(group_ids):
+    return GroupStudentMembership.objects.filter(group_id__in=group_ids).values_list('student_id', flat=True)
+
+
+def get_ranked_ledger():
+    return StudentScoreLedger.objects.select_related('student').order_by('-percent', 'student_id')
+
+
+def get_ledger_rank(entry):
+    ahead = StudentScoreLedger.objects.filter(
+        Q(percent__gt=entry.percent) | Q(percent=entry.percent, student_id__lt=entry.student_id)
+    ).count()
+    return ahead + 1
+
+
+def ledger_leaderboard(current_student, limit=10):
+    top = [
+        {'student': entry.student, 'score_percent': entry.percent, 'rank': idx}
+        for idx, entry in enumerate(get_ranked_ledger()[:limit], 1)
+    ]
+
+    student_place = next((s for s in top if s['student'] == current_student), None)
+    if student_place is None:
+        entry = StudentScoreLedger.objects.filter(student=current_student).first()
+        if entry:
+            student_place = {
+                'student': current_student,
+                'score_percent': entry.percent,
+                'rank': get_ledger_rank(entry),
+            }
+
+    return top, student_place
+
+
+RANKING_SQL = """
+WITH members AS (
+    SELECT m.student_id, m.group_id, m.joined_at
+    FROM {membership} m
+    JOIN {user} u ON u.id = m.student_id
+    WHERE u.role = 'student'
+),
+eligible AS (
+    SELECT m.student_id, q.max_score AS max_points, 0 AS earned_points
+    FROM members m
+    JOIN {quiz} q ON q.group_id = m.group_id AND q.created_at >= m.joined_at
+    UNION ALL
+    SELECT m.student_id, a.max_score, 0
+    FROM members m
+    JOIN {assignment} a ON a.group_id = m.group_id AND a.created_at >= m.joined_at
+    UNION ALL
+    SELECT r.student_id, 0, r.score
+    FROM {result} r
+    JOIN {quiz} q ON q.id = r.quiz_id
+    JOIN members m ON m.student_id = r.student_id AND m.group_id = q.group_id AND q.created_at >= m.joined_at
+    UNION ALL
+    SELECT s.student_id, 0, s.grade
+    FROM {submission} s
+    JOIN {assignment} a ON a.id = s.assignment_id
+    JOIN members m ON m.student_id = s.student_id AND m.group_id = a.group_id AND a.created_at >= m.joined_at
+    WHERE s.grade IS NOT NULL
+),
+scores AS (
+    SELECT st.student_id,
+           COALESCE(SUM(e.earned_points), 0) AS earned_points,
+           COALESCE(SUM(e.max_points), 0) AS max_points
+    FROM (SELECT DISTINCT student_id FROM members) st
+    LEFT JOIN eligible e ON e.student_id = st.student_id
+    GROUP BY st.student_id
+),
+ranked AS (
+    SELECT student_id,
+           CASE WHEN max_points > 0 THEN ROUND(earned_points * 100.0 / max_points, 2) ELSE 0 END AS percent
+    FROM scores
+)
+SELECT student_id, percent, position
+FROM (
+    SELECT student_id, percent, ROW_NUMBER() OVER (ORDER BY percent DESC, student_id) AS position
+    FROM ranked
+) numbered
+WHERE position <= %s OR student_id = %s
+ORDER BY position
+"""
+
+
+def sql_leaderboard(current_student, limit=10):
+    # Butun reyting bitta SQL so‘rovda: ball yig‘indisi va ROW_NUMBER() oynali funksiyasi
+    if not connection.features.supports_over_clause:
+        return ledger_leaderboard(current_student, limit)
+
+    qn = connection.ops.quote_name
+    sql = RANKING_SQL.format(
+        membership=qn(GroupStudentMembership._meta.db_table),
+        user=qn(CustomUser._meta.db_table),
+        quiz=qn(Quiz._meta.db_table),
+        assignment=qn(Assignment._meta.db_table),
+        result=qn(StudentQuizResult._meta.db_table),
+        submission=qn(AssignmentSubmission._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [limit, current_student.pk])
+        rows = cursor.fetchall()
+
+    students = CustomUser.objects.in_bulk([student_id for student_id, _, _ in rows])
+    places = [
+        {'student': students[student_id], 'score_percent': float(percent), 'rank': position}
+        for student_id, percent, position in rows
+    ]
+
+    top = [p for p in places if p['rank'] <= limit]
+    student_place = next((p for p in places if p['student'].pk == current_student.pk), None)
+    return top, student_place
+
+
+LEADERBOARD_BACKENDS = {
+    'ledger': ledger_leaderboard,
+    'sql': sql_leaderboard,
+}
+
+
+def get_leaderboard(current_student, limit=10):
+    backend = LEADERBOARD_BACKENDS[getattr(settings, 'LEADERBOARD_BACKEND', 'ledger')]
+    return backend(current_student, limit)
+
+
+# Daraja kodlari: vectorized hisoblashda ishlatiladi
+LEVEL_NONE, LEVEL_WEAK, LEVEL_AVERAGE, LEVEL_GOOD = 0, 1, 2, 3
+
+
+def _first_per_pair(rows, student_index, assessment_index, offset=0):
+    # Bir juftlik uchun bir nechta yozuv bo‘lsa, eng birinchisi olinadi (.first() kabi)
+    seen = {}
+    for student_id, assessment_id, value in rows:
+        key = (student_index[student_id], assessment_index[assessment_id] + offset)
+        seen.setdefault(key, value)
+    if not seen:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64)
+    keys = np.array(list(seen.keys()), dtype=np.intp)
+    return keys[:, 0], keys[:, 1], np.fromiter(seen.values(), dtype=np.int64, count=len(seen))
+
+
+def categorize_scores(student_ids, quizzes, assignments):
+    # Barcha ma’lumot bir martada yuklanadi, keyin NumPy massivlarida hisoblanadi
+    student_ids = list(student_ids)
+    student_index = {sid: i for i, sid in enumerate(student_ids)}
+
+    quiz_rows = list(quizzes.values_list('id', 'max_score'))
+    assignment_rows = list(assignments.values_list('id', 'max_score'))
+    quiz_index = {row[0]: i for i, row in enumerate(quiz_rows)}
+    assignment_index = {row[0]: i for i, row in enumerate(assignment_rows)}
+    assessments = quiz_rows + assignment_rows
+
+    n_students, n_assessments = len(student_ids), len(assessments)
+    percents = np.full(n_students, np.nan)
+    levels = np.full(n_students, LEVEL_NONE, dtype=np.int8)
+    if not n_students or not n_assessments:
+        return percents, levels
+
+    # eligible[s, a]: o‘quvchi shu test/topshiriq uchun javobgarmi (AssessmentEligibility)
+    eligible = np.zeros((n_students, n_assessments), dtype=bool)
+    eligibility = AssessmentEligibility.objects.filter(
+        Q(assessment_type='quiz', assessment_id__in=list(quiz_index))
+        | Q(assessment_type='assignment', assessment_id__in=list(assignment_index)),
+        student_id__in=student_ids,
+    ).values_list('student_id', 'assessment_type', 'assessment_id')
+    offsets = {'quiz': (quiz_index, 0), 'assignment': (assignment_index, len(quiz_rows))}
+    rows, cols = [], []
+    for student_id, assessment_type, assessment_id in eligibility:
+        index, offset = offsets[assessment_type]
+        rows.append(student_index[student_id])
+        cols.append(index[assessment_id] + offset)
+    eligible[rows, cols] = True
+
+    max_scores = np.array([row[1] for row in assessments], dtype=np.int64)
+
+    earned = np.zeros((n_students, n_assessments), dtype=np.int64)
+    results = StudentQuizResult.objects.filter(
+        student_id__in=student_ids, quiz_id__in=list(quiz_index)
+    ).order_by('id').values_list('student_id', 'quiz_id', 'score')
+    rows, cols, values = _first_per_pair(results, student_index, quiz_index)
+    earned[rows, cols] = values
+
+    submissions = AssignmentSubmission.objects.filter(
+        student_id__in=student_ids, assignment_id__in=list(assignment_index), grade__isnull=False
+    ).order_by('id').values_list('student_id', 'assignment_id', 'grade')
+    rows, cols, values = _first_per_pair(submissions, student_index, assignment_index, offset=len(quiz_rows))
+    earned[rows, cols] = values
+
+    total_max = eligible @ max_scores
+    total_earned = np.where(eligible, earned, 0).sum(axis=1)
+
+    has_max = total_max > 0
+    percents[has_max] = total_earned[has_max] / total_max[has_max] * 100
+    levels[has_max] = np.select(
+        [percents[has_max] >= 90, percents[has_max] >= 60],
+        [LEVEL_GOOD, LEVEL_AVERAGE],
+        default=LEVEL_WEAK,
+    )
+    return percents, levels
@@ -1,9 +1,15 @@
 # main/signals.py
 
-import os
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import CustomUser
+from .models import CustomUser, Group, SiteSetting, ProfileSetting, Question, QuizItem, Answer, GroupStudentMembership, Quiz, Assignment, StudentQuizResult, AssignmentSubmission
+from .scores import schedule_score_refresh, group_student_ids
+from .rollups import schedule_quiz_completion, schedule_assignment_completion, schedule_group_completion, \
+    schedule_membership_eligibility, schedule_quiz_eligibility, schedule_assignment_eligibility
+from .notifications import schedule_notification_bump
+from .site_settings import invalidate_singleton
+from .grading import schedule_quiz_touch, schedule_version_publish
+from .question_bank import schedule_hash_refresh, schedule_orphan_cleanup
 
 @receiver(pre_save, sender=CustomUser)
 def delete_old_profile_image(sender, instance, **kwargs):
@@ -18,6 +24,160 @@ def delete_old_profile_image(sender, instance, **kwargs):
     old_image = old_user.profile_image
     new_image = instance.profile_image
 
+    # S3 omborida fayl yo‘li (path) yo‘q, shuning uchun o‘chirish ombor orqali
     if old_image and old_image != new_image:
-        if os.path.isfile(old_image.path):
-            os.remove(old_image.path)
+        old_image.storage.delete(old_image.name)
+
+
+# Reyting jadvali (StudentScoreLedger), bajarilish statistikasi (AssessmentCompletion)
+# va topshirish majburiyatlari (AssessmentEligibility) ni yangilab turish
+
+SCORE_FIELDS = {'group', 'group_id', 'teacher', 'teacher_id', 'max_score', 'created_at'}
+
+
+@receiver(post_save, sender=StudentQuizResult)
+@receiver(post_delete, sender=StudentQuizResult)
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_delete, sender=AssignmentSubmission)
+@receiver(post_save, sender=GroupStudentMembership)
+@receiver(post_delete, sender=GroupStudentMembership)
+def refresh_student_score(sender, instance, **kwargs):
+    schedule_score_refresh([instance.student_id])
+
+
+@receiver(pre_save, sender=Quiz)
+@receiver(pre_save, sender=Assignment)
+def remember_assessment_group(sender, instance, update_fields=None, **kwargs):
+    # Guruh almashtirilsa, eski guruh o‘quvchilari ham qayta hisoblanadi
+    instance._old_group_id = None
+    if update_fields is not None and not {'group', 'group_id'}.intersection(update_fields):
+        return
+    if instance.pk:
+        instance._old_group_id = sender.objects.filter(pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=Assignment)
+def refresh_assessment_scores(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SCORE_FIELDS.intersection(update_fields):
+        return
+
+    group_ids = {instance.group_id, getattr(instance, '_old_group_id', None)} - {None}
+    schedule_score_refresh(group_student_ids(group_ids))
+
+
+@receiver(post_save, sender=StudentQuizResult)
+@receiver(post_delete, sender=StudentQuizResult)
+def refresh_quiz_result_completion(sender, instance, **kwargs):
+    schedule_quiz_completion([instance.quiz_id])
+
+
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_delete, sender=AssignmentSubmission)
+def refresh_submission_completion(sender, instance, **kwargs):
+    schedule_assignment_completion([instance.assignment_id])
+
+
+@receiver(post_save, sender=GroupStudentMembership)
+@receiver(post_delete, sender=GroupStudentMembership)
+def refresh_membership_rollups(sender, instance, **kwargs):
+    schedule_membership_eligibility([(instance.student_id, instance.group_id)])
+    schedule_group_completion([instance.group_id])
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def refresh_quiz_rollups(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SCORE_FIELDS.intersection(update_fields):
+        return
+    schedule_quiz_eligibility([instance.pk])
+    schedule_quiz_completion([instance.pk])
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def refresh_assignment_rollups(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SCORE_FIELDS.intersection(update_fields):
+        return
+    schedule_assignment_eligibility([instance.pk])
+    schedule_assignment_completion([instance.pk])
+
+
+# O‘quvchi bildirishnomalari keshi (main/notifications.py) versiyasini almashtirish.
+# Eligibility yangilanishidan keyin ishlashi uchun yuqoridagi receiverlardan keyin ulanadi.
+
+@receiver(post_save, sender=StudentQuizResult)
+@receiver(post_delete, sender=StudentQuizResult)
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_delete, sender=AssignmentSubmission)
+@receiver(post_save, sender=GroupStudentMembership)
+@receiver(post_delete, sender=GroupStudentMembership)
+def bump_student_notifications(sender, instance, **kwargs):
+    schedule_notification_bump([instance.student_id])
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=Assignment)
+def bump_assessment_notifications(sender, instance, **kwargs):
+    # Nomi yoki muddati o‘zgarsa ham bildirishnoma matni o‘zgaradi
+    group_ids = {instance.group_id, getattr(instance, '_old_group_id', None)} - {None}
+    schedule_notification_bump(group_student_ids(group_ids))
+
+
+@receiver(post_save, sender=Group)
+def bump_group_notifications(sender, instance, created, **kwargs):
+    if not created:
+        schedule_notification_bump(group_student_ids([instance.pk]))
+
+
+@receiver(post_save, sender=SiteSetting)
+@receiver(post_delete, sender=SiteSetting)
+@receiver(post_save, sender=ProfileSetting)
+@receiver(post_delete, sender=ProfileSetting)
+def refresh_site_settings(sender, instance, **kwargs):
+    invalidate_singleton(sender)
+
+
+# Savol va javoblar o‘zgarsa ularni ishlatadigan barcha testlarning yangi versiyasi yaratiladi — javob kaliti va
+# savollar keshi versiya bo‘yicha saqlanadi (main/quiz_versions.py). Savollar banki xeshi ham qayta hisoblanadi (main/question_bank.py)
+VERSION_FIELDS = {'title', 'time_limit', 'max_score'}
+
+
+@receiver(post_save, sender=Quiz)
+def publish_quiz_version(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not VERSION_FIELDS.intersection(update_fields):
+        return
+    schedule_version_publish([instance.pk])
+
+
+def _question_quiz_ids(question_id):
+    return QuizItem.objects.filter(question_id=question_id).values_list('quiz_id', flat=True)
+
+
+@receiver(post_save, sender=Question)
+def touch_question_quiz(sender, instance, **kwargs):
+    schedule_quiz_touch(_question_quiz_ids(instance.pk))
+    schedule_hash_refresh([instance.pk])
+
+
+@receiver(post_save, sender=QuizItem)
+@receiver(post_delete, sender=QuizItem)
+def touch_item_quiz(sender, instance, **kwargs):
+    schedule_quiz_touch([instance.quiz_id])
+
+
+@receiver(post_delete, sender=QuizItem)
+def cleanup_orphan_question(sender, instance, **kwargs):
+    # Commitdan keyin tekshiriladi: savol shu tranzaksiyada boshqa testga ko‘chirilgan bo‘lishi mumkin
+    schedule_orphan_cleanup([instance.question_id])
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def touch_answer_quiz(sender, instance, **kwargs):
+    schedule_quiz_touch(_question_quiz_ids(instance.question_id))
+    schedule_hash_refresh([instance.question_id])
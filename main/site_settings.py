@@ -0,0 +1,54 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import SiteSetting, ProfileSetting
+
+# Admin orqali yagona nusxada saqlanadigan sozlamalar (SiteSettingAdmin.has_add_permission).
+# Har bir worker obyektni o‘zida saqlaydi, umumiy keshdagi versiya o‘zgarsa qayta o‘qiydi
+SINGLETON_MODELS = (SiteSetting, ProfileSetting)
+
+_local = {}
+
+
+def _version_key(model):
+    return f'singleton:version:{model._meta.label_lower}'
+
+
+def _current_version(model):
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_singleton(model):
+    version = _current_version(model)
+    cached = _local.get(model)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    instance = model.objects.first()
+    _local[model] = (version, instance)
+    return instance
+
+
+def get_site_setting():
+    return get_singleton(SiteSetting)
+
+
+def get_profile_setting():
+    return get_singleton(ProfileSetting)
+
+
+def invalidate_singleton(model):
+    # Commitdan keyin versiya almashtiriladi, boshqa workerlar keyingi so‘rovda yangisini o‘qiydi
+    def bump():
+        _local.pop(model, None)
+        cache.set(_version_key(model), uuid.uuid4().hex, timeout=None)
+
+    transaction.on_commit(bump)
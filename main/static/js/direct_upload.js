@@ -0,0 +1,77 @@
+// Bucketga to‘g‘ridan-to‘g‘ri yuklash (main/direct_upload.py): server imzolangan POST siyosati beradi, fayl
+// Django orqali o‘tmasdan bucketga yuboriladi, so‘ng server yakunlash so‘rovida faylni tekshirib qayd etadi.
+// Ombor S3 bo‘lmasa directUpload null qaytaradi — sahifa odatdagi yuklashdan foydalanadi
+
+function csrfTokenOf(form) {
+    return form.querySelector('[name="csrfmiddlewaretoken"]').value;
+}
+
+function postToBucket(url, fields, file, onProgress) {
+    // fetch yuklash jarayonini ko‘rsatmaydi, shuning uchun XMLHttpRequest.
+    // Imzolangan siyosat maydonlari fayldan oldin kelishi kerak
+    return new Promise((resolve, reject) => {
+        const body = new FormData();
+        Object.entries(fields).forEach(([name, value]) => body.append(name, value));
+        body.append("file", file);
+        const xhr = new XMLHttpRequest();
+        xhr.open("POST", url);
+        xhr.upload.onprogress = (e) => {
+            if (onProgress && e.lengthComputable) onProgress(Math.floor(e.loaded * 100 / e.total));
+        };
+        xhr.onload = () => (xhr.status >= 200 && xhr.status < 300 ? resolve() : reject(new Error(`Bucket javobi: ${xhr.status}`)));
+        xhr.onerror = () => reject(new Error("Aloqa uzildi"));
+        xhr.send(body);
+    });
+}
+
+async function directUpload(params, file, csrfToken, onProgress) {
+    if (!window.fetch) return null;
+    const startResponse = await fetch("/uploads/direct/", {
+        method: "POST",
+        headers: {"Content-Type": "application/json", "X-CSRFToken": csrfToken},
+        body: JSON.stringify({...params, filename: file.name, size: file.size, content_type: file.type}),
+    });
+    const upload = await startResponse.json();
+    // enabled: false — to‘g‘ridan-to‘g‘ri yuklash yoqilmagan (fayllar serverda saqlanadi)
+    if (upload.enabled === false) return null;
+    if (!startResponse.ok) throw new Error(upload.error);
+
+    await postToBucket(upload.url, upload.fields, file, onProgress);
+
+    const completeResponse = await fetch(`/uploads/direct/${upload.upload_id}/complete/`, {
+        method: "POST",
+        headers: {"X-CSRFToken": csrfToken},
+    });
+    const state = await completeResponse.json();
+    if (!completeResponse.ok) throw new Error(state.error);
+    return state;
+}
+
+function enableDirectUpload(form, fileInput, params) {
+    // Forma fayli avval bucketga yuklanadi, keyin forma fayl o‘rniga direct_upload id si bilan yuboriladi
+    form.addEventListener("submit", async (e) => {
+        const file = fileInput.files[0];
+        if (!file || !window.fetch || form.dataset.directUploaded) return;
+        e.preventDefault();
+        const button = form.querySelector('button[type="submit"]');
+        if (button) button.disabled = true;
+        try {
+            const state = await directUpload(params(form), file, csrfTokenOf(form), (percent) => {
+                if (button) button.textContent = `Yuklanmoqda: ${percent}%`;
+            });
+            if (state) {
+                const hidden = document.createElement("input");
+                hidden.type = "hidden";
+                hidden.name = "direct_upload";
+                hidden.value = state.upload_id;
+                form.appendChild(hidden);
+                fileInput.disabled = true;
+            }
+            form.dataset.directUploaded = "1";
+            form.submit();
+        } catch (error) {
+            alert(`Xatolik: ${error.message || "fayl yuklanmadi"}`);
+            if (button) button.disabled = false;
+        }
+    });
+}
@@ -1,67 +1,49 @@
+import json
+
 from django.contrib.auth.decorators import login_required
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import Sum, Count, OuterRef, Subquery
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST, require_http_methods
 from django.contrib import messages
-from main.models import Quiz, Group, StudentQuizResult, Answer, StudentAnswer, Schedule, DAYS_OF_WEEK, Assignment, \
-    AssignmentSubmission, CustomUser, GroupStudentMembership, StudentPayment, GroupPaymentInfo
+from main.models import Quiz, QuizItem, Group, StudentQuizResult, Schedule, DAYS_OF_WEEK, Assignment, \
+    AssignmentSubmission, GroupStudentMembership, StudentPayment, GroupPaymentInfo, StudentScoreLedger, \
+    QuizSubmission, AssignmentUpload
+from main.scores import get_leaderboard
+from main.rollups import eligible_quizzes, eligible_assignments
+from main.grading import grade_submission, get_answer_key, get_version_answer_key, parse_selections, \
+    result_selections
+from main.attempts import get_saved_answers, autosave_answers, clear_saved_answers
+from main.exam_queue import enqueue_submission, submission_status
+from main.assignment_upload import UploadError, start_upload, append_chunk, upload_state
+from main.direct_upload import claim_direct_upload
+from main.quiz_delivery import get_quiz_delivery, get_version_delivery
 from django.contrib.auth import update_session_auth_hash
 from collections import OrderedDict
 from django.utils.timezone import now
-from django.db.models import Q
 
 
 
 def get_student_level_among_group(student):
-    memberships = GroupStudentMembership.objects.filter(student=student).select_related('group')
-    group_ids = [m.group.id for m in memberships]
-
-    # Barcha o‘quvchilar (shu guruhlarga tegishli)
-    all_memberships = GroupStudentMembership.objects.filter(group_id__in=group_ids).select_related('student', 'group')
-
-    student_join_dates = {}
-    for m in all_memberships:
-        sid = m.student.id
-        gid = m.group.id
-        if sid not in student_join_dates:
-            student_join_dates[sid] = {}
-        student_join_dates[sid][gid] = m.joined_at
-
-    students = CustomUser.objects.filter(id__in=student_join_dates.keys(), role='student').distinct()
+    # Shu o‘quvchi bilan bir guruhda o‘qiydiganlarning reyting ballari
+    group_ids = GroupStudentMembership.objects.filter(student=student).values('group_id')
+    entries = StudentScoreLedger.objects.filter(
+        student__groupstudentmembership__group_id__in=group_ids
+    ).distinct().values_list('student_id', 'earned_points', 'max_points')
 
+    total = 0
     good = average = weak = 0
     student_percent = None
 
-    for s in students:
-        join_dates = student_join_dates[s.id]
-        student_quizzes = Quiz.objects.none()
-        student_assignments = Assignment.objects.none()
-
-        for group_id, joined_at in join_dates.items():
-            student_quizzes |= Quiz.objects.filter(group_id=group_id, created_at__gte=joined_at)
-            student_assignments |= Assignment.objects.filter(group_id=group_id, created_at__gte=joined_at)
-
-        quiz_score = StudentQuizResult.objects.filter(
-            student=s, quiz__in=student_quizzes
-        ).aggregate(Sum('score'))['score__sum'] or 0
-
-        assign_score = AssignmentSubmission.objects.filter(
-            student=s, assignment__in=student_assignments,
-            grade__isnull=False
-        ).aggregate(Sum('grade'))['grade__sum'] or 0
-
-        student_total_max = (
-            student_quizzes.aggregate(Sum('max_score'))['max_score__sum'] or 0
-        ) + (
-            student_assignments.aggregate(Sum('max_score'))['max_score__sum'] or 0
-        )
-
-        if student_total_max == 0:
+    for student_id, earned, max_points in entries:
+        total += 1
+        if max_points == 0:
             continue
 
-        percent = (quiz_score + assign_score) / student_total_max * 100
+        percent = earned / max_points * 100
 
-        if s == student:
+        if student_id == student.id:
             student_percent = percent
 
         if percent >= 90:
@@ -81,7 +63,7 @@ def get_student_level_among_group(student):
         level = "Past"
 
     return {
-        'total': students.count(),
+        'total': total,
         'good': good,
         'average': average,
         'weak': weak,
@@ -89,77 +71,9 @@ def get_student_level_among_group(student):
     }
 
 
-
-from django.db.models import Sum
-
 def get_top_students(current_student):
-    memberships = GroupStudentMembership.objects.select_related('student', 'group')
-
-    student_scores = []
-    seen_students = set()
-
-    for m in memberships:
-        student = m.student
-        if student.id in seen_students or student.role != 'student':
-            continue
-        seen_students.add(student.id)
-
-        # O‘quvchining guruhdagi barcha topshiriq va testlari
-        student_memberships = GroupStudentMembership.objects.filter(student=student).select_related('group')
-
-        all_assignments = Assignment.objects.none()
-        all_quizzes = Quiz.objects.none()
-
-        for sm in student_memberships:
-            group_id = sm.group.id
-            joined_at = sm.joined_at
-
-            group_assignments = Assignment.objects.filter(group_id=group_id, created_at__gte=joined_at)
-            group_quizzes = Quiz.objects.filter(group_id=group_id, created_at__gte=joined_at)
-
-            all_assignments |= group_assignments
-            all_quizzes |= group_quizzes
-
-        # ✅ O‘quvchining to‘plagan ballari
-        assign_score = AssignmentSubmission.objects.filter(
-            student=student,
-            assignment__in=all_assignments,
-            grade__isnull=False
-        ).aggregate(Sum('grade'))['grade__sum'] or 0
-
-        quiz_score = StudentQuizResult.objects.filter(
-            student=student,
-            quiz__in=all_quizzes
-        ).aggregate(Sum('score'))['score__sum'] or 0
-
-        total_score = assign_score + quiz_score
-
-        # ✅ Maksimal ball
-        max_assign_score = all_assignments.aggregate(Sum('max_score'))['max_score__sum'] or 0
-        max_quiz_score = all_quizzes.aggregate(Sum('max_score'))['max_score__sum'] or 0
-
-        total_max_score = max_assign_score + max_quiz_score
-
-        # ✅ Foiz hisoblash
-        if total_max_score == 0:
-            percentage = 0
-        else:
-            percentage = round((total_score / total_max_score) * 100, 2)
-
-        student_scores.append({
-            'student': student,
-            'score_percent': percentage
-        })
-
-    # Reyting qilish
-    sorted_scores = sorted(student_scores, key=lambda x: x['score_percent'], reverse=True)
-    for idx, s in enumerate(sorted_scores, 1):
-        s['rank'] = idx
-
-    top_10 = sorted_scores[:10]
-    student_place = next((s for s in sorted_scores if s['student'] == current_student), None)
-
-    return top_10, student_place
+    # Reyting manbasi settings.LEADERBOARD_BACKEND orqali tanlanadi (scores.py)
+    return get_leaderboard(current_student)
 
 
 
@@ -171,17 +85,9 @@ def student_home_view(request):
     if student.role != 'student':
         return redirect('login')
 
-    memberships = GroupStudentMembership.objects.filter(student=student).select_related('group')
-    group_joined_times = {m.group.id: m.joined_at for m in memberships}
-    group_ids = list(group_joined_times.keys())
-
-    # Faqat guruhga qo‘shilgan vaqtdan keyin yaratilgan assignments va quizzes
-    assignments = Assignment.objects.none()
-    quizzes = Quiz.objects.none()
-
-    for group_id, joined_at in group_joined_times.items():
-        assignments |= Assignment.objects.filter(group_id=group_id, created_at__gte=joined_at)
-        quizzes |= Quiz.objects.filter(group_id=group_id, created_at__gte=joined_at)
+    # Faqat guruhga qo‘shilgan vaqtdan keyin yaratilgan assignments va quizzes (AssessmentEligibility)
+    assignments = eligible_assignments(student)
+    quizzes = eligible_quizzes(student)
 
     # Statistika: foizlar
     total_assignments = assignments.count()
@@ -254,8 +160,8 @@ def student_profile_view(request):
                 messages.success(request, "Parolingiz muvaffaqiyatli o‘zgartirildi!", extra_tags='passwordd_img')
 
         elif form_type == 'upload_image':
-            if 'profile_image' in request.FILES:
-                image = request.FILES['profile_image']
+            image = request.FILES.get('profile_image') or claim_direct_upload(student, request.POST.get('direct_upload'), 'profile_image')
+            if image:
                 student.profile_image = image
                 student.save()
                 messages.success(request, "Rasmingiz muvaffaqiyatli o‘zgartirildi!", extra_tags='passwordd_img')
@@ -330,48 +236,32 @@ def student_quiz_list(request):
     if student.role != 'student':
         return redirect('login')
 
-    groups = student.student_groups.all()
-    quizzes = Quiz.objects.filter(group__in=groups).distinct().order_by('-created_at')
+    # Faqat o‘quvchi guruhga qo‘shilgandan keyin yaratilgan testlar. Savollar soni, natija va
+    # to‘g‘ri javoblar soni bitta so‘rovda (testlar soni ortsa ham so‘rovlar soni o‘zgarmaydi)
+    results = StudentQuizResult.objects.filter(student=student, quiz=OuterRef('pk')).order_by('id')
+    quizzes = eligible_quizzes(student).select_related('group').annotate(
+        total_questions=Subquery(
+            QuizItem.objects.filter(quiz=OuterRef('pk')).values('quiz').annotate(count=Count('id')).values('count')
+        ),
+        result_id=Subquery(results.values('id')[:1]),
+        result_score=Subquery(results.values('score')[:1]),
+        correct_count=Subquery(results.values('correct_count')[:1]),
+    ).order_by('-created_at')
 
     quiz_data = []
 
     for quiz in quizzes:
-        # O'quvchi bu quiz guruhiga qachon qo'shilganini topamiz
-        membership = GroupStudentMembership.objects.filter(
-            group=quiz.group,
-            student=student
-        ).first()
-
-        # Agar umuman membership yo'q bo‘lsa yoki quiz yaratilib bo‘lgandan keyin qo‘shilmagan bo‘lsa – o'tkazib yuboramiz
-        if not membership or membership.joined_at > quiz.created_at:
-            continue
-
-        result = StudentQuizResult.objects.filter(student=student, quiz=quiz).first()
-
-        total_questions = quiz.questions.count()
-        correct_count = 0
-        score = None
-        result_id = None
         score_percent = None
-
-        if result:
-            for answer in result.answers.all():
-                if answer.selected_answer and answer.selected_answer.is_correct:
-                    correct_count += 1
-
-            result_id = result.id
-            score = result.score
-
-            if quiz.max_score:  # max_score mavjud bo‘lsa foizni hisoblaymiz
-                score_percent = round((score / quiz.max_score) * 100)
+        if quiz.result_id is not None and quiz.max_score:  # max_score mavjud bo‘lsa foizni hisoblaymiz
+            score_percent = round((quiz.result_score / quiz.max_score) * 100)
 
         quiz_data.append({
             'quiz': quiz,
-            'total_questions': total_questions,
-            'correct_count': correct_count if result else None,
-            'score': score,
+            'total_questions': quiz.total_questions or 0,
+            'correct_count': (quiz.correct_count or 0) if quiz.result_id is not None else None,
+            'score': quiz.result_score,
             'score_percent': score_percent,
-            'result_id': result_id,
+            'result_id': quiz.result_id,
         })
 
     return render(request, 'student-quiz-list.html', {
@@ -386,29 +276,58 @@ def start_quiz(request, quiz_id):
 
     quiz = get_object_or_404(Quiz, id=quiz_id)
 
-    # Foydalanuvchi avval bu testni bajarganmi?
-    existing_result = StudentQuizResult.objects.filter(student=student, quiz=quiz).first()
+    # Foydalanuvchi avval bu testni bajarganmi? Test keyin tahrirlangan bo‘lsa ham natija o‘chirilmaydi:
+    # u topshirilgan versiyaga bog‘langan (main/quiz_versions.py)
+    if StudentQuizResult.objects.filter(student=student, quiz=quiz).exists():
+        messages.info(request, "Siz bu testni  bajargansiz.", extra_tags='quiz-info')
+        return redirect('student_quiz_list')
 
-    if existing_result:
-        # Agar testni bajargan bo‘lsa va u test tahrirlanmagan bo‘lsa — natijaga yo‘naltiramiz
-        if existing_result.quiz_last_updated >= quiz.updated_at:
-            messages.info(request, "Siz bu testni  bajargansiz.", extra_tags='quiz-info')
-            return redirect('student_quiz_list')
-        else:
-            # Aks holda test tahrirlangan — avvalgi natijani o‘chiramiz
-            existing_result.delete()
-
-    # Testni boshlash sahifasi (savollarni ko‘rsatamiz)
-    questions = quiz.questions.prefetch_related('answers')
+    # Testni boshlash sahifasi: savollar bloki test versiyasi bo‘yicha keshdan olinadi (main/quiz_delivery.py).
+    # Sahifaning o‘zi ETag bilan berilmaydi — saqlangan tanlovlar, bildirishnomalar va CSRF token har so‘rovda boshqa
+    delivery = get_quiz_delivery(quiz)
 
     return render(request, 'student_quiz_start.html', {
         'quiz': quiz,
-        'questions': questions,
+        'questions_html': delivery['html'],
+        'saved_answers': get_saved_answers(student, quiz),
         'student': student,
         'time_limit': quiz.time_limit,
     })
 
 
+@login_required
+@require_POST
+def autosave_quiz(request, quiz_id):
+    # Brauzer bir necha soniyada bir marta barcha tanlangan javoblarni yuboradi: {"answers": {"<savol_id>": <javob_id>}}
+    student = request.user
+    if student.role != 'student':
+        return JsonResponse({'error': 'forbidden'}, status=403)
+
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    try:
+        answers = json.loads(request.body).get('answers', {})
+        data = {f'question_{question_id}': answer_id for question_id, answer_id in answers.items()}
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'invalid payload'}, status=400)
+
+    # Faqat shu testning savol/javoblari qabul qilinadi (javob kaliti keshidan, so‘rovsiz)
+    selections = parse_selections(get_answer_key(quiz), data)
+    answers = {question_id: answer_id for question_id, answer_id in selections.items() if answer_id is not None}
+    buffer = autosave_answers(student, quiz, answers)
+
+    return JsonResponse({'saved': len(answers), 'saved_at': buffer['saved_at'].isoformat()})
+
+
+def wrong_questions(result):
+    # Noto‘g‘ri yoki javobsiz qoldirilgan savollar natija topshirilgan versiya bo‘yicha: ixcham tanlovlar,
+    # versiya kaliti va savollar keshidan (har bir javob uchun alohida so‘rov yo‘q)
+    key = get_version_answer_key(result.version_id)
+    selections = result_selections(result)
+    return [
+        question for question in get_version_delivery(result.version_id)['questions']
+        if question['id'] in selections and selections[question['id']] not in key.correct.get(question['id'], ())
+    ]
+
 
 @login_required
 def submit_quiz(request, quiz_id):
@@ -416,54 +335,42 @@ def submit_quiz(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id)
 
     if request.method == "POST":
-        existing_result = StudentQuizResult.objects.filter(student=student, quiz=quiz).first()
-        if existing_result and existing_result.quiz_last_updated >= quiz.updated_at:
-            # Eski natija mavjud va test o‘zgarmagan — natijani ko‘rsatamiz
-            correct_count = 0
-            for answer in existing_result.answers.all():
-                if answer.selected_answer and answer.selected_answer.is_correct:
-                    correct_count += 1
-            total_questions = quiz.questions.count()
-            score = round((correct_count / total_questions) * quiz.max_score) if total_questions else 0
+        existing_result = StudentQuizResult.objects.filter(student=student, quiz=quiz).select_related('version').first()
+        if existing_result:
+            # Natija mavjud — u topshirilgan versiya bo‘yicha ko‘rsatiladi (test keyin tahrirlangan bo‘lsa ham)
+            total_questions = len(get_version_answer_key(existing_result.version_id).question_ids)
+            max_score = existing_result.version.max_score if existing_result.version else quiz.max_score
 
             return render(request, 'student_submit_quiz.html', {
                 'student': student,
                 'result': existing_result,
-                'correct_count': correct_count,
+                'correct_count': existing_result.correct_count,
                 'total_questions': total_questions,
-                'score': score
+                'score': existing_result.score,
+                'score_percent': round((existing_result.score / max_score) * 100) if max_score else 0,
+                'wrong_questions': wrong_questions(existing_result),
             })
 
-        # Eski natijani o‘chirish
-        if existing_result:
-            existing_result.delete()
+        # Avtosaqlangan javoblar olinadi, formadagi tanlovlar ularning ustidan yoziladi
+        data = {f'question_{question_id}': str(answer_id) for question_id, answer_id in get_saved_answers(student, quiz).items()}
+        data.update({name: value for name, value in request.POST.items() if name.startswith('question_') and value})
 
-        correct_count = 0
-        result = StudentQuizResult.objects.create(
-            student=student,
-            quiz=quiz,
-            score=0,
-            quiz_last_updated=quiz.updated_at
-        )
-
-        for question in quiz.questions.all():
-            selected_id = request.POST.get(f'question_{question.id}')
-            selected_answer = Answer.objects.filter(id=selected_id).first()
-
-            StudentAnswer.objects.create(
-                result=result,
-                question=question,
-                selected_answer=selected_answer
-            )
+        # Avtosaqlangan urinish faqat natija yoki navbat yozuvi saqlangach o‘chiriladi: baholashda xato bo‘lsa
+        # o‘quvchining tanlovlari yo‘qolmaydi
+        with transaction.atomic():
+            if quiz.exam_mode:
+                # Imtihon rejimi: javoblar navbatga yoziladi, baholashni worker bajaradi (main/exam_queue.py)
+                submission = enqueue_submission(student, quiz, data)
+            else:
+                # Eski natija o‘chiriladi, yangi natija va javoblar bitta tranzaksiyada yoziladi (main/grading.py)
+                result, correct_count, total_questions = grade_submission(student, quiz, data)
+            transaction.on_commit(lambda: clear_saved_answers(student, quiz))
 
-            if selected_answer and selected_answer.is_correct:
-                correct_count += 1
+        if quiz.exam_mode:
+            return redirect('quiz_submission_status', submission_id=submission.id)
 
-        total_questions = quiz.questions.count()
-        score = round((correct_count / total_questions) * quiz.max_score) if total_questions else 0
+        score = result.score
         score_percent = round((score / quiz.max_score) * 100) if quiz.max_score else 0
-        result.score = score
-        result.save()
 
         return render(request, 'student_submit_quiz.html', {
             'student': student,
@@ -472,11 +379,42 @@ def submit_quiz(request, quiz_id):
             'total_questions': total_questions,
             'score': score,
             'score_percent': score_percent,
+            'wrong_questions': wrong_questions(result),
         })
 
     return redirect('student_quiz_list')
 
 
+@login_required
+def quiz_submission_status(request, submission_id):
+    student = request.user
+    submission = get_object_or_404(QuizSubmission.objects.select_related('quiz', 'result'), id=submission_id, student=student)
+    context = {'student': student, 'submission': submission, 'result': None}
+
+    result = submission.result if submission.status == 'done' else None
+    if submission.status == 'done' and result is None:
+        # Natija keyinroq o‘chirilgan (masalan, test qayta topshirilgan)
+        return redirect('student_quiz_list')
+    if result:
+        quiz = submission.quiz
+        context.update({
+            'result': result,
+            'correct_count': result.correct_count,
+            'total_questions': len(get_version_answer_key(result.version_id).question_ids),
+            'score': result.score,
+            'score_percent': round((result.score / quiz.max_score) * 100) if quiz.max_score else 0,
+            'wrong_questions': wrong_questions(result),
+        })
+
+    return render(request, 'student_submit_quiz.html', context)
+
+
+@login_required
+def quiz_submission_poll(request, submission_id):
+    submission = get_object_or_404(QuizSubmission, id=submission_id, student=request.user)
+    return JsonResponse(submission_status(submission))
+
+
 @login_required
 def student_assignments_view(request):
     student = request.user
@@ -484,16 +422,8 @@ def student_assignments_view(request):
     if student.role != 'student':
         return redirect('login')
 
-    # Guruh a'zoligini olib, qo‘shilgan vaqtni olish
-    memberships = GroupStudentMembership.objects.filter(student=student).select_related('group')
-    group_join_times = {m.group.id: m.joined_at for m in memberships}
-
-    # Har bir guruh uchun, faqat guruhga qo‘shilgandan keyin yaratilgan topshiriqlarni olish
-    q_filter = Q()
-    for group_id, joined_at in group_join_times.items():
-        q_filter |= Q(group_id=group_id, created_at__gte=joined_at)
-
-    assignments = Assignment.objects.filter(q_filter)\
+    # Faqat guruhga qo‘shilgandan keyin yaratilgan topshiriqlar
+    assignments = eligible_assignments(student)\
         .select_related('group', 'teacher')\
         .order_by('-created_at')
 
@@ -533,6 +463,52 @@ def submit_assignment(request, assignment_id):
     return redirect('student_assignments')
 
 
+@login_required
+@require_POST
+def start_assignment_upload(request, assignment_id):
+    # Bo‘laklab yuklashni boshlash: {"filename", "size", "fingerprint", "sha256" (ixtiyoriy)} -> yuklash holati
+    student = request.user
+    if student.role != 'student':
+        return JsonResponse({'error': 'forbidden'}, status=403)
+
+    assignment = get_object_or_404(Assignment, id=assignment_id)
+    try:
+        payload = json.loads(request.body)
+        filename, size = payload.get('filename'), payload.get('size')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'invalid payload'}, status=400)
+    try:
+        upload = start_upload(
+            student, assignment, filename, size,
+            fingerprint=payload.get('fingerprint', ''), checksum=payload.get('sha256', ''),
+        )
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    return JsonResponse(upload_state(upload))
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def assignment_upload_chunk(request, upload_id):
+    # GET — qabul qilingan offset (uzilishdan keyin davom ettirish uchun). POST — bo‘lak: xom tana
+    # (application/octet-stream), Upload-Offset sarlavhasi va ixtiyoriy Upload-Checksum (bo‘lak sha256 xeshi)
+    upload = get_object_or_404(AssignmentUpload, id=upload_id, student=request.user)
+    if request.method == 'GET':
+        return JsonResponse(upload_state(upload))
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset sarlavhasi noto‘g‘ri', **upload_state(upload)}, status=400)
+    try:
+        upload = append_chunk(upload, offset, request, length, checksum=request.headers.get('Upload-Checksum', ''))
+    except UploadError as exc:
+        upload.refresh_from_db()
+        return JsonResponse({'error': str(exc), **upload_state(upload)}, status=exc.status)
+    return JsonResponse(upload_state(upload))
+
+
 @login_required
 def student_payment_view(request):
     student = request.user
@@ -0,0 +1,96 @@
+import os
+import zipfile
+
+from django.utils.text import get_valid_filename
+from django.utils.timezone import localtime
+
+from .models import AssignmentSubmission
+
+# Topshiriqning barcha javoblari bitta ZIP arxiv sifatida oqim bilan beriladi: arxiv diskka yoki xotiraga
+# yig‘ilmaydi, har bir fayl ARCHIVE_CHUNK_SIZE bo‘laklab o‘qilib siqiladi va darhol mijozga yuboriladi.
+# Shuning uchun xotira arxiv hajmiga (masalan 2 GB) bog‘liq emas
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStream:
+    # zipfile yozadigan, lekin orqaga qaytib (seek) bo‘lmaydigan bufer — yozilgan baytlar generator orqali olinadi
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _open_chunks(file):
+    # Qaytadi: (hajm, bo‘laklar iteratori, yopish funksiyasi). S3File butun obyektni vaqtinchalik faylga
+    # yuklab oladi, shuning uchun S3 da obyekt tanasi to‘g‘ridan-to‘g‘ri bo‘laklab o‘qiladi
+    from storages.backends.s3 import S3Storage
+
+    storage = file.storage
+    if isinstance(storage, S3Storage):
+        from botocore.exceptions import ClientError
+
+        # open() obyekt yo‘q bo‘lsa FileNotFoundError beradi; tana esa S3File.obj orqali o‘qiladi
+        try:
+            response = storage.open(file.name, 'rb').obj.get()
+        except ClientError:
+            raise FileNotFoundError(file.name)
+        body = response['Body']
+        return response['ContentLength'], body.iter_chunks(ARCHIVE_CHUNK_SIZE), body.close
+
+    handle = storage.open(file.name, 'rb')
+    return storage.size(file.name), iter(lambda: handle.read(ARCHIVE_CHUNK_SIZE), b''), handle.close
+
+
+def _archive_name(submission, used):
+    # Fayl o‘quvchi ismi bilan nomlanadi, bir xil ismlilarga tartib raqami qo‘shiladi. Raqamli nom ham
+    # band bo‘lishi mumkin (masalan o‘quvchining o‘z familiyasi «_2» bilan tugasa), shuning uchun tayyor
+    # nom arxivdagi barcha nomlar bilan solishtiriladi
+    student = submission.student
+    base = get_valid_filename(f'{student.last_name} {student.first_name}'.strip() or student.username)
+    ext = os.path.splitext(submission.file.name)[1].lower()
+    name, number = f'{base}{ext}', 1
+    while name in used:
+        number += 1
+        name = f'{base}_{number}{ext}'
+    used.add(name)
+    return name
+
+
+def stream_submissions_zip(assignment):
+    # StreamingHttpResponse uchun generator. Ombordan o‘chib ketgan fayllar arxivga kirmaydi
+    submissions = AssignmentSubmission.objects.filter(assignment=assignment).exclude(file='').select_related(
+        'student'
+    ).order_by('student__last_name', 'student__first_name', 'id')
+
+    stream, used = _ZipStream(), set()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for submission in submissions:
+            try:
+                size, chunks, close = _open_chunks(submission.file)
+            except FileNotFoundError:
+                continue
+            try:
+                info = zipfile.ZipInfo(_archive_name(submission, used), localtime(submission.submitted_at).timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                # Hajm oldindan berilsa zipfile 4 GB dan katta fayllar uchun ZIP64 yozuvini o‘zi tanlaydi
+                info.file_size = size
+                with archive.open(info, 'w') as entry:
+                    for chunk in chunks:
+                        entry.write(chunk)
+                        data = stream.pop()
+                        if data:
+                            yield data
+            finally:
+                close()
+    # Oxirgi fayl qoldig‘i va arxiv katalogi ZipFile yopilganda yoziladi
+    yield stream.pop()
@@ -2,17 +2,27 @@ from datetime import timedelta
 
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.decorators import login_required
-from django.db import models
+from django.db import models, transaction
 from django.shortcuts import render, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
-from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.http import content_disposition_header
 from django.db.models import Count
 
 from . import student
 from .models import Group, CustomUser, Schedule, Quiz, Question, Answer, StudentQuizResult, Assignment, Attendance, \
-    AssignmentSubmission, GroupStudentMembership
+    AssignmentSubmission
 from django.shortcuts import redirect
+from .scores import categorize_scores, LEVEL_NONE, LEVEL_WEAK, LEVEL_AVERAGE, LEVEL_GOOD
+from .rollups import get_teacher_completion, eligible_students
+from .grading import get_answer_key, rescore_quiz_results
+from .quiz_import import import_questions
+from .quiz_versions import publish_version, current_version_id
+from .item_analysis import get_quiz_analysis, item_flag
+from .question_bank import add_to_quiz, quiz_questions, shared_question_ids, fork_question, content_hash
+from .direct_upload import claim_direct_upload
+from .submission_archive import stream_submissions_zip
 
 
 # O'qituvchiga tegishli guruhlardagi o'quvchilarni olish
@@ -23,64 +33,30 @@ def get_teacher_students(teacher):
 # Talabalarni kategoriyalash – faollikka qarab
 
 def categorize_students(teacher):
-    students = get_teacher_students(teacher)
+    students = list(get_teacher_students(teacher))
     quizzes = Quiz.objects.filter(teacher=teacher)
     assignments = Assignment.objects.filter(teacher=teacher)
 
+    # Ballar scores.categorize_scores da NumPy orqali bir martada hisoblanadi
+    _, levels = categorize_scores([s.id for s in students], quizzes, assignments)
+
     good, average, weak = [], [], []
     student_levels = {}
+    buckets = {
+        LEVEL_GOOD: (good, "Yuqori daraja"),
+        LEVEL_AVERAGE: (average, "O'rtacha daraja"),
+        LEVEL_WEAK: (weak, "Boshlang'ich daraja"),
+    }
 
-    total_max_score = 0
-    student_scores = {}
-
-    for student in students:
-        quiz_score_sum = 0
-        assign_score_sum = 0
-        student_total_max = 0
-
-        for quiz in quizzes:
-            # Agar student quizdan oldin guruhga qo‘shilgan bo‘lsa
-            if GroupStudentMembership.objects.filter(
-                student=student,
-                group=quiz.group,
-                joined_at__lte=quiz.created_at
-            ).exists():
-                result = StudentQuizResult.objects.filter(student=student, quiz=quiz).first()
-                if result:
-                    quiz_score_sum += result.score
-                student_total_max += quiz.max_score
-
-        for assignment in assignments:
-            if GroupStudentMembership.objects.filter(
-                student=student,
-                group=assignment.group,
-                joined_at__lte=assignment.created_at
-            ).exists():
-                submission = AssignmentSubmission.objects.filter(
-                    student=student, assignment=assignment, grade__isnull=False
-                ).first()
-                if submission:
-                    assign_score_sum += submission.grade
-                student_total_max += assignment.max_score
-
-        total_score = quiz_score_sum + assign_score_sum
-        if student_total_max == 0:
+    for student, level in zip(students, levels.tolist()):
+        if level == LEVEL_NONE:
             continue  # Bu o‘quvchi uchun baholashga mos topshiriqlar yo‘q
-
-        score_percent = (total_score / student_total_max) * 100
-
-        if score_percent >= 90:
-            good.append(student)
-            student_levels[student.id] = "Yuqori daraja"
-        elif score_percent >= 60:
-            average.append(student)
-            student_levels[student.id] = "O'rtacha daraja"
-        else:
-            weak.append(student)
-            student_levels[student.id] = "Boshlang'ich daraja"
+        bucket, label = buckets[level]
+        bucket.append(student)
+        student_levels[student.id] = label
 
     return {
-        'total': students.count(),
+        'total': len(students),
         'good': good,
         'average': average,
         'weak': weak,
@@ -95,72 +71,12 @@ def teacher_home_view(request):
         return redirect('login')
 
     stats = categorize_students(teacher)
-    # O'qituvchiga tegishli quiz va assignmentlar
-    teacher_quizzes = Quiz.objects.filter(teacher=teacher)
-    teacher_assignments = Assignment.objects.filter(teacher=teacher)
-
-    # O'qituvchining o'quvchilari
-    students = get_teacher_students(teacher)
-    student_count = students.count()
-
-    # Umumiy imkoniyatlar (barcha o'quvchilar har bir test/topshiriqni topshirishi mumkin)
-    total_assignment_opportunities = teacher_assignments.count() * student_count
-    total_quiz_opportunities = teacher_quizzes.count() * student_count
-
-    # Haqiqiy topshirilganlar soni
-    completed_assignments = 0
-    for assignment in teacher_assignments:
-        for student in students:
-            if GroupStudentMembership.objects.filter(
-                student=student,
-                group=assignment.group,
-                joined_at__lte=assignment.created_at
-            ).exists():
-                if AssignmentSubmission.objects.filter(assignment=assignment, student=student).exists():
-                    completed_assignments += 1
-
-    completed_quizzes = 0
-    for quiz in teacher_quizzes:
-        for student in students:
-            if GroupStudentMembership.objects.filter(
-                student=student,
-                group=quiz.group,
-                joined_at__lte=quiz.created_at
-            ).exists():
-                if StudentQuizResult.objects.filter(quiz=quiz, student=student).exists():
-                    completed_quizzes += 1
-
-    total_assignment_opportunities = 0
-    total_quiz_opportunities = 0
-
-    for assignment in teacher_assignments:
-        for student in students:
-            if GroupStudentMembership.objects.filter(
-                student=student,
-                group=assignment.group,
-                joined_at__lte=assignment.created_at
-            ).exists():
-                total_assignment_opportunities += 1
-
-    for quiz in teacher_quizzes:
-        for student in students:
-            if GroupStudentMembership.objects.filter(
-                student=student,
-                group=quiz.group,
-                joined_at__lte=quiz.created_at
-            ).exists():
-                total_quiz_opportunities += 1
-
-
-    # Foizlarni hisoblash
-    assignment_completion_percent = (
-        (completed_assignments / total_assignment_opportunities) * 100
-        if total_assignment_opportunities > 0 else 0
-    )
-    quiz_completion_percent = (
-        (completed_quizzes / total_quiz_opportunities) * 100
-        if total_quiz_opportunities > 0 else 0
-    )
+
+    # Topshirilganlar va imkoniyatlar soni AssessmentCompletion jadvalidan bitta so‘rovda olinadi
+    completion = get_teacher_completion(teacher)
+    assignment_completion_percent = completion['assignment']['percent']
+    quiz_completion_percent = completion['quiz']['percent']
+
     teacher_groups = Group.objects.filter(teachers=teacher)
     students = CustomUser.objects.filter(student_groups__in=teacher_groups).distinct()
 
@@ -176,8 +92,8 @@ def teacher_home_view(request):
         'quiz_completion_percent': round(quiz_completion_percent, 1),
         'quiz_missing_percent': round(100 - quiz_completion_percent, 1),
         'student_levels': stats['student_levels'],
-        'has_assignments': teacher_assignments.exists(),
-        'has_quizzes': teacher_quizzes.exists(),
+        'has_assignments': completion['assignment']['assessments'] > 0,
+        'has_quizzes': completion['quiz']['assessments'] > 0,
     }
     return render(request, 'teacher_home.html', context)
 
@@ -210,8 +126,8 @@ def teacher_profile_view(request):
                 messages.success(request, "Parolingiz muvaffaqiyatli o‘zgartirildi!", extra_tags='password_img')
 
         elif form_type == 'upload_image':
-            if 'profile_image' in request.FILES:
-                image = request.FILES['profile_image']
+            image = request.FILES.get('profile_image') or claim_direct_upload(teacher, request.POST.get('direct_upload'), 'profile_image')
+            if image:
                 teacher.profile_image = image
                 teacher.save()
                 messages.success(request, "Rasmingiz muvaffaqiyatli o‘zgartirildi!", extra_tags='password_img')
@@ -352,7 +268,24 @@ def add_questions(request, group_id):
         if not title:
             return redirect('add_questions', group_id=group.id)
 
-        has_valid_question = False  # Kamida bitta savol borligini tekshiramiz
+        questions_file = request.FILES.get('questions_file')
+        if questions_file:
+            # Fayldan ommaviy yuklash (CSV/JSON/Aiken) — main/quiz_import.py
+            quiz, imported, errors = import_questions(
+                questions_file, title=title, group=group, teacher=teacher, time_limit=time_limit, max_score=max_score
+            )
+            if quiz is None:
+                return render(request, 'teacher-test-group.html', {
+                    'group': group,
+                    'teacher': teacher,
+                    'import_errors': errors,
+                })
+            message = f"Test muvaffaqiyatli qo‘shildi! Yuklangan savollar: {imported} ta."
+            if errors:
+                shown = '; '.join(f"{row}-qator: {error}" for row, error in errors[:10])
+                message += f" Xato qatorlar ({len(errors)} ta): {shown}"
+            messages.success(request, message, extra_tags='test_modal')
+            return redirect('create_quiz')
 
         quiz = Quiz.objects.create(
             title=title,
@@ -362,6 +295,7 @@ def add_questions(request, group_id):
             max_score = max_score
         )
 
+        items = []  # Tekshirilgan savollar: [(matn, [(variant, to‘g‘rimi)])]
         for i in range(1, total_questions + 1):
             question_text = request.POST.get(f'question_{i}', '').strip()
             if not question_text:
@@ -382,16 +316,10 @@ def add_questions(request, group_id):
             if not any(is_correct for _, is_correct in answers):
                 continue  # Kamida bitta to‘g‘ri javob bo‘lishi kerak
 
-            # Savolni yaratamiz
-            question = Question.objects.create(quiz=quiz, text=question_text)
-            for text, is_correct in answers:
-                Answer.objects.create(
-                    question=question,
-                    text=text,
-                    is_correct=is_correct
-                )
+            items.append((question_text, answers))
 
-            has_valid_question = True
+        # Savollar bankdan olinadi yoki yaratiladi (main/question_bank.py), test ularga havola qiladi
+        has_valid_question = bool(items) and add_to_quiz(quiz, items)[0] > 0
 
         if not has_valid_question:
             quiz.delete()
@@ -411,31 +339,81 @@ def quiz_detail(request, quiz_id):
         return redirect('login')
 
     quiz = get_object_or_404(Quiz, id=quiz_id, teacher=teacher)
-    questions = quiz.questions.prefetch_related('answers')
+    questions = quiz_questions(quiz).prefetch_related('answers')
 
     if request.method == 'POST':
-        # Quiz nomi va vaqtini yangilash
-        quiz.title = request.POST.get('title', quiz.title)
-        quiz.time_limit = int(request.POST.get('time_limit', quiz.time_limit))
-        quiz.max_score = int(request.POST.get('max_score', quiz.max_score))
-        quiz.save()
-
+        # Yuklangan holat bilan solishtiriladi: faqat o‘zgargan qatorlar yoziladi
+        quiz_fields = []
+        for field, value in (
+            ('title', request.POST.get('title', quiz.title)),
+            ('time_limit', int(request.POST.get('time_limit', quiz.time_limit))),
+            ('max_score', int(request.POST.get('max_score', quiz.max_score))),
+        ):
+            if getattr(quiz, field) != value:
+                setattr(quiz, field, value)
+                quiz_fields.append(field)
+
+        edited, changed_answers, answer_fields = [], [], set()
         for question in questions:
+            question_changed = False
             q_text = request.POST.get(f'question_{question.id}')
-            if q_text:
+            if q_text and q_text != question.text:
                 question.text = q_text
-                question.save()
+                question_changed = True
 
             correct_answer_id = request.POST.get(f'correct_{question.id}')
 
             for answer in question.answers.all():
+                fields = set()
                 a_text = request.POST.get(f'answer_{answer.id}')
-                if a_text:
+                if a_text and a_text != answer.text:
                     answer.text = a_text
-                answer.is_correct = str(answer.id) == correct_answer_id
-                answer.save()
-
-        messages.success(request, "Test muvaffaqiyatli yangilandi.", extra_tags='test_modal')
+                    fields.add('text')
+                is_correct = str(answer.id) == correct_answer_id
+                if is_correct != answer.is_correct:
+                    answer.is_correct = is_correct
+                    fields.add('is_correct')
+                if fields:
+                    changed_answers.append(answer)
+                    answer_fields |= fields
+                    question_changed = True
+
+            if question_changed:
+                edited.append(question)
+
+        # Boshqa testlarda ham ishlatilayotgan savollar joyida o‘zgartirilmaydi — shu test uchun nusxa olinadi
+        shared = shared_question_ids([question.id for question in edited])
+        forked = [question for question in edited if question.id in shared]
+        changed_questions = [question for question in edited if question.id not in shared]
+        changed_answers = [answer for answer in changed_answers if answer.question_id not in shared]
+        for question in changed_questions:
+            question.content_hash = content_hash(question.text, [(a.text, a.is_correct) for a in question.answers.all()])
+
+        # Ballar faqat baholashga ta’sir qiluvchi o‘zgarishda o‘zgaradi: to‘g‘ri javob, maksimal ball yoki savollar
+        # to‘plami (nusxa olinganda) — shu holda o‘qituvchiga qayta baholanganlar soni ko‘rsatiladi
+        grading_changed = 'is_correct' in answer_fields or 'max_score' in quiz_fields or bool(forked)
+
+        with transaction.atomic():
+            if quiz_fields:
+                quiz.save(update_fields=quiz_fields)
+            # bulk_update signal yubormaydi (main/signals.py dagi touch_* ishlamaydi) — versiya quyida yaratiladi
+            if changed_questions:
+                Question.objects.bulk_update(changed_questions, ['text', 'content_hash'], batch_size=500)
+            if changed_answers:
+                Answer.objects.bulk_update(changed_answers, sorted(answer_fields), batch_size=500)
+            for question in forked:
+                fork_question(quiz, question, question.text, [(a.id, a.text, a.is_correct) for a in question.answers.all()])
+
+        message = "Test muvaffaqiyatli yangilandi."
+        if quiz_fields or edited:
+            publish_version(quiz)
+            # Natijalar o‘chirilmaydi va har doim yangi versiyaga o‘tkaziladi (matn tuzatilganda ham) — aks holda
+            # tahlil va natijalar sahifasi ularni ko‘rmaydi. Saqlangan javoblar yangi kalit bo‘yicha qayta baholanadi
+            rescored = rescore_quiz_results(quiz)
+            if grading_changed:
+                message += f" Qayta baholangan natijalar: {rescored} ta."
+
+        messages.success(request, message, extra_tags='test_modal')
         return redirect('create_quiz')
 
     return render(request, 'quiz_detail.html', {
@@ -451,28 +429,25 @@ def teacher_view_results(request, quiz_id):
         return redirect('login')
 
     quiz = get_object_or_404(Quiz, id=quiz_id, teacher=teacher)
-    group = quiz.group
 
-    # Guruhdagi barcha o‘quvchilar bilan birga joined_at ni ham olish
-    memberships = GroupStudentMembership.objects.filter(group=group).select_related('student')
+    # Faqat test yaratilishidan oldin guruhga qo‘shilgan o‘quvchilar (AssessmentEligibility)
+    eligibilities = eligible_students('quiz', quiz.id)
     results = StudentQuizResult.objects.filter(quiz=quiz).select_related('student')
+    # Oldingi versiyada qolgan natijalar (masalan, versiyalar joriy etilgunga qadar) joriy kalitga moslanadi:
+    # to‘g‘ri javoblar soni va savollar soni bir xil versiyadan olinadi
+    version_id = current_version_id(quiz)
+    if results.exclude(version_id=version_id).exists():
+        rescore_quiz_results(quiz)
     result_map = {result.student.id: result for result in results}
 
     students_data = []
-    total_questions = quiz.questions.count()
-
-    for membership in memberships:
-        student = membership.student
+    total_questions = len(get_answer_key(quiz).question_ids)
 
-        # Agar o‘quvchi quiz yuklangandan keyin qo‘shilgan bo‘lsa, o‘tkazib yuboramiz
-        if membership.joined_at > quiz.created_at:
-            continue
+    for eligibility in eligibilities:
+        student = eligibility.student
 
         result = result_map.get(student.id)
-        if result:
-            correct_count = round((result.score / quiz.max_score) * total_questions)
-        else:
-            correct_count = None  # hali bajarmagan
+        correct_count = result.correct_count if result else None  # None — hali bajarmagan
 
         students_data.append({
             'student': student,
@@ -481,10 +456,40 @@ def teacher_view_results(request, quiz_id):
             'total_questions': total_questions
         })
 
+    # Savollar tahlili: saqlangan natija eskirgan bo‘lsa qayta hisoblanadi (main/item_analysis.py)
+    analysis, item_rows = None, []
+    if result_map:
+        # Tahlil joriy versiya natijalari bo‘yicha (yuqorida barchasi shu versiyaga o‘tkazilgan)
+        last_submitted_at = max(result.submitted_at for result in result_map.values())
+        analysis = get_quiz_analysis(quiz, len(result_map), last_submitted_at)
+        statistics = list(analysis.questions.select_related('question'))
+        answers = Answer.objects.filter(question_id__in=[statistic.question_id for statistic in statistics]).order_by('id')
+        options = {}
+        for answer in answers:
+            options.setdefault(answer.question_id, []).append(answer)
+
+        for statistic in statistics:
+            item_rows.append({
+                'statistic': statistic,
+                'question': statistic.question,
+                'p_percent': round(statistic.p_value * 100),
+                'omitted_percent': round(statistic.omitted_share * 100),
+                'flag': item_flag(statistic),
+                'options': [
+                    {
+                        'answer': answer,
+                        'percent': round(statistic.option_shares.get(str(answer.id), 0) * 100),
+                    }
+                    for answer in options.get(statistic.question_id, [])
+                ],
+            })
+
     return render(request, 'teacher_quiz_results.html', {
         'teacher': teacher,
         'quiz': quiz,
         'students_data': students_data,
+        'analysis': analysis,
+        'item_rows': item_rows,
     })
 
 
@@ -503,10 +508,11 @@ def teacher_deadline(request):
         group_id = request.POST.get('group_id')
         deadline_str = request.POST.get('deadline')
         file = request.FILES.get('file')
+        direct_upload = request.POST.get('direct_upload')
         max_score = request.POST.get('max_score')
 
-        # Barcha maydonlar to‘ldirilganini tekshirish
-        if title and group_id and deadline_str and file and max_score:
+        # Barcha maydonlar to‘ldirilganini tekshirish (fayl bucketga to‘g‘ridan-to‘g‘ri yuklangan bo‘lishi mumkin)
+        if title and group_id and deadline_str and (file or direct_upload) and max_score:
             try:
                 deadline = timezone.datetime.fromisoformat(deadline_str)
                 deadline = timezone.make_aware(deadline)  # timezone bilan
@@ -528,6 +534,14 @@ def teacher_deadline(request):
                 })
 
             group = get_object_or_404(Group, id=group_id)
+            file = file or claim_direct_upload(teacher, direct_upload, 'assignment')
+            if not file:
+                return render(request, 'teacher-upload-deadline.html', {
+                    'teacher': teacher,
+                    'groups': groups,
+                    'assignments': assignments,
+                    'error': "Topshiriq fayli topilmadi, qaytadan yuklang."
+                })
             Assignment.objects.create(
                 title=title,
                 teacher=teacher,
@@ -559,7 +573,7 @@ def edit_assignment(request, assignment_id):
     new_deadline = request.POST.get('deadline')
     new_max_score = request.POST.get('max_score')
     new_group_id = request.POST.get('group_id')
-    new_file = request.FILES.get('file')
+    new_file = request.FILES.get('file') or claim_direct_upload(teacher, request.POST.get('direct_upload'), 'assignment')
 
     # Faqat o‘zgartirilganlarini yangilaymiz
     if new_title and new_title != assignment.title:
@@ -693,21 +707,17 @@ def teacher_assignment_submissions(request, assignment_id):
         return redirect('login')
 
     assignment = get_object_or_404(Assignment, id=assignment_id, teacher=teacher)
-    group = assignment.group
 
-    # Ushbu topshiriq sanasidan oldin guruhga qo‘shilgan o‘quvchilarni olamiz
-    memberships = GroupStudentMembership.objects.filter(
-        group=group,
-        joined_at__lte=assignment.created_at  # yoki created_date bo'lsa
-    ).select_related('student')
+    # Ushbu topshiriq sanasidan oldin guruhga qo‘shilgan o‘quvchilarni olamiz (AssessmentEligibility)
+    eligibilities = eligible_students('assignment', assignment.id)
 
     # Barcha mavjud topshirilgan topshiriqlar
     submissions = AssignmentSubmission.objects.filter(assignment=assignment)
     submissions_dict = {s.student_id: s for s in submissions}  # tez izlash uchun
 
     student_data = []
-    for membership in memberships:
-        student = membership.student
+    for eligibility in eligibilities:
+        student = eligibility.student
         submission = submissions_dict.get(student.id)
         student_data.append({
             'student': student,
@@ -717,9 +727,24 @@ def teacher_assignment_submissions(request, assignment_id):
     return render(request, 'teacher_assignment_submissions.html', {
         'assignment': assignment,
         'student_data': student_data,
+        'has_submissions': bool(submissions_dict),
         'teacher': teacher,
     })
 
+
+@login_required
+def download_assignment_submissions(request, assignment_id):
+    # Barcha javoblar bitta ZIP arxivda (fayllar o‘quvchi ismi bilan), arxiv oqim bilan yuboriladi
+    teacher = request.user
+    if teacher.role != 'teacher':
+        return redirect('login')
+
+    assignment = get_object_or_404(Assignment, id=assignment_id, teacher=teacher)
+    response = StreamingHttpResponse(stream_submissions_zip(assignment), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, f'{assignment.title}.zip')
+    return response
+
+
 @login_required
 def grade_assignment(request):
     user = request.user
@@ -1,3 +1,763 @@
-from django.test import TestCase
+import hashlib
+import importlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import boto3
+import requests
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from moto import mock_aws
+
+from . import assignment_upload, exam_queue, grading, question_bank, quiz_import, student, submission_archive
+from .attempts import get_saved_answers
+from .grading import grade_submission
+from .item_analysis import analyze_quiz
+from .models import CustomUser, Group, GroupStudentMembership, Quiz, QuizItem, Question, Answer, StudentQuizResult, \
+    StudentAnswer, Assignment, AssignmentSubmission, AssignmentUpload, DirectUpload, QuizSubmission, QuizAttempt
+
+
+class QuizFixtureMixin:
+    def setUp(self):
+        # Versiya idlari test tranzaksiyasi bekor qilingach qayta ishlatiladi — versiya bo‘yicha keshlar tozalanadi
+        cache.clear()
+        grading._answer_keys.clear()
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.student = CustomUser.objects.create_user(username='student', password='x', role='student')
+        self.group = Group.objects.create(name='G1')
+        self.group.teachers.add(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupStudentMembership.objects.create(student=self.student, group=self.group)
+        self.client.force_login(self.student)
+
+    def add_quiz(self, n_questions=3, correct=None):
+        # correct: nechta savolga to‘g‘ri javob berilgani (None — o‘quvchi testni bajarmagan)
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = Quiz.objects.create(title='Test', group=self.group, teacher=self.teacher, max_score=100)
+            data = {}
+            for i in range(n_questions):
+                question = Question.objects.create(text=f'Savol {quiz.id}-{i}')
+                QuizItem.objects.create(quiz=quiz, question=question, position=i)
+                right = Answer.objects.create(question=question, text='A', is_correct=True)
+                wrong = Answer.objects.create(question=question, text='B', is_correct=False)
+                data[f'question_{question.id}'] = str(right.id if correct is not None and i < correct else wrong.id)
+        if correct is not None:
+            quiz.refresh_from_db()
+            with self.captureOnCommitCallbacks(execute=True):
+                grade_submission(self.student, quiz, data)
+        return quiz
+
+
+class StudentQuizListQueriesTest(QuizFixtureMixin, TestCase):
+    def get_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('student_quiz_list'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_rows(self):
+        done = self.add_quiz(n_questions=4, correct=3)
+        pending = self.add_quiz(n_questions=2)
+
+        response, _ = self.get_page()
+        rows = {item['quiz'].id: item for item in response.context['quiz_data']}
+        self.assertEqual(rows[done.id]['total_questions'], 4)
+        self.assertEqual(rows[done.id]['correct_count'], 3)
+        self.assertEqual(rows[done.id]['score'], 75)
+        self.assertEqual(rows[done.id]['score_percent'], 75)
+        self.assertIsNotNone(rows[done.id]['result_id'])
+        self.assertEqual(rows[pending.id]['total_questions'], 2)
+        self.assertIsNone(rows[pending.id]['correct_count'])
+        self.assertIsNone(rows[pending.id]['score'])
+        self.assertIsNone(rows[pending.id]['result_id'])
+
+    def test_query_count_does_not_grow_with_quizzes(self):
+        self.add_quiz(correct=1)
+        self.add_quiz()
+        self.get_page()  # bildirishnomalar keshi to‘ladi
+        _, baseline = self.get_page()
+
+        for i in range(10):
+            self.add_quiz(correct=i % 4 if i % 2 else None)
+        self.get_page()
+        response, queries = self.get_page()
+
+        self.assertEqual(len(response.context['quiz_data']), 12)
+        self.assertEqual(queries, baseline)
+
+
+class QuizImportTest(QuizFixtureMixin, TestCase):
+    def parse(self, parser, text):
+        return list(parser(io.StringIO(text)))
+
+    def import_file(self, name, content):
+        upload = SimpleUploadedFile(name, content.encode() if isinstance(content, str) else content)
+        with self.captureOnCommitCallbacks(execute=True):
+            return quiz_import.import_questions(upload, title='Import', group=self.group, teacher=self.teacher,
+                                                max_score=100)
+
+    def quiz_rows(self, quiz):
+        return [
+            (item.question.text, [(answer.text, answer.is_correct) for answer in item.question.answers.order_by('id')])
+            for item in quiz.items.select_related('question')
+        ]
+
+    def test_csv(self):
+        rows = self.parse(quiz_import.parse_csv, (
+            'savol,a,b,c,javob\n'
+            '2+2?,3,4,,B\n'
+            '"Poytaxt, qaysi?",Toshkent,Samarqand,1\n'
+            '\n'
+            'Bo‘sh javob?,x,y,\n'
+            'Yo‘q variant?,x,y,C\n'
+            'Qisqa,x,A\n'
+        ))
+        self.assertEqual(rows[0], (2, ('2+2?', [('3', False), ('4', True)])))
+        self.assertEqual(rows[1], (3, ('Poytaxt, qaysi?', [('Toshkent', True), ('Samarqand', False)])))
+        self.assertEqual([(line, type(error)) for line, error in rows[2:]], [
+            (5, quiz_import.ImportRowError), (6, quiz_import.ImportRowError), (7, quiz_import.ImportRowError),
+        ])
+        self.assertIn('variantlar orasida yo‘q', str(rows[3][1]))
+
+    def test_json_array_and_lines(self):
+        text = (
+            '[{"question": "1?", "answers": ["a", "b"], "correct": 2},\n'
+            ' {"question": "2?", "answers": [{"text": "x", "correct": true}, {"text": "y"}]},\n'
+            ' {"question": "3?", "answers": ["a", "b"]}, "matn"]'
+        )
+        rows = self.parse(quiz_import.parse_json, text)
+        self.assertEqual(rows[0], (1, ('1?', [('a', False), ('b', True)])))
+        self.assertEqual(rows[1], (2, ('2?', [('x', True), ('y', False)])))
+        self.assertEqual([line for line, error in rows[2:] if isinstance(error, quiz_import.ImportRowError)], [3, 4])
+
+        # Bufer chegarasi element o‘rtasiga tushsa ham qiymatlar butun o‘qiladi
+        values = list(quiz_import._iter_json_values(io.StringIO(text), chunk_size=5))
+        self.assertEqual(len(values), 4)
+
+        lines = '{"question": "1?", "answers": ["a", "b"], "correct": "A"}\n{"question": "2?", "answers": ["a", "b"],'
+        rows = self.parse(quiz_import.parse_json, lines)
+        self.assertEqual(rows[0], (1, ('1?', [('a', True), ('b', False)])))
+        self.assertEqual(rows[1][0], 2)
+        self.assertIn('JSON xatosi', str(rows[1][1]))
+
+    def test_aiken(self):
+        rows = self.parse(quiz_import.parse_aiken, (
+            'Qaysi biri tub son?\n'
+            'A. 4\n'
+            'B) 7\n'
+            'ANSWER: B\n'
+            '\n'
+            'Javobsiz savol\n'
+            'A. ha\n'
+            'B. yo‘q\n'
+            'Keyingi savol\n'
+            'A. bir\n'
+            'B. ikki\n'
+            'answer: d\n'
+        ))
+        self.assertEqual(rows[0], (1, ('Qaysi biri tub son?', [('4', False), ('7', True)])))
+        self.assertEqual([line for line, _ in rows[1:]], [6, 9])
+        self.assertIn('ANSWER qatori topilmadi', str(rows[1][1]))
+        self.assertIn('ANSWER: d', str(rows[2][1]))
+
+    def test_import_creates_quiz_and_reports_rows(self):
+        quiz, imported, errors = self.import_file('savollar.csv', (
+            '\ufeffquestion,a,b,correct\n'  # Excel saqlagan BOM
+            '1?,a,b,A\n'
+            'bo‘sh,,,A\n'
+            '2?,c,d,2\n'
+            '1?,a,b,1\n'
+        ))
+        self.assertEqual(imported, 2)
+        self.assertEqual([line for line, _ in errors], [3, 5])
+        self.assertIn('allaqachon bor', errors[1][1])
+        self.assertEqual(self.quiz_rows(quiz), [
+            ('1?', [('a', True), ('b', False)]),
+            ('2?', [('c', False), ('d', True)]),
+        ])
+
+        # Bankdagi savol ikkinchi testga qayta yaratilmasdan ulanadi
+        other, imported, errors = self.import_file('savollar.jsonl', '{"question": "1?", "answers": ["a", "b"], "correct": 1}')
+        self.assertEqual((imported, errors), (1, []))
+        self.assertEqual(Question.objects.filter(text='1?').count(), 1)
+        self.assertEqual(set(Question.objects.get(text='1?').quizzes.all()), {quiz, other})
+
+    def test_nothing_imported_rolls_back(self):
+        before = Quiz.objects.count()
+        self.assertEqual(self.import_file('savollar.txt', 'Savol\nA. bir\n')[:2], (None, 0))
+        self.assertEqual(self.import_file('savollar.xlsx', 'x'), (None, 0, [(0, mock.ANY)]))
+        self.assertEqual(self.import_file('savollar.csv', '1?,a,b,A\n'.encode('cp1251') + b'\xff')[:2], (None, 0))
+        self.assertEqual(Quiz.objects.count(), before)
+
+
+class QuestionBankTest(QuizFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = CustomUser.objects.create_user(username='other', password='x', role='student')
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupStudentMembership.objects.create(student=self.other, group=self.group)
+
+    def add_question(self, quiz, text, answers, position):
+        # answers: [(matn, to‘g‘rimi)]; xesh signal orqali tranzaksiya oxirida yoziladi
+        with self.captureOnCommitCallbacks(execute=True):
+            question = Question.objects.create(text=text)
+            for answer, is_correct in answers:
+                Answer.objects.create(question=question, text=answer, is_correct=is_correct)
+            QuizItem.objects.create(quiz=quiz, question=question, position=position)
+        return question
+
+    def grade(self, student, quiz, choices):
+        # choices: {savol: tanlangan javob matni}
+        quiz.refresh_from_db()
+        data = {f'question_{question.id}': str(question.answers.get(text=text).id) for question, text in choices.items()}
+        with self.captureOnCommitCallbacks(execute=True):
+            return grade_submission(student, quiz, data)[0]
+
+    def selections(self, result):
+        result.refresh_from_db()
+        return {
+            int(question_id): Answer.objects.get(id=answer_id).text if answer_id is not None else None
+            for question_id, answer_id in result.selections.items()
+        }
+
+    def test_fork_moves_only_this_quiz(self):
+        quiz, other_quiz = self.add_quiz(n_questions=1), self.add_quiz(n_questions=1)
+        shared = self.add_question(quiz, '2+2?', [('3', False), ('4', True), ('5', False)], position=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            QuizItem.objects.create(quiz=other_quiz, question=shared, position=5)
+        first = quiz.items.get(position=0).question
+        kept = self.grade(self.student, quiz, {shared: '4', first: 'A'})
+        dropped = self.grade(self.other, quiz, {shared: '5', first: 'B'})
+        untouched = self.grade(self.student, other_quiz, {shared: '4'})
+
+        # «4» matni o‘zgaradi, «5» o‘chiriladi, yangi «6» qo‘shiladi
+        answers = dict(shared.answers.values_list('text', 'id'))
+        with self.captureOnCommitCallbacks(execute=True):
+            fork = question_bank.fork_question(quiz, shared, '2 + 2 = ?', [
+                (answers['3'], '3', False), (answers['4'], 'to‘rt', True), (None, '6', False),
+            ])
+
+        self.assertNotEqual(fork.id, shared.id)
+        self.assertEqual(list(quiz.items.values_list('question_id', flat=True)), [first.id, fork.id])
+        self.assertIn(shared.id, other_quiz.items.values_list('question_id', flat=True))
+        self.assertEqual(set(shared.answers.values_list('text', flat=True)), {'3', '4', '5'})
+
+        self.assertEqual(self.selections(kept), {first.id: 'A', fork.id: 'to‘rt'})
+        self.assertEqual(list(kept.selections), [str(first.id), str(fork.id)])
+        self.assertEqual(self.selections(dropped), {first.id: 'B', fork.id: None})
+        self.assertEqual(self.selections(untouched)[shared.id], '4')
+
+        # Xuddi shu mazmun bankda bo‘lsa yangi savol yaratilmaydi
+        third = self.add_quiz(n_questions=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            QuizItem.objects.create(quiz=third, question=shared, position=1)
+        again = question_bank.fork_question(third, shared, '2 + 2 = ?', [
+            (answers['3'], '3', False), (answers['4'], 'to‘rt', True), (None, '6', False),
+        ])
+        self.assertEqual(again.id, fork.id)
+
+    def test_merge_duplicates(self):
+        quiz, other_quiz = self.add_quiz(n_questions=1), self.add_quiz(n_questions=1)
+        canonical = self.add_question(quiz, 'Takror', [('p', True), ('q', False)], position=5)
+        # Bo‘sh joy va variantlar tartibi farq qiladi — mazmun bir xil
+        duplicate = self.add_question(other_quiz, ' Takror ', [('q', False), ('p', True)], position=1)
+        same_quiz = self.add_question(quiz, 'Takror', [('p', True), ('q', False)], position=6)
+        canonical.refresh_from_db()
+        self.assertEqual(Question.objects.filter(content_hash=canonical.content_hash).count(), 3)
+        first = other_quiz.items.get(position=0).question
+        result = self.grade(self.student, other_quiz, {duplicate: 'q', first: 'A'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            removed, touched = question_bank.merge_duplicates()
+
+        self.assertEqual((removed, touched), (1, {other_quiz.id}))
+        self.assertFalse(Question.objects.filter(id=duplicate.id).exists())
+        # Bitta testdagi ikki nusxa birlashtirilmaydi
+        self.assertTrue(Question.objects.filter(id=same_quiz.id).exists())
+        self.assertEqual(list(other_quiz.items.values_list('question_id', flat=True)), [first.id, canonical.id])
+        self.assertEqual(self.selections(result), {first.id: 'A', canonical.id: 'q'})
+        self.assertEqual(list(result.selections), [str(first.id), str(canonical.id)])
+        self.assertEqual(Answer.objects.get(id=result.selections[str(canonical.id)]).question_id, canonical.id)
+        other_quiz.refresh_from_db()
+        self.assertEqual(result.version_id, other_quiz.current_version_id)
+
+
+class PackedSelectionsTest(QuizFixtureMixin, TestCase):
+    def test_backfill_packs_answer_rows(self):
+        backfill = importlib.import_module('main.migrations.0043_packed_selections')
+        with override_settings(QUIZ_ANSWER_ROWS=True):
+            quiz = self.add_quiz(n_questions=3, correct=2)
+            other = self.add_quiz(n_questions=2, correct=0)
+        empty = StudentQuizResult.objects.create(student=self.student, quiz=self.add_quiz(), score=0,
+                                                 quiz_last_updated=timezone.now())
+        packed = {result.id: (result.selections, result.correct_count) for result in StudentQuizResult.objects.all()}
+        self.assertEqual(StudentAnswer.objects.count(), 5)
+
+        StudentQuizResult.objects.update(selections={}, correct_count=0)
+        with mock.patch.object(backfill, 'BACKFILL_BATCH_SIZE', 1):
+            backfill.pack_answers(apps, None)
+
+        for result in StudentQuizResult.objects.all():
+            self.assertEqual((result.selections, result.correct_count), packed[result.id])
+            # Savollar tartibi ham saqlanadi
+            self.assertEqual(list(result.selections), list(packed[result.id][0]))
+        self.assertEqual(packed[empty.id], ({}, 0))
+        self.assertEqual(StudentQuizResult.objects.get(quiz=quiz).correct_count, 2)
+        self.assertEqual(StudentQuizResult.objects.get(quiz=other).correct_count, 0)
+
+    def test_answer_key_change_regrades_from_selections(self):
+        quiz = self.add_quiz(n_questions=2, correct=1)
+        result = StudentQuizResult.objects.get(quiz=quiz)
+        self.assertEqual((result.correct_count, result.score), (1, 50))
+        self.assertFalse(StudentAnswer.objects.exists())
+
+        # Ikkinchi savolda o‘quvchi tanlagan «B» to‘g‘ri deb belgilanadi
+        question = quiz.items.get(position=1).question
+        with self.captureOnCommitCallbacks(execute=True):
+            for answer in question.answers.all():
+                answer.is_correct = answer.text == 'B'
+                answer.save()
+
+        result.refresh_from_db()
+        quiz.refresh_from_db()
+        self.assertEqual((result.correct_count, result.score), (2, 100))
+        self.assertEqual(result.version_id, quiz.current_version_id)
+
+        response = self.client.get(reverse('student_quiz_list'))
+        row = next(item for item in response.context['quiz_data'] if item['quiz'].id == quiz.id)
+        self.assertEqual((row['correct_count'], row['score']), (2, 100))
+
+
+class QuizEditResultsTest(QuizFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.add_quiz(n_questions=2, correct=1)
+        self.result = StudentQuizResult.objects.get(quiz=self.quiz, student=self.student)
+
+    def edit_form(self, quiz):
+        data = {'title': quiz.title, 'time_limit': quiz.time_limit, 'max_score': quiz.max_score}
+        for question in Question.objects.filter(quiz_items__quiz=quiz).prefetch_related('answers'):
+            data[f'question_{question.id}'] = question.text
+            for answer in question.answers.all():
+                data[f'answer_{answer.id}'] = answer.text
+                if answer.is_correct:
+                    data[f'correct_{question.id}'] = str(answer.id)
+        return data
+
+    def test_text_edit_keeps_analysis(self):
+        old_version = self.quiz.current_version_id
+        question = Question.objects.filter(quiz_items__quiz=self.quiz).first()
+        data = self.edit_form(self.quiz)
+        data[f'question_{question.id}'] = 'Imlo xatosi tuzatildi'
+        self.client.force_login(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('quiz_detail', args=[self.quiz.id]), data)
+
+        self.quiz.refresh_from_db()
+        self.result.refresh_from_db()
+        self.assertNotEqual(self.quiz.current_version_id, old_version)
+        self.assertEqual(self.result.version_id, self.quiz.current_version_id)
+        self.assertEqual((self.result.correct_count, self.result.score), (1, 50))
+        self.assertEqual(analyze_quiz(self.quiz).respondents, 1)
+
+        response = self.client.get(reverse('quiz_results', args=[self.quiz.id]))
+        self.assertEqual(response.context['analysis'].respondents, 1)
+        row = next(row for row in response.context['students_data'] if row['student'] == self.student)
+        self.assertEqual((row['correct_count'], row['total_questions']), (1, 2))
+
+    def admin_client(self):
+        admin = CustomUser.objects.create_user(username='admin', password='x', role='admin', is_staff=True)
+        self.client.force_login(admin)
+
+    def test_admin_correct_answer_fix_regrades(self):
+        # O‘quvchi noto‘g‘ri javob bergan savolda to‘g‘ri javob boshqa variantga o‘zgartiriladi
+        question = Question.objects.filter(quiz_items__quiz=self.quiz).order_by('quiz_items__position').last()
+        right, wrong = question.answers.order_by('id')
+        self.admin_client()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update_question', args=[question.id]), {
+                'question_text': question.text,
+                f'answer_text_{right.id}': right.text,
+                f'answer_text_{wrong.id}': wrong.text,
+                f'is_correct_{wrong.id}': 'on',
+            })
+
+        self.quiz.refresh_from_db()
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.version_id, self.quiz.current_version_id)
+        self.assertEqual((self.result.correct_count, self.result.score), (2, 100))
+
+    def test_admin_move_question_regrades_both_quizzes(self):
+        other = self.add_quiz(n_questions=1)
+        question = Question.objects.filter(quiz_items__quiz=self.quiz).order_by('quiz_items__position').first()
+        versions = (self.quiz.current_version_id, other.current_version_id)
+        self.admin_client()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update_question', args=[question.id]), {
+                'question_text': question.text, 'quiz_id': other.id,
+            })
+
+        self.quiz.refresh_from_db()
+        other.refresh_from_db()
+        self.result.refresh_from_db()
+        self.assertNotEqual(self.quiz.current_version_id, versions[0])
+        self.assertNotEqual(other.current_version_id, versions[1])
+        # To‘g‘ri javob berilgan savol olib tashlandi: qolgan bitta savol noto‘g‘ri
+        self.assertEqual(self.result.version_id, self.quiz.current_version_id)
+        self.assertEqual((self.result.correct_count, self.result.score), (0, 0))
+
+
+class SubmitQuizAutosaveTest(QuizFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.add_quiz(n_questions=2)
+        question = Question.objects.filter(quiz_items__quiz=self.quiz).first()
+        self.right = question.answers.get(is_correct=True)
+        self.client.post(reverse('autosave_quiz', args=[self.quiz.id]),
+                         {'answers': {str(question.id): self.right.id}}, content_type='application/json')
+
+    def test_failed_grading_keeps_autosaved_answers(self):
+        with mock.patch.object(student, 'grade_submission', side_effect=RuntimeError('database is locked')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('submit_quiz', args=[self.quiz.id]))
+        self.assertEqual(list(get_saved_answers(self.student, self.quiz).values()), [self.right.id])
+
+    def test_successful_submit_clears_autosave(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('submit_quiz', args=[self.quiz.id]))
+        self.assertEqual(response.context['correct_count'], 1)
+        self.assertFalse(QuizAttempt.objects.filter(student=self.student, quiz=self.quiz).exists())
+        self.assertEqual(get_saved_answers(self.student, self.quiz), {})
+
+
+class ExamQueueTest(QuizFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = self.add_quiz(n_questions=2)
+
+    def test_claim_skips_rows_taken_by_another_worker(self):
+        first, second = (exam_queue.enqueue_submission(self.student, self.quiz, {}) for _ in range(2))
+        real_now = exam_queue.now
+        calls = []
+
+        def now():
+            # Ikkinchi chaqiruv — SELECT dan keyin, UPDATE dan oldin: shu orada boshqa worker birinchi yozuvni oladi
+            calls.append(1)
+            if len(calls) == 2:
+                QuizSubmission.objects.filter(pk=first.pk).update(status='processing')
+            return real_now()
+
+        with mock.patch.object(exam_queue, 'now', now):
+            self.assertEqual(exam_queue.claim_batch(), [second.pk])
+        first.refresh_from_db()
+        self.assertEqual(first.attempts, 0)
+
+    def test_worker_requeues_stale_rows(self):
+        submission = exam_queue.enqueue_submission(self.student, self.quiz, {})
+        QuizSubmission.objects.filter(pk=submission.pk).update(
+            status='processing', started_at=timezone.now() - timedelta(hours=1), attempts=1,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(exam_queue.run_worker(once=True), 1)
+        submission.refresh_from_db()
+        self.assertEqual((submission.status, submission.attempts), ('done', 2))
+        self.assertTrue(StudentQuizResult.objects.filter(quiz=self.quiz, student=self.student).exists())
+
+
+class AssignmentUploadTest(TestCase):
+    CHUNK = 1024
+
+    def setUp(self):
+        upload_dir, media = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(
+            ASSIGNMENT_UPLOAD_DIR=upload_dir, ASSIGNMENT_UPLOAD_CHUNK_SIZE=self.CHUNK, MEDIA_ROOT=media,
+        ))
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.student = CustomUser.objects.create_user(username='student', password='x', role='student')
+        group = Group.objects.create(name='G1')
+        self.assignment = Assignment.objects.create(
+            title='Uy ishi', file='assignments/task.pdf', group=group, teacher=teacher,
+            deadline=timezone.now() + timedelta(days=1),
+        )
+        self.client.force_login(self.student)
+        self.data = bytes(range(256)) * 10  # 2560 bayt — uchta bo‘lak
+
+    def start(self, **payload):
+        payload = {'filename': 'javob.zip', 'size': len(self.data), 'fingerprint': 'javob.zip:2560:1', **payload}
+        return self.client.post(reverse('start_assignment_upload', args=[self.assignment.id]), payload,
+                                content_type='application/json')
+
+    def send(self, upload_id, offset, body, checksum=None):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if checksum is not None:
+            headers['HTTP_UPLOAD_CHECKSUM'] = checksum
+        return self.client.post(reverse('assignment_upload_chunk', args=[upload_id]), body,
+                                content_type='application/octet-stream', **headers)
+
+    def send_rest(self, upload_id, offset):
+        while offset < len(self.data):
+            response = self.send(upload_id, offset, self.data[offset:offset + self.CHUNK])
+            self.assertEqual(response.status_code, 200, response.content)
+            offset = response.json()['offset']
+        return response
+
+    def test_failed_completion_can_be_retried(self):
+        upload_id = self.start().json()['upload_id']
+        with mock.patch.object(assignment_upload, 'replace_submission', side_effect=OSError('ombor ishlamayapti')):
+            with self.assertRaises(OSError):
+                self.send_rest(upload_id, 0)
+        self.assertFalse(AssignmentSubmission.objects.exists())
+
+        # Qayta boshlanganda o‘sha yuklash qaytadi, bo‘sh bo‘lak yakunlashni takrorlaydi
+        state = self.start().json()
+        self.assertEqual((state['upload_id'], state['offset'], state['done']), (upload_id, len(self.data), False))
+        response = self.send(upload_id, len(self.data), b'')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()['done'])
+        submission = AssignmentSubmission.objects.get(assignment=self.assignment, student=self.student)
+        with submission.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+        self.assertEqual(AssignmentUpload.objects.get(pk=upload_id).checksum, hashlib.sha256(self.data).hexdigest())
+
+    def test_resume_from_reported_offset(self):
+        upload_id = self.start().json()['upload_id']
+        first = self.data[:self.CHUNK]
+        response = self.send(upload_id, 0, first, checksum=hashlib.sha256(first).hexdigest())
+        self.assertEqual(response.json()['offset'], self.CHUNK)
+
+        # Sahifa yangilandi: o‘sha fayl uchun o‘sha yuklash va qabul qilingan offset qaytadi
+        state = self.start().json()
+        self.assertEqual((state['upload_id'], state['offset']), (upload_id, self.CHUNK))
+        self.assertNotEqual(self.start(fingerprint='boshqa.zip:2560:2').json()['upload_id'], upload_id)
+        response = self.client.get(reverse('assignment_upload_chunk', args=[upload_id]))
+        self.assertEqual(response.json()['offset'], self.CHUNK)
+
+        # Eski offsetdagi bo‘lak rad etiladi, javobda davom ettirish offseti bor
+        response = self.send(upload_id, 0, first)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], self.CHUNK)
+        self.assertEqual(self.send(upload_id, 2 * self.CHUNK, self.data[2 * self.CHUNK:]).status_code, 409)
+
+        self.assertTrue(self.send_rest(upload_id, self.CHUNK).json()['done'])
+        submission = AssignmentSubmission.objects.get(assignment=self.assignment, student=self.student)
+        with submission.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+        self.assertEqual(self.send(upload_id, len(self.data), b'').status_code, 409)
+
+    def test_corrupt_chunk_is_rejected(self):
+        upload_id = self.start().json()['upload_id']
+        chunk = self.data[:self.CHUNK]
+        response = self.send(upload_id, 0, chunk, checksum=hashlib.sha256(b'boshqa').hexdigest())
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual((response.json()['offset'], response.json()['status']), (0, 'uploading'))
+
+        # Bo‘lak qayta yuboriladi
+        response = self.send(upload_id, 0, chunk, checksum=hashlib.sha256(chunk).hexdigest().upper())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.send_rest(upload_id, response.json()['offset']).json()['done'])
+
+    def test_size_limits(self):
+        upload_id = self.start().json()['upload_id']
+        self.assertEqual(self.send(upload_id, 0, self.data[:self.CHUNK + 1]).status_code, 413)
+        self.assertEqual(self.send(upload_id, 0, b'').status_code, 413)
+        self.assertEqual(self.send(upload_id, 0, self.data[:self.CHUNK]).status_code, 200)
+        self.assertEqual(self.send(upload_id, self.CHUNK, self.data[:self.CHUNK]).status_code, 200)
+        # Fayl hajmidan oshadigan oxirgi bo‘lak
+        self.assertEqual(self.send(upload_id, 2 * self.CHUNK, self.data[:self.CHUNK]).status_code, 400)
+        self.assertEqual(AssignmentUpload.objects.get(pk=upload_id).received, 2 * self.CHUNK)
+
+        with override_settings(ASSIGNMENT_UPLOAD_MAX_SIZE=len(self.data) - 1):
+            self.assertEqual(self.start(fingerprint='katta').status_code, 413)
+        self.assertEqual(self.start(size=0, fingerprint='bo‘sh').status_code, 400)
+
+    def test_whole_file_checksum(self):
+        upload_id = self.start(sha256=hashlib.sha256(b'boshqa').hexdigest()).json()['upload_id']
+        offset = 0
+        while offset + self.CHUNK < len(self.data):
+            offset = self.send(upload_id, offset, self.data[offset:offset + self.CHUNK]).json()['offset']
+        response = self.send(upload_id, offset, self.data[offset:])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['status'], 'failed')
+        self.assertFalse(AssignmentSubmission.objects.exists())
+
+        upload_id = self.start(sha256=hashlib.sha256(self.data).hexdigest()).json()['upload_id']
+        self.assertTrue(self.send_rest(upload_id, 0).json()['done'])
+
+
+S3_STORAGES = {
+    'default': {'BACKEND': 'storages.backends.s3.S3Storage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class DirectUploadTest(TestCase):
+    # Bucket o‘rnida moto: imzolangan POST ham requests orqali moto ga boradi
+    def setUp(self):
+        self.enterContext(mock.patch.dict(os.environ, {
+            'AWS_ACCESS_KEY_ID': 'test', 'AWS_SECRET_ACCESS_KEY': 'test', 'AWS_DEFAULT_REGION': 'us-east-1',
+        }))
+        self.enterContext(mock_aws())
+        self.enterContext(override_settings(
+            STORAGES=S3_STORAGES, AWS_STORAGE_BUCKET_NAME='media', AWS_S3_REGION_NAME='us-east-1',
+        ))
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='media')
+
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.student = CustomUser.objects.create_user(username='student', password='x', role='student')
+        group = Group.objects.create(name='G1')
+        self.assignment = Assignment.objects.create(
+            title='Uy ishi', file='assignments/task.pdf', group=group, teacher=teacher,
+            deadline=timezone.now() + timedelta(days=1),
+        )
+        self.client.force_login(self.student)
+
+    def start(self, data, **payload):
+        response = self.client.post(reverse('start_direct_upload'), {'size': len(data), **payload},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def post_to_bucket(self, state, data):
+        return requests.post(state['url'], data=state['fields'], files={'file': ('file', data)})
+
+    def complete(self, state):
+        return self.client.post(reverse('complete_direct_upload', args=[state['upload_id']]))
+
+    def test_submission_flow(self):
+        data = os.urandom(5000)
+        state = self.start(data, target='submission', object_id=self.assignment.id, filename='javob.pdf',
+                           content_type='application/pdf')
+        upload = DirectUpload.objects.get(pk=state['upload_id'])
+        # Mijoz faqat vaqtinchalik kalitni ko‘radi
+        self.assertEqual(state['method'], 'POST')
+        self.assertNotIn(upload.key, str(state))
+
+        self.assertEqual(self.complete(state).status_code, 409)  # fayl hali yuklanmagan
+        self.assertEqual(self.post_to_bucket(state, data).status_code, 204)
+        response = self.complete(state)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()['done'])
+
+        submission = AssignmentSubmission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(submission.file.name, upload.key)
+        self.assertEqual(default_storage.open(upload.key).read(), data)
+
+        # Imzo hali amal qiladi, lekin vaqtinchalik kalitga qayta yuklash saqlangan faylni o‘zgartirmaydi
+        self.post_to_bucket(state, os.urandom(len(data)))
+        self.assertEqual(default_storage.open(upload.key).read(), data)
+        self.assertEqual(self.complete(state).status_code, 200)
+        self.assertEqual(AssignmentSubmission.objects.filter(assignment=self.assignment).count(), 1)
+
+    def test_size_mismatch_fails_upload(self):
+        state = self.start(b'0123456789', target='submission', object_id=self.assignment.id, filename='x.pdf')
+        self.post_to_bucket(state, b'01234')
+        response = self.complete(state)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['status'], 'failed')
+        self.assertFalse(default_storage.exists(f"direct_uploads/{state['upload_id']}"))
+        self.assertFalse(AssignmentSubmission.objects.exists())
+
+    def test_profile_image_is_claimed_once(self):
+        state = self.start(b'\x89PNG', target='profile_image', filename='me.png', content_type='image/png')
+        self.post_to_bucket(state, b'\x89PNG')
+        self.assertEqual(self.complete(state).json()['status'], 'uploaded')
+        key = DirectUpload.objects.get(pk=state['upload_id']).key
+
+        form = {'form_type': 'upload_image', 'direct_upload': state['upload_id']}
+        self.client.post(reverse('student_profile'), form)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.profile_image.name, key)
+        self.assertEqual(DirectUpload.objects.get(pk=state['upload_id']).status, 'complete')
+
+        self.student.profile_image = ''
+        self.student.save()
+        self.client.post(reverse('student_profile'), form)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.profile_image.name, '')
+
+    def test_invalid_upload_id_is_ignored(self):
+        response = self.client.post(reverse('student_profile'), {'form_type': 'upload_image', 'direct_upload': 'nope'})
+        self.assertEqual(response.status_code, 200)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.profile_image.name, '')
+
+
+class SubmissionArchiveTest(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        group = Group.objects.create(name='G1')
+        self.assignment = Assignment.objects.create(
+            title='Uy ishi', file='assignments/task.pdf', group=group, teacher=self.teacher,
+            deadline=timezone.now() + timedelta(days=1),
+        )
+        self.client.force_login(self.teacher)
+
+    def submit(self, username, first_name, last_name, data, filename):
+        student = CustomUser.objects.create_user(username=username, password='x', role='student',
+                                                 first_name=first_name, last_name=last_name)
+        return AssignmentSubmission.objects.create(assignment=self.assignment, student=student,
+                                                   file=ContentFile(data, name=filename))
+
+    def download(self):
+        response = self.client.get(reverse('download_assignment_submissions', args=[self.assignment.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def check_archive(self):
+        big = os.urandom(3 * submission_archive.ARCHIVE_CHUNK_SIZE + 17)
+        self.submit('s1', 'Ali', 'Valiyev', b'birinchi', 'a.PDF')
+        self.submit('s2', 'Ali', 'Valiyev', big, 'b.pdf')
+        # Haqiqiy ism tartib raqamli nom bilan bir xil chiqadi
+        self.submit('s3', 'Ali_2', 'Valiyev', b'uchinchi', 'c.pdf')
+        self.submit('s4', 'G‘ayrat', 'O‘ktamov', b'', 'd.txt')
+        gone = self.submit('s5', 'Bobur', 'Karimov', b'x', 'e.txt')
+        gone.file.storage.delete(gone.file.name)
+
+        archive = self.download()
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(sorted(archive.namelist()), [
+            'Oktamov_Gayrat.txt', 'Valiyev_Ali.pdf', 'Valiyev_Ali_2.pdf', 'Valiyev_Ali_2_2.pdf',
+        ])
+        self.assertEqual(archive.read('Valiyev_Ali.pdf'), b'birinchi')
+        self.assertEqual(archive.read('Valiyev_Ali_2.pdf'), big)
+        self.assertEqual(archive.read('Valiyev_Ali_2_2.pdf'), b'uchinchi')
+        self.assertEqual(archive.read('Oktamov_Gayrat.txt'), b'')
+
+    def test_local_storage(self):
+        self.check_archive()
+
+    def test_s3_storage(self):
+        self.enterContext(mock.patch.dict(os.environ, {
+            'AWS_ACCESS_KEY_ID': 'test', 'AWS_SECRET_ACCESS_KEY': 'test', 'AWS_DEFAULT_REGION': 'us-east-1',
+        }))
+        self.enterContext(mock_aws())
+        self.enterContext(override_settings(
+            STORAGES=S3_STORAGES, AWS_STORAGE_BUCKET_NAME='media', AWS_S3_REGION_NAME='us-east-1',
+        ))
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='media')
+        self.check_archive()
+
+    def test_other_teacher_gets_404(self):
+        other = CustomUser.objects.create_user(username='other', password='x', role='teacher')
+        self.client.force_login(other)
+        response = self.client.get(reverse('download_assignment_submissions', args=[self.assignment.id]))
+        self.assertEqual(response.status_code, 404)
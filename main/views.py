@@ -1,8 +1,17 @@
+import json
+
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.shortcuts import render, redirect
+from django.http import JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, update_session_auth_hash
 from django.contrib import messages
 from django.contrib.auth import login
+from django.views.decorators.http import require_POST
+
+from .assignment_upload import UploadError
+from .direct_upload import TARGET_FIELDS, direct_uploads_enabled, start_direct_upload, complete_direct_upload, \
+    direct_upload_state
+from .models import DirectUpload
 
 
 def login_view(request):
@@ -25,3 +34,35 @@ def login_view(request):
             messages.error(request, "Login yoki parol noto‘g‘ri", extra_tags='login_message')
 
     return render(request, 'login.html')
+
+
+@login_required
+@require_POST
+def start_direct_upload_view(request):
+    # Bucketga to‘g‘ridan-to‘g‘ri yuklashni boshlash: {"target", "filename", "size", "content_type", "object_id",
+    # "group_id", "title"} -> imzolangan POST manzil va forma maydonlari. Ombor S3 bo‘lmasa 404 — brauzer odatdagi yuklashga qaytadi
+    try:
+        payload = json.loads(request.body)
+        target = payload.get('target')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'invalid payload'}, status=400)
+    if target in TARGET_FIELDS and not direct_uploads_enabled(target):
+        return JsonResponse({'error': 'direct uploads disabled', 'enabled': False}, status=404)
+    try:
+        upload, url, fields = start_direct_upload(request.user, target, payload)
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    return JsonResponse({**direct_upload_state(upload), 'url': url, 'method': 'POST', 'fields': fields})
+
+
+@login_required
+@require_POST
+def complete_direct_upload_view(request, upload_id):
+    # Brauzer POST ni tugatgach chaqiradi: server obyektni tekshirib doimiy kalitga ko‘chiradi va qayd etadi
+    upload = get_object_or_404(DirectUpload, id=upload_id, user=request.user)
+    try:
+        upload = complete_direct_upload(upload)
+    except UploadError as exc:
+        upload.refresh_from_db()
+        return JsonResponse({'error': str(exc), **direct_upload_state(upload)}, status=exc.status)
+    return JsonResponse(direct_upload_state(upload))